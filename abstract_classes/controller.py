@@ -19,4 +19,26 @@ class Controller(ABC):
 
     @abstractmethod
     def proba_is_valid(self, video: tp.Any) -> float:
-        pass
\ No newline at end of file
+        pass
+
+    def add_valid_gestures(self, videos: tp.Iterable[tp.Any]) -> tp.List[tp.Any]:
+        """
+        Batch version of add_valid_gesture (videos are processed one by one, may be overridden by pipeline)
+        :return: for every video (in input order) result of add_valid_gesture or exception raised on it
+        """
+        return [call_or_exception(self.add_valid_gesture, video) for video in videos]
+
+    def score_many(self, videos: tp.Iterable[tp.Any]) -> tp.List[tp.Union[float, Exception]]:
+        """
+        Batch version of proba_is_valid (videos are processed one by one, may be overridden by pipeline)
+        :return: for every video (in input order) result of proba_is_valid or exception raised on it
+        """
+        return [call_or_exception(self.proba_is_valid, video) for video in videos]
+
+
+def call_or_exception(func: tp.Callable, *args, **kwargs) -> tp.Any:
+    """ Result of func or raised exception, so failure on one video doesn't abort the batch """
+    try:
+        return func(*args, **kwargs)
+    except Exception as exc:
+        return exc
@@ -6,7 +6,7 @@ class GestureRepr(ABC):
     """ Abstract class for gesture representation used in algorithms """
 
     @abstractmethod
-    def __init__(self, video_frames: tp.Sequence):
+    def __init__(self, video_frames: tp.Iterable):
         pass
 
     @abstractmethod
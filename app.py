@@ -1,5 +1,4 @@
 import os
-import cv2
 
 from examples.DP_app.dummy_controller import DummyController
 
@@ -11,8 +10,9 @@ if __name__ == '__main__':
     v2 = [path2 + file for file in os.listdir(path2)]
     print(f'{v1=}')
     print(f'{v2=}')
-    for video_path in v1[:-2]:
-        dc.add_valid_gesture(cv2.VideoCapture(video_path))
+    for video_path, added in zip(v1[:-2], dc.add_valid_gestures(v1[:-2])):
+        if isinstance(added, Exception):
+            print(f'{video_path} is not added: {added!r}')
 
-    for video_path in v1[-2:] + v2:
-        print(dc.proba_is_valid(cv2.VideoCapture(video_path)))
\ No newline at end of file
+    for proba in dc.score_many(v1[-2:] + v2):
+        print(proba)
\ No newline at end of file
@@ -0,0 +1,170 @@
+"""
+Reproducible benchmark suite on synthetic gestures (no video files needed).
+
+Every stage is timed in isolation and end to end:
+    angles       PointsToAnglesTransformer.transform_batch of landmarks
+    nan_preproc  erase_nan_prefix_suffix + nan_percentage + interpolate of angles
+    smoothing    smooth_gesture with DummyController defaults (GPR)
+    dp           dp_multichannel_distance of two samples of one gesture
+    comparator   DummyDPComparator.proba_is_valid against gallery of samples of several gestures
+    end_to_end   DummyController.preproc_points + proba_is_valid, landmarks -> probability
+Params are swept one at a time around defaults: sequence length, max_erases, channel count, gallery size.
+
+Results (median and min time of repeats for every stage and params) are written as json,
+--compare prints ratio of times to results of other run (e.g. of previous commit).
+
+run from repository root: python -m benchmarks.benchmark_suite --output results.json [--compare baseline.json]
+"""
+import sys
+import json
+import time
+import argparse
+import platform
+import subprocess
+import typing as tp
+import numpy as np
+
+from benchmarks.synthetic import synthetic_angles, synthetic_gesture_samples, synthetic_landmarks
+from gesture_repr.points_repr.points_repr import PointsRepr
+from gesture_repr.angles_repr.angles_repr import AnglesRepr
+from gesture_repr.repr_modify_utils.utils import erase_nan_prefix_suffix, interpolate, nan_percentage
+from distance.per_series_dist.dp_dist import dp_multichannel_distance
+from smoothing.smooth_gesture import smooth_gesture
+from examples.DP_app.dummy_dp_comp import DummyDPComparator
+from examples.DP_app.dummy_controller import DummyController, log_scaled_max_erases
+
+
+def measure(func: tp.Callable[[], tp.Any], repeats: int) -> tp.Dict[str, float]:
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return {'median_s': float(np.median(times)), 'min_s': float(np.min(times))}
+
+
+def nan_preproc(angle_repr: AnglesRepr) -> tp.Optional[AnglesRepr]:
+    angle_repr = erase_nan_prefix_suffix(angle_repr, inplace=True)
+    if angle_repr is None or nan_percentage(angle_repr) > 0.15:
+        return None
+    return interpolate(angle_repr, inplace=True)
+
+
+def end_to_end(controller: DummyController, points_repr: PointsRepr) -> float:
+    gesture = controller.preproc_points(points_repr)
+    return 0.0 if gesture is None else controller.comparator.proba_is_valid(gesture)
+
+
+def gallery_comparator(size: int, length: int, cnt_channels: int, threshold: float,
+                       cnt_gestures: int, seed: int) -> DummyDPComparator:
+    """ Gallery of size samples of cnt_gestures gestures (round-robin) """
+    comparator = DummyDPComparator(threshold, max_erases=log_scaled_max_erases)
+    bases = [synthetic_angles(length, cnt_channels, seed=seed + i) for i in range(cnt_gestures)]
+    for i in range(size):
+        comparator.add_valid_gesture(synthetic_gesture_samples(bases[i % cnt_gestures], 1, seed=seed + i)[0])
+    return comparator
+
+
+def run_suite(args: argparse.Namespace) -> tp.List[tp.Dict[str, tp.Any]]:
+    results = []
+
+    def record(stage: str, func: tp.Callable[[], tp.Any], repeats: int = args.repeats, **params) -> None:
+        results.append({'stage': stage, 'params': params, 'repeats': repeats, **measure(func, repeats)})
+        print(f'{stage:<12}{json.dumps(params):<60}{results[-1]["median_s"] * 1000:>12.2f} ms', file=sys.stderr)
+
+    controller = DummyController()
+    for length in args.lengths:
+        landmarks = synthetic_landmarks(length, args.noise, args.nan_rate, seed=args.seed)
+        points_repr = PointsRepr.from_points(landmarks)
+        record('angles', lambda: controller.angle_transformer.transform_batch(landmarks), length=length)
+        record('nan_preproc', lambda: nan_preproc(AnglesRepr(points_repr, controller.angle_transformer)),
+               length=length)
+        angles = nan_preproc(AnglesRepr(points_repr, controller.angle_transformer))
+        if angles is not None:
+            record('smoothing', lambda: smooth_gesture(angles, controller.smoothing_func,
+                                                       return_last_gpr_mean_std=True),
+                   repeats=args.slow_repeats, length=length)
+
+        end_to_end_controller = DummyController()
+        gesture = controller.preproc_points(points_repr)
+        if gesture is not None:
+            end_to_end_controller.comparator = gallery_comparator(args.gallery_sizes[0], length, gesture.shape[1],
+                                                                  args.threshold, args.gestures, args.seed)
+        record('end_to_end', lambda: end_to_end(end_to_end_controller, points_repr), repeats=args.slow_repeats,
+               length=length, gallery_size=args.gallery_sizes[0], nan_rate=args.nan_rate)
+
+    def record_dp(length: int, max_erases: int, cnt_channels: int) -> None:
+        base = synthetic_angles(length, cnt_channels, args.noise, seed=args.seed)
+        first, second = synthetic_gesture_samples(base, 2, length_jitter=0.0, seed=args.seed)
+        record('dp', lambda: dp_multichannel_distance(first, second, max_erases),
+               length=length, max_erases=max_erases, channels=cnt_channels)
+
+    for length in args.lengths:
+        record_dp(length, args.max_erases[0], args.channels[0])
+    for max_erases in args.max_erases[1:]:
+        record_dp(args.lengths[0], max_erases, args.channels[0])
+    for cnt_channels in args.channels[1:]:
+        record_dp(args.lengths[0], args.max_erases[0], cnt_channels)
+
+    for size in args.gallery_sizes:
+        comparator = gallery_comparator(size, args.lengths[0], args.channels[0], args.threshold, args.gestures,
+                                        args.seed)
+        query = synthetic_gesture_samples(synthetic_angles(args.lengths[0], args.channels[0], seed=args.seed),
+                                          1, seed=args.seed + size + 1)[0]
+        record('comparator', lambda: comparator.proba_is_valid(query),
+               length=args.lengths[0], channels=args.channels[0], gallery_size=size)
+    return results
+
+
+def compare(results: tp.List[tp.Dict[str, tp.Any]], baseline: tp.List[tp.Dict[str, tp.Any]]) -> None:
+    """ Prints ratio of median times (> 1 is slower than baseline) of stages with equal params """
+    baseline_times = {(res['stage'], json.dumps(res['params'], sort_keys=True)): res['median_s'] for res in baseline}
+    print(f'{"stage":<12}{"params":<60}{"time / baseline":>16}')
+    for res in results:
+        key = (res['stage'], json.dumps(res['params'], sort_keys=True))
+        if key in baseline_times:
+            print(f'{key[0]:<12}{key[1]:<60}{res["median_s"] / baseline_times[key]:>16.3f}')
+
+
+def git_commit() -> tp.Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--lengths', type=int, nargs='+', default=[100, 200, 400],
+                        help='the first one is used in sweeps of other params')
+    parser.add_argument('--max-erases', type=int, nargs='+', default=[10, 0, 5, 20, 40])
+    parser.add_argument('--channels', type=int, nargs='+', default=[23, 1, 8, 46])
+    parser.add_argument('--gallery-sizes', type=int, nargs='+', default=[10, 1, 50, 200])
+    parser.add_argument('--gestures', type=int, default=5, help='count of gestures in gallery')
+    parser.add_argument('--noise', type=float, default=0.02)
+    parser.add_argument('--nan-rate', type=float, default=0.02)
+    parser.add_argument('--threshold', type=float, default=0.2)
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--slow-repeats', type=int, default=1, help='repeats of smoothing and end to end')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='json file for results, stdout if not given')
+    parser.add_argument('--compare', help='json file with results of other run')
+    args = parser.parse_args()
+
+    report = {
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'args': vars(args),
+        'results': run_suite(args),
+    }
+    if args.output is None:
+        print(json.dumps(report, indent=2))
+    else:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2)
+    if args.compare is not None:
+        with open(args.compare) as file:
+            compare(report['results'], json.load(file)['results'])
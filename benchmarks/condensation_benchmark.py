@@ -0,0 +1,63 @@
+"""
+Query latency and decisions of DummyDPComparator with condensed gallery (gallery_budget) compared with full gallery:
+    gallery gestures are enrolled with metadata {'gesture': class}, queries are other samples of gallery gestures
+    (positives) and samples of other gestures (negatives).
+For every budget: time of enrollment, time of is_valid per query, speedup, decisions different from
+full gallery (false accepts and false rejects) and coverage radius of condensed gallery.
+
+run from repository root: python -m benchmarks.condensation_benchmark --budgets 5 10 20
+"""
+import time
+import argparse
+import typing as tp
+import numpy as np
+
+from benchmarks.synthetic import synthetic_angles, synthetic_gesture_samples
+from examples.DP_app.dummy_dp_comp import DummyDPComparator
+from examples.DP_app.dummy_controller import log_scaled_max_erases
+
+
+def run(gallery: tp.List[tp.Tuple[np.array, int]], queries: tp.List[np.array], threshold: float,
+        gallery_budget: tp.Optional[int]) -> tp.Tuple[np.array, float, float, float]:
+    """ Decisions of is_valid, enrollment time, mean time per query and coverage radius """
+    comparator = DummyDPComparator(threshold, gallery_budget=gallery_budget, max_erases=log_scaled_max_erases)
+    start = time.perf_counter()
+    for gesture, cls in gallery:
+        comparator.add_valid_gesture(gesture, {'gesture': cls})
+    enrollment_time = time.perf_counter() - start
+    start = time.perf_counter()
+    decisions = np.array([comparator.is_valid(query) for query in queries])
+    return decisions, enrollment_time, (time.perf_counter() - start) / len(queries), comparator.coverage_radius
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--budgets', type=int, nargs='+', default=[5, 10, 20])
+    parser.add_argument('--threshold', type=float, default=0.2)
+    parser.add_argument('--length', type=int, default=120)
+    parser.add_argument('--channels', type=int, default=23)
+    parser.add_argument('--noise', type=float, default=0.02)
+    parser.add_argument('--gestures', type=int, default=5, help='count of gallery gestures (and of other gestures)')
+    parser.add_argument('--samples', type=int, default=10, help='enrolled samples of every gesture')
+    parser.add_argument('--queries', type=int, default=4, help='queries of every gesture')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    gallery, queries = [], []
+    for gesture in range(2 * args.gestures):
+        base = synthetic_angles(args.length, args.channels, args.noise, seed=args.seed + gesture)
+        samples = synthetic_gesture_samples(base, args.samples + args.queries, noise=args.noise,
+                                            seed=args.seed + gesture)
+        if gesture < args.gestures:
+            gallery.extend((sample, gesture) for sample in samples[:args.samples])
+        queries.extend(samples[args.samples:])
+
+    full, full_enrollment, full_time, _ = run(gallery, queries, args.threshold, None)
+    print(f'{len(gallery)} enrolled, {len(queries)} queries, {full.sum()} valid, '
+          f'full gallery {full_time * 1000:.2f} ms/query, enrollment {full_enrollment:.2f} s')
+    print(f'{"budget":>7}{"enrollment, s":>15}{"speedup":>9}{"false accepts":>15}{"false rejects":>15}'
+          f'{"coverage radius":>17}')
+    for budget in args.budgets:
+        decisions, enrollment, elapsed, radius = run(gallery, queries, args.threshold, budget)
+        print(f'{budget:>7}{enrollment:>15.2f}{full_time / elapsed:>9.2f}{np.sum(decisions & ~full):>15}'
+              f'{np.sum(~decisions & full):>15}{radius:>17.4f}')
@@ -0,0 +1,42 @@
+"""
+Compares wall time and output drift of GPR smoothing modes against the default one
+(kernel is optimized from scratch on every iteration for every channel).
+
+run from repository root: python -m benchmarks.gpr_smoothing_benchmark --length 300 --channels 23
+"""
+import time
+import argparse
+import numpy as np
+
+from benchmarks.synthetic import synthetic_angles
+from smoothing.smooth_gesture import smooth_gesture
+from smoothing.gpr_smoothing import gpr_time_series_smoothing, gpr_gesture_smoothing
+
+MODES = {
+    'always': dict(smoothing_func=gpr_time_series_smoothing, refit_kernel='always'),
+    'warm_start': dict(smoothing_func=gpr_time_series_smoothing, refit_kernel='warm_start'),
+    'first': dict(smoothing_func=gpr_time_series_smoothing, refit_kernel='first'),
+    'shared_kernel': dict(smoothing_func=gpr_gesture_smoothing, channelwise=False),
+}
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--length', type=int, default=300)
+    parser.add_argument('--channels', type=int, default=23)
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+
+    gestures = [synthetic_angles(args.length, args.channels, seed=seed) for seed in range(args.repeats)]
+    results = {}
+    for mode, params in MODES.items():
+        start = time.perf_counter()
+        results[mode] = [smooth_gesture(gesture, return_last_gpr_mean_std=True, **params) for gesture in gestures]
+        results[mode + '_time'] = (time.perf_counter() - start) / args.repeats
+
+    print(f'{"mode":<15}{"time, s":>10}{"speedup":>10}{"max mean drift":>16}{"avg mean drift":>16}')
+    for mode in MODES:
+        # [:, 1, :] is gpr mean, used as smoothed gesture by DummyController
+        drift = np.array([np.abs(res[:, 1, :] - base[:, 1, :])
+                          for res, base in zip(results[mode], results['always'])])
+        print(f'{mode:<15}{results[mode + "_time"]:>10.3f}{results["always_time"] / results[mode + "_time"]:>10.2f}'
+              f'{drift.max():>16.5f}{drift.mean():>16.5f}')
@@ -0,0 +1,62 @@
+"""
+Compares landmark extraction with decimation (PointsRepr detection_step, motion_tolerance)
+with full-rate extraction on real videos:
+    speedup of extraction, max landmark error and dp distance between preprocessed gestures
+    (DummyController.preproc_points) extracted with decimation and at full rate,
+    rejected is count of videos rejected by preprocessing (too many nan) only in one of modes
+
+run from repository root: python -m benchmarks.landmark_decimation_benchmark video1.mp4 video2.mp4 ...
+"""
+import time
+import argparse
+import cv2
+import numpy as np
+
+from gesture_repr.points_repr.points_repr import PointsRepr
+from gesture_repr.points_repr.frame_sources import iterate_video_capture
+from examples.DP_app.dummy_controller import DummyController
+from distance.per_series_dist.dp_dist import dp_multichannel_distance
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('videos', nargs='+')
+    parser.add_argument('--steps', type=int, nargs='+', default=[2, 3, 5])
+    parser.add_argument('--motion-tolerances', type=float, nargs='+', default=[0.02, 0.05])
+    args = parser.parse_args()
+
+    settings = [dict(detection_step=step) for step in args.steps] + \
+               [dict(detection_step=step, motion_tolerance=tolerance)
+                for step in args.steps for tolerance in args.motion_tolerances]
+    controller = DummyController()
+    # frames are decoded once, so only MediaPipe and interpolation time is measured
+    videos = [list(iterate_video_capture(cv2.VideoCapture(path))) for path in args.videos]
+
+    def extract(frames, **hands_params):
+        start = time.perf_counter()
+        points_repr = PointsRepr(frames, **hands_params)
+        return points_repr, time.perf_counter() - start
+
+    full_rate = [extract(frames) for frames in videos]
+    full_rate_gestures = [controller.preproc_points(points_repr) for points_repr, _ in full_rate]
+    full_rate_time = sum(elapsed for _, elapsed in full_rate)
+    cnt_frames = sum(len(frames) for frames in videos)
+    print(f'full rate: {cnt_frames} frames, {full_rate_time / cnt_frames * 1000:.1f} ms/frame')
+
+    print(f'{"step":>6}{"tolerance":>11}{"speedup":>9}{"max landmark err":>18}'
+          f'{"max dist":>10}{"mean dist":>11}{"rejected":>10}')
+    for hands_params in settings:
+        elapsed, landmark_errors, distances, rejected = 0.0, [], [], 0
+        for frames, (full_points, _), full_gesture in zip(videos, full_rate, full_rate_gestures):
+            points_repr, video_time = extract(frames, **hands_params)
+            elapsed += video_time
+            landmark_errors.append(np.nan_to_num(np.abs(points_repr[:] - full_points[:]), nan=0.0).max())
+            gesture = controller.preproc_points(points_repr)
+            if (gesture is None) != (full_gesture is None):
+                rejected += 1
+            elif gesture is not None:
+                distances.append(dp_multichannel_distance(full_gesture[:, :], gesture[:, :],
+                                                          **controller.comparator.gallery.dp_dist_params).max())
+        distances = np.array(distances) if distances else np.array([np.nan])
+        print(f'{hands_params["detection_step"]:>6}{hands_params.get("motion_tolerance", "-"):>11}'
+              f'{full_rate_time / elapsed:>9.2f}{max(landmark_errors):>18.4f}'
+              f'{distances.max():>10.4f}{distances.mean():>11.4f}{rejected:>10}')
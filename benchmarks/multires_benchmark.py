@@ -0,0 +1,92 @@
+"""
+Accuracy against speed of coarse-to-fine dp (DummyDPComparator coarse_factor, refine_band) compared with exact dp:
+    synthetic: gallery of samples of several gestures, queries are other samples of gallery gestures (positives)
+        and samples of other gestures (negatives)
+    recorded (if --videos are given): gestures preprocessed by DummyController, every gesture is queried
+        against gallery of all other ones (leave-one-out)
+For every (factor, band): time of is_valid per query, speedup, count of decisions different from exact mode
+(false accepts and false rejects), refinement rate = refined / (refined + coarse_decided) of gallery counters.
+
+run from repository root: python -m benchmarks.multires_benchmark [--videos video1.mp4 video2.mp4 ...]
+"""
+import time
+import argparse
+import typing as tp
+import numpy as np
+
+from benchmarks.synthetic import synthetic_angles, synthetic_gesture_samples
+from examples.DP_app.dummy_dp_comp import DummyDPComparator
+from examples.DP_app.dummy_controller import DummyController, log_scaled_max_erases
+from instrumentation.call_stats import CallStats
+
+
+def synthetic_dataset(args: argparse.Namespace) -> tp.Tuple[tp.List[np.array], tp.List[tp.List[np.array]]]:
+    """ Gallery samples and queries (one list of queries, the same gallery for all of them) """
+    gallery, queries = [], []
+    for gesture in range(2 * args.gestures):
+        base = synthetic_angles(args.length, args.channels, args.noise, seed=args.seed + gesture)
+        samples = synthetic_gesture_samples(base, args.samples + args.queries, noise=args.noise,
+                                            seed=args.seed + gesture)
+        if gesture < args.gestures:
+            gallery.extend(samples[:args.samples])
+        queries.extend(samples[args.samples:])
+    return gallery, [queries]
+
+
+def recorded_dataset(paths: tp.List[str]) -> tp.Tuple[tp.List[np.array], tp.List[tp.List[np.array]]]:
+    """ Leave-one-out: i-th list of queries is [gesture i], it is queried against the other gestures """
+    controller = DummyController()
+    gestures = [gesture for gesture in (controller.preproc_video(path) for path in paths) if gesture is not None]
+    return gestures, [[gesture] for gesture in gestures]
+
+
+def run(gallery: tp.List[np.array], query_lists: tp.List[tp.List[np.array]], leave_one_out: bool,
+        threshold: float, **comparator_params) -> tp.Tuple[tp.List[bool], float, tp.Dict[str, int]]:
+    """ Decisions of is_valid for all queries, mean time per query and gallery counters """
+    decisions, elapsed, stats = [], 0.0, CallStats('multires')
+    for i, queries in enumerate(query_lists):
+        comparator = DummyDPComparator(threshold, max_erases=log_scaled_max_erases, **comparator_params)
+        for j, template in enumerate(gallery):
+            if not leave_one_out or j != i:
+                comparator.add_valid_gesture(template)
+        for query in queries:
+            start = time.perf_counter()
+            decisions.append(comparator.is_valid(query, stats))
+            elapsed += time.perf_counter() - start
+    return decisions, elapsed / len(decisions), stats.as_dict()['counters']
+
+
+def report(name: str, gallery: tp.List[np.array], query_lists: tp.List[tp.List[np.array]], leave_one_out: bool,
+           args: argparse.Namespace) -> None:
+    exact, exact_time, _ = run(gallery, query_lists, leave_one_out, args.threshold)
+    exact = np.array(exact)
+    print(f'{name}: {len(exact)} queries, {exact.sum()} valid, exact dp {exact_time * 1000:.2f} ms/query')
+    print(f'{"factor":>7}{"band":>7}{"speedup":>9}{"false accepts":>15}{"false rejects":>15}{"refined":>9}')
+    for factor in args.factors:
+        for band in args.bands:
+            decisions, elapsed, counters = run(gallery, query_lists, leave_one_out, args.threshold,
+                                               coarse_factor=factor, refine_band=band)
+            decisions = np.array(decisions)
+            cnt_pairs = counters.get('refined', 0) + counters.get('coarse_decided', 0)
+            print(f'{factor:>7}{band:>7.2f}{exact_time / elapsed:>9.2f}{np.sum(decisions & ~exact):>15}'
+                  f'{np.sum(~decisions & exact):>15}{counters.get("refined", 0) / max(cnt_pairs, 1):>9.2f}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--factors', type=int, nargs='+', default=[2, 4, 8])
+    parser.add_argument('--bands', type=float, nargs='+', default=[0.25, 0.5, 1.0])
+    parser.add_argument('--threshold', type=float, default=0.2)
+    parser.add_argument('--length', type=int, default=200)
+    parser.add_argument('--channels', type=int, default=23)
+    parser.add_argument('--noise', type=float, default=0.02)
+    parser.add_argument('--gestures', type=int, default=5, help='count of gallery gestures (and of other gestures)')
+    parser.add_argument('--samples', type=int, default=4, help='gallery samples of every gesture')
+    parser.add_argument('--queries', type=int, default=4, help='queries of every gesture')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--videos', nargs='*', default=[], help='recorded gestures')
+    args = parser.parse_args()
+
+    report('synthetic', *synthetic_dataset(args), leave_one_out=False, args=args)
+    if args.videos:
+        report('recorded', *recorded_dataset(args.videos), leave_one_out=True, args=args)
@@ -0,0 +1,61 @@
+"""
+Compares smoothing backends (smoothing_func of smooth_gesture) by speed
+and by downstream DummyDPComparator decisions on synthetic gestures:
+    valid gestures are samples of gesture 0, queries are other samples of gesture 0 (should be valid)
+    and samples of other gestures (should be invalid)
+
+run from repository root: python -m benchmarks.smoothing_backends_benchmark
+"""
+import time
+import argparse
+import numpy as np
+
+from benchmarks.synthetic import synthetic_angles, synthetic_gesture_samples
+from smoothing.smooth_gesture import smooth_gesture
+from smoothing.gpr_smoothing import gpr_time_series_smoothing
+from smoothing.robust_smoothing import hampel_time_series_smoothing, savgol_time_series_smoothing, \
+    kalman_time_series_smoothing
+from examples.DP_app.dummy_dp_comp import DummyDPComparator
+from examples.DP_app.dummy_controller import log_scaled_max_erases
+
+BACKENDS = {
+    'gpr': gpr_time_series_smoothing,
+    'hampel': hampel_time_series_smoothing,
+    'savgol': savgol_time_series_smoothing,
+    'kalman': kalman_time_series_smoothing,
+}
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--length', type=int, default=200)
+    parser.add_argument('--channels', type=int, default=23)
+    parser.add_argument('--gestures', type=int, default=3)
+    parser.add_argument('--enrolled', type=int, default=5)
+    parser.add_argument('--queries', type=int, default=5, help='count of queries of every gesture')
+    parser.add_argument('--threshold', type=float, default=0.2)
+    args = parser.parse_args()
+
+    bases = [synthetic_angles(args.length, args.channels, noise=0.0, outlier_rate=0.0, seed=100 + i)
+             for i in range(args.gestures)]
+    enrolled = synthetic_gesture_samples(bases[0], args.enrolled, seed=0)
+    queries = [(sample, i == 0) for i, base in enumerate(bases)
+               for sample in synthetic_gesture_samples(base, args.queries, seed=1 + i)]
+
+    decisions = {}
+    print(f'{"backend":<10}{"smooth, ms/gesture":>20}{"match, ms/query":>18}{"accuracy":>10}{"agree gpr":>11}')
+    for name, smoothing_func in BACKENDS.items():
+        start = time.perf_counter()
+        smoothed = [smooth_gesture(gesture, smoothing_func, return_last_gpr_mean_std=True)[:, 1, :].T
+                    for gesture in enrolled + [sample for sample, _ in queries]]
+        smooth_time = (time.perf_counter() - start) / len(smoothed)
+
+        comparator = DummyDPComparator(args.threshold, max_erases=log_scaled_max_erases)
+        for gesture in smoothed[:len(enrolled)]:
+            comparator.add_valid_gesture(gesture)
+        start = time.perf_counter()
+        decisions[name] = np.array([comparator.is_valid(gesture) for gesture in smoothed[len(enrolled):]])
+        match_time = (time.perf_counter() - start) / len(queries)
+
+        accuracy = (decisions[name] == np.array([label for _, label in queries])).mean()
+        agreement = (decisions[name] == decisions['gpr']).mean()
+        print(f'{name:<10}{smooth_time * 1000:>20.1f}{match_time * 1000:>18.1f}{accuracy:>10.3f}{agreement:>11.3f}')
@@ -0,0 +1,82 @@
+import typing as tp
+import numpy as np
+
+
+def synthetic_angles(length: int = 300,
+                     cnt_channels: int = 23,
+                     noise: float = 0.02,
+                     outlier_rate: float = 0.02,
+                     seed: tp.Optional[int] = 0,
+                     nan_rate: float = 0.0) -> np.array:
+    """
+    Smooth angle-like time series (sum of random sinusoids in (0, pi)) with gaussian noise and outliers,
+    nan_rate of time points are np.nan in all channels (as frames without detected hand)
+    :return: np.array (length, cnt_channels)
+    """
+    rng = np.random.default_rng(seed)
+    time_grid = np.linspace(0.0, 1.0, length)[:, None]
+    freqs = rng.uniform(0.5, 3.0, size=(3, cnt_channels))
+    phases = rng.uniform(0.0, 2 * np.pi, size=(3, cnt_channels))
+    amplitudes = rng.uniform(0.1, 0.5, size=(3, cnt_channels))
+    angles = np.pi / 2 + sum(amplitudes[i] * np.sin(2 * np.pi * freqs[i] * time_grid + phases[i]) for i in range(3))
+    angles += rng.normal(scale=noise, size=angles.shape)
+    outliers = rng.random(angles.shape) < outlier_rate
+    angles[outliers] += rng.choice([-1.0, 1.0], size=outliers.sum()) * rng.uniform(0.3, 0.8, size=outliers.sum())
+    angles[rng.random(length) < nan_rate] = np.nan
+    return angles
+
+
+# approximate landmarks of open hand (MediaPipe normalized coords): wrist, then 4 points of every finger
+HAND_LANDMARKS = np.array(
+    [[0.50, 0.80, 0.00]] +
+    [[0.50 + dx * k, 0.80 - dy * k, -0.01 * k] for dx, dy in [(-0.07, 0.05), (-0.03, 0.10), (0.00, 0.11),
+                                                              (0.03, 0.10), (0.06, 0.08)] for k in range(1, 5)])
+
+
+def synthetic_landmarks(length: int = 300,
+                        noise: float = 0.002,
+                        nan_rate: float = 0.02,
+                        seed: tp.Optional[int] = 0) -> np.array:
+    """
+    Landmarks of moving hand (as PointsRepr values): every point of HAND_LANDMARKS moves along
+    sum of random sinusoids, with gaussian noise, nan_rate of frames are np.nan (hand is not found)
+    :return: np.array (length, 21, 3) float32
+    """
+    rng = np.random.default_rng(seed)
+    time_grid = np.linspace(0.0, 1.0, length)[:, None, None]
+    freqs = rng.uniform(0.5, 3.0, size=(2, 21, 3))
+    phases = rng.uniform(0.0, 2 * np.pi, size=(2, 21, 3))
+    amplitudes = rng.uniform(0.005, 0.03, size=(2, 21, 3))
+    points = HAND_LANDMARKS + sum(amplitudes[i] * np.sin(2 * np.pi * freqs[i] * time_grid + phases[i])
+                                  for i in range(2))
+    points += rng.normal(scale=noise, size=points.shape)
+    points[rng.random(length) < nan_rate] = np.nan
+    return points.astype(np.float32)
+
+
+def synthetic_gesture_samples(base: np.array,
+                              cnt_samples: int,
+                              length_jitter: float = 0.1,
+                              time_warp: float = 0.2,
+                              noise: float = 0.02,
+                              outlier_rate: float = 0.02,
+                              seed: tp.Optional[int] = 0) -> tp.List[np.array]:
+    """
+    Samples of one gesture: base (time, channels) resampled to random length with smooth monotone time warping,
+    with gaussian noise and outliers
+    """
+    rng = np.random.default_rng(seed)
+    base_grid = np.linspace(0.0, 1.0, len(base))
+    samples = []
+    for _ in range(cnt_samples):
+        length = max(2, int(round(len(base) * rng.uniform(1 - length_jitter, 1 + length_jitter))))
+        grid = np.linspace(0.0, 1.0, length)
+        # |time_warp| < 1 / pi keeps warping monotone
+        grid = grid + rng.uniform(-1.0, 1.0) * min(time_warp, 0.3) * np.sin(np.pi * grid) / np.pi
+        sample = np.stack([np.interp(grid, base_grid, base[:, i]) for i in range(base.shape[1])], axis=1)
+        sample += rng.normal(scale=noise, size=sample.shape)
+        outliers = rng.random(sample.shape) < outlier_rate
+        sample[outliers] += rng.choice([-1.0, 1.0], size=outliers.sum()) * rng.uniform(0.3, 0.8,
+                                                                                        size=outliers.sum())
+        samples.append(sample)
+    return samples
@@ -0,0 +1,86 @@
+import typing as tp
+import numpy as np
+
+from distance.gallery.template_gallery import TemplateGallery
+from distance.gallery.pairwise_distances import pairwise_gesture_distances
+
+
+def merge_redundant(dists: np.array,
+                    classes: tp.Sequence[tp.Any],
+                    radii: np.array,
+                    budget: int) -> tp.Tuple[tp.List[int], tp.Dict[int, int], np.array]:
+    """
+    Greedy condensation of templates to budget: the most redundant template is merged into other template
+    of its class (the pair with the smallest coverage radius after merging is chosen),
+    until budget templates are left. Every kept template is a prototype of merged ones,
+    its coverage radius is a heuristic estimate of the maximal distance from it to templates merged into it:
+    distances are summed along chains of merges as if triangle inequality held, dp distance is not a metric,
+    so the radius is not a bound. Classes are never emptied, so more than budget templates are left
+    if there are more classes than budget.
+
+    :param dists: (N, N) symmetric distances between templates (only distances within classes are used)
+    :param classes: class of every template
+    :param radii: coverage radii of templates (zeros if templates are not merged results)
+    :param budget: count of templates to keep
+    :return: (kept indexes (sorted), merged: evicted index -> index of kept prototype, coverage radii of all)
+    """
+    assert budget >= 1, f'budget should be positive, got {budget=}'
+    classes = np.array(classes, dtype=object)
+    radii = np.array(radii, dtype=np.float64)
+    kept = np.ones(len(classes), dtype=bool)
+    merged = {}
+    same_class = classes[:, None] == classes[None, :]
+    # costs[i, j] = distance from j to templates merged into i, if i is merged into j
+    costs = np.where(same_class & ~np.eye(len(classes), dtype=bool), dists + radii[:, None], np.inf)
+    while kept.sum() > budget:
+        # coverage radius of j after merging i into it
+        masked = np.where(kept[:, None] & kept[None, :], np.maximum(costs, radii[None, :]), np.inf)
+        evicted, prototype = np.unravel_index(np.argmin(masked), masked.shape)
+        if masked[evicted, prototype] == np.inf:
+            # only one template is left in every class (or the rest is incomparable)
+            break
+        kept[evicted] = False
+        radii[prototype] = max(radii[prototype], masked[evicted, prototype])
+        costs[prototype] = np.where(np.isfinite(costs[prototype]), dists[prototype] + radii[prototype], np.inf)
+        merged[int(evicted)] = int(prototype)
+    # templates merged into evicted ones are covered by prototype of evicted
+    for evicted in merged:
+        while merged[evicted] in merged:
+            merged[evicted] = merged[merged[evicted]]
+    return [int(ind) for ind in np.flatnonzero(kept)], merged, radii
+
+
+def condense_gallery(gallery: TemplateGallery,
+                     budget: int,
+                     class_key: str = 'gesture',
+                     n_jobs: tp.Optional[int] = 1,
+                     executor: str = 'process') -> tp.Tuple[TemplateGallery, tp.Dict[str, tp.Any]]:
+    """
+    Condenses gallery to budget templates by merge_redundant, distances between templates
+    are computed by pairwise_gesture_distances with dp params of gallery (on n_jobs workers)
+    :param gallery: gallery to condense (it is not changed)
+    :param budget: count of templates to keep
+    :param class_key: key of metadata with class of template (templates without it are one class)
+    :return: (gallery of kept templates with their metadata, report), report contains:
+        - kept: indexes of kept templates in gallery
+        - merged: evicted index -> index (in gallery) of kept prototype
+        - coverage_radius: maximal coverage radius (heuristic estimate, see merge_redundant) of kept templates
+        - class_radii: class -> maximal coverage radius of kept templates of the class
+    """
+    classes = [metadata.get(class_key) for metadata in gallery.metadata]
+    dists = pairwise_gesture_distances(gallery.templates, np.max, n_jobs, executor, **gallery.dp_dist_params)
+    kept, merged, radii = merge_redundant(dists, classes, np.zeros(len(gallery)), budget)
+
+    condensed = TemplateGallery(coarse_factor=gallery.coarse_factor, refine_band=gallery.refine_band,
+                                **gallery.dp_dist_params)
+    class_radii = {}
+    for ind in kept:
+        condensed.add(gallery[ind], gallery.metadata[ind])
+        class_radii[classes[ind]] = max(class_radii.get(classes[ind], 0.0), float(radii[ind]))
+    report = {
+        'kept': kept,
+        'merged': merged,
+        'coverage_radius': max(class_radii.values(), default=0.0),
+        'class_radii': class_radii,
+    }
+    return condensed, report
@@ -0,0 +1,85 @@
+import os
+import json
+import tempfile
+import typing as tp
+import numpy as np
+
+from distance.gallery.template_gallery import TemplateGallery
+from distance.per_series_dist.lower_bounds import sorted_prefix_sums
+
+# file layout:
+#   MAGIC, uint64 little-endian length of json header, json header, zero padding to DATA_ALIGNMENT
+#   float32 templates (total_length, cnt_channels), concatenated along time
+#   float64 sorted prefix sums of templates (total_length + cnt_templates, cnt_channels), if header['prefix_sums']
+MAGIC = b'GESTGAL\0'
+FORMAT_VERSION = 1
+DATA_ALIGNMENT = 64
+
+
+def save_gallery(gallery: TemplateGallery, path: str) -> None:
+    """
+    Saves templates of gallery (as float32), their lengths, offsets, metadata and lower bound summaries
+    into one file, which is memory-mapped by load_gallery.
+    File is written atomically (through temporary file), so gallery may be saved to the path it was loaded from
+    """
+    templates = [np.asarray(gallery[i][:, :], dtype=np.float32) for i in range(len(gallery))]
+    cnt_channels = templates[0].shape[1] if templates else 0
+    assert all(template.shape[1] == cnt_channels for template in templates), \
+        'all templates should have the same count of channels'
+    lengths = [len(template) for template in templates]
+    with_prefix_sums = gallery.use_lower_bounds and len(templates) > 0
+    header = json.dumps({
+        'version': FORMAT_VERSION,
+        'cnt_channels': cnt_channels,
+        'lengths': lengths,
+        'offsets': np.cumsum([0] + lengths).tolist(),
+        'metadata': gallery.metadata,
+        'prefix_sums': with_prefix_sums,
+    }).encode()
+    prefix = MAGIC + np.uint64(len(header)).astype('<u8').tobytes() + header
+    # templates of loaded gallery are views of memory-mapped file, so it is replaced instead of being rewritten
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as file:
+            file.write(prefix + b'\0' * (-len(prefix) % DATA_ALIGNMENT))
+            for template in templates:
+                file.write(template.astype('<f4').tobytes())
+            if with_prefix_sums:
+                # summaries of stored (float32) templates
+                for template in templates:
+                    file.write(sorted_prefix_sums(template).astype('<f8').tobytes())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def load_gallery(path: str, **dp_dist_params) -> TemplateGallery:
+    """
+    Loads gallery saved by save_gallery, templates and prefix sums are views of memory-mapped file
+    (read-only, pages are shared by all processes loading the same file)
+    :param path: path to saved gallery
+    :param dp_dist_params: params of TemplateGallery
+    """
+    with open(path, 'rb') as file:
+        assert file.read(len(MAGIC)) == MAGIC, f'{path} is not a saved gallery'
+        header_length = int(np.frombuffer(file.read(8), dtype='<u8')[0])
+        header = json.loads(file.read(header_length))
+    assert header['version'] == FORMAT_VERSION, f'unsupported gallery format version {header["version"]}'
+    data_offset = len(MAGIC) + 8 + header_length
+    data_offset += -data_offset % DATA_ALIGNMENT
+
+    gallery = TemplateGallery(**dp_dist_params)
+    lengths, offsets, cnt_channels = header['lengths'], header['offsets'], header['cnt_channels']
+    if not lengths:
+        return gallery
+    values = np.memmap(path, dtype='<f4', mode='r', offset=data_offset, shape=(offsets[-1], cnt_channels))
+    prefix_sums = None
+    if header['prefix_sums'] and gallery.use_lower_bounds:
+        prefix_sums = np.memmap(path, dtype='<f8', mode='r', offset=data_offset + values.nbytes,
+                                shape=(offsets[-1] + len(lengths), cnt_channels))
+    for i, metadata in enumerate(header['metadata']):
+        gallery._append(values[offsets[i]:offsets[i + 1]],
+                        None if prefix_sums is None else prefix_sums[offsets[i] + i:offsets[i + 1] + i + 1],
+                        metadata)
+    return gallery
@@ -0,0 +1,215 @@
+import os
+import json
+import hashlib
+import tempfile
+import functools
+import types
+import typing as tp
+import numpy as np
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from abstract_classes.gesture_repr import GestureRepr
+from distance.per_series_dist.dp_dist import dp_multichannel_distance
+from instrumentation.call_stats import CallStats, DISABLED_STATS
+
+
+def _block_job(rows: tp.List[np.array],
+               cols: tp.List[np.array],
+               diagonal: bool,
+               dp_dist_params: tp.Dict[str, tp.Any]) -> np.array:
+    """
+    Per-channel distances (len(rows), len(cols), channels) between gestures of two blocks,
+    for diagonal block (rows is cols) only pairs above the diagonal are computed, the rest is np.nan.
+    Pairs of gestures which are not comparable (length difference > max_erases) get np.inf
+    """
+    max_erases = dp_dist_params.get('max_erases', 10)
+    block = np.full((len(rows), len(cols), rows[0].shape[1]), np.nan)
+    for i, row in enumerate(rows):
+        for j, col in enumerate(cols):
+            if diagonal and j <= i:
+                continue
+            len_a, len_b = min(len(row), len(col)), max(len(row), len(col))
+            pair_max_erases = max_erases if isinstance(max_erases, int) else max_erases(len_a, len_b)
+            if len_b - len_a > pair_max_erases:
+                block[i, j] = np.inf
+                continue
+            block[i, j] = dp_multichannel_distance(row, col, **{**dp_dist_params, 'max_erases': pair_max_erases})
+    return block
+
+
+def pairwise_gesture_distances(reprs: tp.Sequence[GestureRepr],
+                               reduce: tp.Optional[tp.Callable] = None,
+                               n_jobs: tp.Optional[int] = None,
+                               executor: str = 'process',
+                               block_size: tp.Optional[int] = None,
+                               checkpoint_dir: tp.Optional[str] = None,
+                               stats: CallStats = DISABLED_STATS,
+                               **dp_dist_params) -> np.array:
+    """
+    All-pairs dp_multichannel_distance matrix of gestures (e.g. of gallery templates for duplicate detection,
+    threshold calibration or clustering).
+    Distance is symmetric (pairwise_distance is supposed to be symmetric), so only pairs above the diagonal
+    are computed, the diagonal is 0. Gestures are split into blocks of block_size, every (row block, column block)
+    pair above the diagonal is one job, jobs are spread across workers.
+
+    Checkpointing: if checkpoint_dir is given, every finished block is saved there as .npy file
+    (with fingerprint of gestures and params, see _param_fingerprint), so interrupted run is resumed by the same call
+    and finished blocks are not recomputed. Files are kept, remove the directory when it is not needed.
+
+    :param reprs: gestures (time, channels) with equal count of channels
+    :param reduce: if not None, reduces per-channel distances, e.g. np.max (as TemplateGallery), np.mean,
+        called as reduce(distances, axis=-1)
+    :param n_jobs: count of workers (default os.cpu_count()), 1 computes blocks in this process
+    :param executor: 'process' or 'thread' (see ParallelMatcher), dp_dist_params should be picklable for 'process'
+    :param block_size: count of gestures in block (default gives about 4 jobs per worker, at most 64 gestures)
+    :param checkpoint_dir: directory for finished blocks
+    :param stats: counters blocks_computed, blocks_restored (loaded from checkpoint_dir), pairs_computed
+    :param dp_dist_params: params of dp_multichannel_distance, max_erases may be callable (as in TemplateGallery),
+        pairs of gestures with length difference > max_erases get np.inf
+    :return: (N, N, channels) array of per-channel distances or (N, N) array if reduce is given
+    """
+    assert executor in ('process', 'thread'), f'unknown executor, got {executor=}'
+    gestures = [np.asarray(gesture_repr[:, :], dtype=np.float64) for gesture_repr in reprs]
+    cnt_gestures = len(gestures)
+    cnt_channels = gestures[0].shape[1] if gestures else 0
+    assert all(gesture.shape[1] == cnt_channels for gesture in gestures), \
+        'all gestures should have the same count of channels'
+    n_jobs = os.cpu_count() if n_jobs is None else n_jobs
+    assert n_jobs >= 1, f'count of workers should be positive, got {n_jobs=}'
+    if block_size is None:
+        # k blocks per side give k * (k + 1) / 2 jobs
+        cnt_blocks = int(np.ceil(np.sqrt(8 * n_jobs)))
+        block_size = min(64, max(1, int(np.ceil(cnt_gestures / cnt_blocks))))
+    assert block_size >= 1, f'block_size should be positive, got {block_size=}'
+
+    starts = list(range(0, cnt_gestures, block_size))
+    blocks = [(row, col) for row in starts for col in starts if col >= row]
+    dists = np.zeros((cnt_gestures, cnt_gestures, cnt_channels))
+
+    def store(row: int, col: int, block: np.array) -> None:
+        rows = slice(row, row + block.shape[0])
+        cols = slice(col, col + block.shape[1])
+        if row == col:
+            upper = np.triu(np.ones(block.shape[:2], dtype=bool), k=1)
+            dists[rows, cols][upper] = block[upper]
+        else:
+            dists[rows, cols] = block
+
+    if checkpoint_dir is not None:
+        checkpoint_dir = _prepare_checkpoint_dir(checkpoint_dir, gestures, block_size, dp_dist_params)
+        finished = []
+        for row, col in blocks:
+            path = os.path.join(checkpoint_dir, f'block_{row}_{col}.npy')
+            if os.path.exists(path):
+                store(row, col, np.load(path))
+                finished.append((row, col))
+        stats.count('blocks_restored', len(finished))
+        blocks = [block for block in blocks if block not in finished]
+
+    def finish(row: int, col: int, block: np.array) -> None:
+        store(row, col, block)
+        stats.count('blocks_computed')
+        stats.count('pairs_computed', int(np.count_nonzero(~np.isnan(block[..., 0]))) if cnt_channels else 0)
+        if checkpoint_dir is not None:
+            _save_atomically(os.path.join(checkpoint_dir, f'block_{row}_{col}.npy'), block)
+
+    def job_args(row: int, col: int) -> tuple:
+        return (gestures[row:row + block_size], gestures[col:col + block_size], row == col, dp_dist_params)
+
+    if n_jobs == 1:
+        for row, col in blocks:
+            finish(row, col, _block_job(*job_args(row, col)))
+    elif blocks:
+        with (ProcessPoolExecutor(n_jobs) if executor == 'process' else ThreadPoolExecutor(n_jobs)) as pool:
+            _run_blocks(pool, blocks, job_args, finish, 2 * n_jobs)
+
+    upper = np.triu(np.ones((cnt_gestures, cnt_gestures), dtype=bool), k=1)
+    dists.transpose(1, 0, 2)[upper] = dists[upper]
+    return dists if reduce is None else reduce(dists, axis=-1)
+
+
+def _run_blocks(pool: Executor,
+                blocks: tp.List[tp.Tuple[int, int]],
+                job_args: tp.Callable[[int, int], tuple],
+                finish: tp.Callable[[int, int, np.array], None],
+                jobs_in_flight: int) -> None:
+    """ Submits blocks keeping at most jobs_in_flight of them in flight, finishes them as they complete """
+    pending: tp.Dict[Future, tp.Tuple[int, int]] = {}
+    blocks = blocks[::-1]
+    try:
+        while blocks or pending:
+            while blocks and len(pending) < jobs_in_flight:
+                row, col = blocks.pop()
+                pending[pool.submit(_block_job, *job_args(row, col))] = (row, col)
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                finish(*pending.pop(future), future.result())
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+def _prepare_checkpoint_dir(checkpoint_dir: str,
+                            gestures: tp.List[np.array],
+                            block_size: int,
+                            dp_dist_params: tp.Dict[str, tp.Any]) -> str:
+    """ Creates checkpoint_dir or checks that it was created for the same gestures, block_size and params """
+    fingerprint = hashlib.sha1()
+    for gesture in gestures:
+        fingerprint.update(np.asarray(gesture.shape, dtype=np.int64).tobytes())
+        fingerprint.update(np.ascontiguousarray(gesture).tobytes())
+    params = {key: _param_fingerprint(val) for key, val in sorted(dp_dist_params.items())}
+    meta = {'gestures': fingerprint.hexdigest(), 'block_size': block_size, 'dp_dist_params': params}
+
+    os.makedirs(checkpoint_dir, exist_ok=True)
+    meta_path = os.path.join(checkpoint_dir, 'meta.json')
+    if os.path.exists(meta_path):
+        with open(meta_path) as file:
+            assert json.load(file) == meta, \
+                f'{checkpoint_dir} contains checkpoint of other gestures, block_size or params'
+    else:
+        with open(meta_path, 'w') as file:
+            json.dump(meta, file)
+    return checkpoint_dir
+
+
+def _param_fingerprint(value: tp.Any) -> str:
+    """
+    Fingerprint of dp param stable across runs: functions are identified by module, qualified name
+    and hash of their code (with defaults and closure values), so edited function or other lambda
+    invalidates checkpoint. Functions called by the param (its globals) are not fingerprinted
+    """
+    if isinstance(value, functools.partial):
+        args = [_param_fingerprint(arg) for arg in value.args]
+        keywords = {key: _param_fingerprint(val) for key, val in sorted(value.keywords.items())}
+        return f'partial({_param_fingerprint(value.func)}, {args}, {keywords})'
+    code = getattr(value, '__code__', None)
+    if not isinstance(code, types.CodeType):
+        # builtins, ufuncs, classes and plain values
+        if callable(value) and hasattr(value, '__qualname__'):
+            return f'{getattr(value, "__module__", None)}.{value.__qualname__}'
+        return repr(value)
+    digest = hashlib.sha1()
+    _update_code_digest(digest, code)
+    digest.update(repr([_param_fingerprint(val) for val in value.__defaults__ or ()]).encode())
+    digest.update(repr([_param_fingerprint(cell.cell_contents) for cell in value.__closure__ or ()]).encode())
+    return f'{value.__module__}.{value.__qualname__}:{digest.hexdigest()}'
+
+
+def _update_code_digest(digest: tp.Any, code: types.CodeType) -> None:
+    """ Hashes bytecode, names and constants, nested code objects (lambdas, comprehensions) recursively """
+    digest.update(code.co_code)
+    digest.update(repr((code.co_names, code.co_varnames)).encode())
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            _update_code_digest(digest, const)
+        else:
+            digest.update(repr(const).encode())
+
+
+def _save_atomically(path: str, values: np.array) -> None:
+    """ Saves .npy through temporary file, so interrupted save never leaves broken block """
+    fd, tmp_path = tempfile.mkstemp(suffix='.npy.tmp', dir=os.path.dirname(path))
+    with os.fdopen(fd, 'wb') as file:
+        np.save(file, values)
+    os.replace(tmp_path, path)
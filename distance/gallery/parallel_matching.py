@@ -0,0 +1,205 @@
+import os
+import heapq
+import tempfile
+import typing as tp
+import numpy as np
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from abstract_classes.gesture_repr import GestureRepr
+from distance.gallery.template_gallery import TemplateGallery
+from distance.per_series_dist.dp_dist import dp_multichannel_distance
+from instrumentation.call_stats import CallStats, DISABLED_STATS
+
+# packed galleries opened in this (worker) process: path -> memory-mapped (total_len, channels) array
+_opened_packed_galleries: tp.Dict[str, np.array] = {}
+
+
+def _open_packed_gallery(path: str) -> np.array:
+    if path not in _opened_packed_galleries:
+        # gallery is repacked after adding templates, old versions are not needed anymore
+        _opened_packed_galleries.clear()
+        _opened_packed_galleries[path] = np.load(path, mmap_mode='r')
+    return _opened_packed_galleries[path]
+
+
+def _distance_job(template: tp.Union[np.array, tp.Tuple[str, int, int]],
+                  query: np.array,
+                  channels: slice,
+                  max_erases: int,
+                  abandon_threshold: tp.Optional[float],
+                  dp_dist_params: tp.Dict[str, tp.Any]) -> np.array:
+    """ Per-channel distances for channels of one template, template is np.array or (packed path, start, stop) """
+    if isinstance(template, tuple):
+        path, start, stop = template
+        template = _open_packed_gallery(path)[start:stop]
+    return dp_multichannel_distance(template[:, channels], query[:, channels], max_erases,
+                                    abandon_threshold=abandon_threshold, **dp_dist_params)
+
+
+class ParallelMatcher:
+    """
+    Runs TemplateGallery queries on an executor: (template x channels chunk) dp jobs are spread across workers.
+    Candidates are submitted in order of lower bound with the current radius as abandon threshold,
+    so distances are the same as in serial TemplateGallery queries.
+
+    executor:
+        - 'process': ProcessPoolExecutor, templates are packed into one .npy file (in /dev/shm if exists)
+            and memory-mapped by workers, so they are not pickled on every query.
+            dp_dist_params (except max_erases, which is resolved to int before submitting) should be picklable
+        - 'thread': ThreadPoolExecutor, numpy releases GIL only inside operations on whole dp planes,
+            useful with large max_erases or many channels
+    After the answer is known, pending jobs are cancelled, running jobs are finished and ignored.
+    stats counters are the same as in TemplateGallery, except dp_cells (dp runs in workers) and dp_abandoned.
+    """
+
+    def __init__(self,
+                 gallery: TemplateGallery,
+                 n_jobs: tp.Optional[int] = None,
+                 executor: str = 'process',
+                 channels_per_job: tp.Optional[int] = None,
+                 jobs_in_flight: tp.Optional[int] = None):
+        """
+        :param gallery: gallery of templates
+        :param n_jobs: count of workers (default os.cpu_count())
+        :param executor: 'process' or 'thread'
+        :param channels_per_job: count of channels computed by one job (default all channels)
+        :param jobs_in_flight: maximal count of submitted and not finished jobs (default 2 * n_jobs)
+        """
+        assert executor in ('process', 'thread'), f'unknown executor, got {executor=}'
+        self.gallery = gallery
+        self.n_jobs = os.cpu_count() if n_jobs is None else n_jobs
+        assert self.n_jobs >= 1, f'count of workers should be positive, got {n_jobs=}'
+        self.executor_type = executor
+        self.channels_per_job = channels_per_job
+        self.jobs_in_flight = 2 * self.n_jobs if jobs_in_flight is None else jobs_in_flight
+        self.dp_dist_params = {key: val for key, val in gallery.dp_dist_params.items() if key != 'max_erases'}
+        self._executor: tp.Optional[Executor] = None
+        self._packed_path: tp.Optional[str] = None
+        self._packed_offsets: tp.List[int] = []
+
+    def __enter__(self) -> 'ParallelMatcher':
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def set_gallery(self, gallery: TemplateGallery) -> None:
+        """ Replaces gallery (e.g. after loading it from file) """
+        self._remove_packed()
+        self.gallery = gallery
+        self.dp_dist_params = {key: val for key, val in gallery.dp_dist_params.items() if key != 'max_erases'}
+
+    def close(self) -> None:
+        """ Shuts down workers and removes packed gallery """
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+        self._remove_packed()
+
+    def has_within(self, gesture_repr: GestureRepr, radius: float, stats: CallStats = DISABLED_STATS) -> bool:
+        """ Whether some template has distance <= radius to gesture_repr """
+        return len(self._search(gesture_repr, 1, radius, first_match=True, stats=stats)) > 0
+
+    def k_nearest(self, gesture_repr: GestureRepr, k: int = 1,
+                  radius: float = np.inf, stats: CallStats = DISABLED_STATS) -> tp.List[tp.Tuple[float, int]]:
+        """ The same as TemplateGallery.k_nearest """
+        assert k >= 1, f'k should be positive, got {k=}'
+        return self._search(gesture_repr, k, radius, first_match=False, stats=stats)
+
+    def _search(self, gesture_repr: GestureRepr, k: int, radius: float,
+                first_match: bool, stats: CallStats) -> tp.List[tp.Tuple[float, int]]:
+        query = np.asarray(gesture_repr[:, :], dtype=np.float64)
+        cnt_channels = query.shape[1]
+        step = cnt_channels if self.channels_per_job is None else self.channels_per_job
+        channel_chunks = [slice(start, min(start + step, cnt_channels)) for start in range(0, cnt_channels, step)]
+
+        candidates = self.gallery.candidates(gesture_repr, stats)[::-1]
+        executor = self._get_executor()
+        nearest = []  # heap of (-dist, -ind), nearest[0] is the farthest of found
+        pending: tp.Dict[Future, int] = {}
+        template_dists: tp.Dict[int, tp.List[np.array]] = {}
+
+        def current_radius() -> float:
+            return -nearest[0][0] if len(nearest) == k else radius
+
+        try:
+            while candidates or pending:
+                while candidates and len(pending) + len(channel_chunks) <= max(self.jobs_in_flight,
+                                                                                len(channel_chunks)):
+                    lower_bound, ind = candidates[-1]
+                    if lower_bound > current_radius():
+                        stats.count('templates_pruned', len(candidates))
+                        candidates = []
+                        break
+                    candidates.pop()
+                    stats.count('templates_compared')
+                    template_dists[ind] = []
+                    max_erases = self.gallery.pair_max_erases(self.gallery.lengths[ind], len(query))
+                    for channels in channel_chunks:
+                        future = executor.submit(_distance_job, self._template_source(ind), query, channels,
+                                                 max_erases, current_radius(), self.dp_dist_params)
+                        pending[future] = ind
+                if not pending:
+                    break
+
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    ind = pending.pop(future)
+                    if ind not in template_dists:
+                        # template is already rejected by another chunk
+                        continue
+                    template_dists[ind].append(future.result())
+                    dist = max(chunk_dists.max() for chunk_dists in template_dists[ind])
+                    if dist > current_radius():
+                        self._reject(ind, pending, template_dists)
+                        continue
+                    if len(template_dists[ind]) < len(channel_chunks):
+                        continue
+                    del template_dists[ind]
+                    if len(nearest) == k:
+                        # the farthest by (distance, index) is dropped, so ties don't depend on order of completion
+                        heapq.heappushpop(nearest, (-dist, -ind))
+                    else:
+                        heapq.heappush(nearest, (-dist, -ind))
+                    if first_match:
+                        return [(dist, ind)]
+        finally:
+            for future in pending:
+                future.cancel()
+        return sorted((-neg_dist, -neg_ind) for neg_dist, neg_ind in nearest)
+
+    @staticmethod
+    def _reject(ind: int, pending: tp.Dict[Future, int], template_dists: tp.Dict[int, tp.List[np.array]]) -> None:
+        del template_dists[ind]
+        for future, future_ind in pending.items():
+            if future_ind == ind:
+                future.cancel()
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            self._executor = (ProcessPoolExecutor(self.n_jobs) if self.executor_type == 'process'
+                              else ThreadPoolExecutor(self.n_jobs))
+        return self._executor
+
+    def _template_source(self, ind: int) -> tp.Union[np.array, tp.Tuple[str, int, int]]:
+        if self.executor_type == 'thread':
+            return np.asarray(self.gallery[ind][:, :], dtype=np.float64)
+        if len(self._packed_offsets) != len(self.gallery) + 1:
+            self._pack()
+        return self._packed_path, self._packed_offsets[ind], self._packed_offsets[ind + 1]
+
+    def _pack(self) -> None:
+        """ Writes all templates into one .npy file, workers memory-map it """
+        self._remove_packed()
+        templates = [np.asarray(self.gallery[i][:, :], dtype=np.float64) for i in range(len(self.gallery))]
+        self._packed_offsets = [0] + list(np.cumsum([len(template) for template in templates]))
+        shm_dir = '/dev/shm' if os.path.isdir('/dev/shm') else None
+        fd, self._packed_path = tempfile.mkstemp(prefix='gesture_gallery_', suffix='.npy', dir=shm_dir)
+        with os.fdopen(fd, 'wb') as file:
+            np.save(file, np.concatenate(templates))
+
+    def _remove_packed(self) -> None:
+        if self._packed_path is not None:
+            os.remove(self._packed_path)
+            self._packed_path = None
+            self._packed_offsets = []
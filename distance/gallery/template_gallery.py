@@ -0,0 +1,238 @@
+import heapq
+import collections
+import typing as tp
+import numpy as np
+
+from abstract_classes.gesture_repr import GestureRepr
+from instrumentation.call_stats import CallStats, DISABLED_STATS
+from distance.per_series_dist.dp_dist import dp_multichannel_distance, abs_diff
+from distance.per_series_dist.lower_bounds import erase_tolerant_envelope, sorted_prefix_sums, \
+    dp_sum_lower_bound, dp_envelope_lower_bound
+from distance.per_series_dist.multires_dp import piecewise_aggregate, coarse_max_erases, is_decided_by_coarse
+
+
+class TemplateGallery:
+    """
+    Index of valid gestures (templates) for threshold and k nearest neighbours queries
+    by distance max(dp_multichannel_distance(template, query)).
+
+    Summaries are precomputed when template is added:
+        - length (templates are grouped in buckets by length,
+          buckets with length not comparable with query length are skipped: there is no dp with such max_erases.
+          Such templates are never matched, while dp_multichannel_distance raises AssertionError for them)
+        - sorted prefix sums of channels (O(max_erases) dp_sum_lower_bound)
+        - erase tolerant envelopes (dp_envelope_lower_bound), cached by envelope window, with callable max_erases
+          window depends on query length, so only max_cached_envelopes last used windows are kept per template
+    Candidates are checked in order of lower bound, exact dp is computed only if lower bound doesn't prune
+    the template and is abandoned as soon as it exceeds current radius.
+    Lower bounds are admissible only for abs_diff pairwise_distance, with other distances they are not used.
+
+    Coarse-to-fine mode (coarse_factor is not None): threshold queries first compute dp of templates and query
+    downsampled by coarse_factor (see multires_dp_distance), exact dp is computed only if coarse distance
+    is within refine_band around the threshold, otherwise coarse distance is used (approximate answers).
+
+    Queries count work in stats (if given): templates_incomparable (skipped by length),
+    templates_pruned (skipped by lower bound), templates_compared (exact dp), dp_abandoned, dp_cells,
+    in coarse-to-fine mode coarse_decided and refined.
+    """
+    # dp is computed in float32, lower bound is relaxed to never prune template because of rounding
+    lower_bound_rtol = 1e-3
+    # envelopes of template are kept for this count of the last used windows
+    max_cached_envelopes = 4
+
+    def __init__(self, coarse_factor: tp.Optional[int] = None, refine_band: float = 0.5, **dp_dist_params):
+        """
+        :param coarse_factor: downsampling factor of coarse-to-fine mode, None to compute only exact dp
+        :param refine_band: relative half-width of band around threshold where coarse distances are refined
+        :param dp_dist_params: params of dp_multichannel_distance
+        """
+        assert coarse_factor is None or coarse_factor >= 1, f'coarse_factor should be positive, got {coarse_factor=}'
+        self.coarse_factor = coarse_factor
+        self.refine_band = refine_band
+        self.dp_dist_params = dp_dist_params
+        self.max_erases = dp_dist_params.get('max_erases', 10)
+        self.use_lower_bounds = dp_dist_params.get('pairwise_distance', abs_diff) is abs_diff
+        self.templates = []
+        self.lengths = []
+        self.metadata = []
+        self.prefix_sums = []
+        self.envelopes = []
+        self.coarse_templates = []
+        self.length_buckets: tp.Dict[int, tp.List[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self.templates)
+
+    def __getitem__(self, ind: int) -> GestureRepr:
+        return self.templates[ind]
+
+    def add(self, gesture_repr: GestureRepr, metadata: tp.Optional[tp.Dict[str, tp.Any]] = None) -> int:
+        """
+        Adds template and precomputes its summaries, returns index of template
+        :param gesture_repr: template
+        :param metadata: json-serializable info about template (e.g. source video, user)
+        """
+        values = np.asarray(gesture_repr[:, :], dtype=np.float64)
+        ind = self._append(gesture_repr, sorted_prefix_sums(values) if self.use_lower_bounds else None, metadata)
+        if self.use_lower_bounds:
+            self._envelope(ind, self.pair_max_erases(len(values), len(values)))
+        return ind
+
+    def remove(self, indexes: tp.Iterable[int]) -> None:
+        """
+        Removes templates, summaries of the rest (prefix sums, envelopes, coarse templates) are kept,
+        the rest templates get consecutive indexes in the same order
+        """
+        removed = set(indexes)
+        kept = [ind for ind in range(len(self)) if ind not in removed]
+        self.templates = [self.templates[ind] for ind in kept]
+        self.lengths = [self.lengths[ind] for ind in kept]
+        self.metadata = [self.metadata[ind] for ind in kept]
+        self.prefix_sums = [self.prefix_sums[ind] for ind in kept]
+        self.envelopes = [self.envelopes[ind] for ind in kept]
+        self.coarse_templates = [self.coarse_templates[ind] for ind in kept]
+        self.length_buckets = {}
+        for ind, length in enumerate(self.lengths):
+            self.length_buckets.setdefault(length, []).append(ind)
+
+    def distance(self, ind: int, gesture_repr: GestureRepr, abandon_threshold: tp.Optional[float] = None,
+                 stats: CallStats = DISABLED_STATS, refine_threshold: tp.Optional[float] = None) -> float:
+        """
+        Exact distance between template and gesture (np.inf if abandoned),
+        in coarse-to-fine mode with refine_threshold: coarse distance if it is outside of refine band
+        (coarse dp is abandoned above both the band and abandon_threshold, so k_nearest gets coarse distances
+        of templates far from the threshold instead of np.inf)
+        """
+        if self.coarse_factor is not None and refine_threshold is not None:
+            coarse_abandon = None if abandon_threshold is None \
+                else max(abandon_threshold, refine_threshold * (1.0 + self.refine_band))
+            coarse_dist = self.coarse_distance(ind, gesture_repr, coarse_abandon, stats)
+            if is_decided_by_coarse(coarse_dist, refine_threshold, self.refine_band):
+                stats.count('coarse_decided')
+                return coarse_dist
+            stats.count('refined')
+        dist = dp_multichannel_distance(self.templates[ind][:, :], gesture_repr[:, :],
+                                        abandon_threshold=abandon_threshold,
+                                        stats=stats if stats.enabled else None, **self.dp_dist_params).max()
+        stats.count('templates_compared')
+        if dist == np.inf:
+            stats.count('dp_abandoned')
+        return dist
+
+    def coarse_distance(self, ind: int, gesture_repr: GestureRepr, abandon_threshold: tp.Optional[float] = None,
+                        stats: CallStats = DISABLED_STATS) -> float:
+        """ Distance between template and gesture downsampled by coarse_factor (np.inf if abandoned) """
+        max_erases = self.pair_max_erases(self.lengths[ind], len(gesture_repr))
+        params = {**self.dp_dist_params, 'max_erases': coarse_max_erases(max_erases, self.coarse_factor)}
+        return dp_multichannel_distance(self.coarse_template(ind),
+                                        piecewise_aggregate(gesture_repr[:, :], self.coarse_factor),
+                                        abandon_threshold=abandon_threshold,
+                                        stats=stats if stats.enabled else None, **params).max()
+
+    def has_within(self, gesture_repr: GestureRepr, radius: float, stats: CallStats = DISABLED_STATS) -> bool:
+        """ Whether some template has distance <= radius to gesture_repr (radius is refine threshold) """
+        candidates = self.candidates(gesture_repr, stats)
+        for cnt_checked, (lower_bound, ind) in enumerate(candidates):
+            if lower_bound > radius:
+                stats.count('templates_pruned', len(candidates) - cnt_checked)
+                break
+            if self.distance(ind, gesture_repr, radius, stats, refine_threshold=radius) <= radius:
+                return True
+        return False
+
+    def k_nearest(self, gesture_repr: GestureRepr, k: int = 1,
+                  radius: float = np.inf, stats: CallStats = DISABLED_STATS,
+                  refine_threshold: tp.Optional[float] = None) -> tp.List[tp.Tuple[float, int]]:
+        """
+        Finds k nearest templates (with distance <= radius)
+        :param refine_threshold: threshold of coarse-to-fine mode, distances are exact if None,
+            else distances outside of refine band are coarse ones (approximate, but finite)
+        :return: list of (distance, template index) sorted by distance, ties are broken by index
+        """
+        assert k >= 1, f'k should be positive, got {k=}'
+        nearest = []  # heap of (-dist, -ind), nearest[0] is the farthest of found
+        candidates = self.candidates(gesture_repr, stats)
+        for cnt_checked, (lower_bound, ind) in enumerate(candidates):
+            current_radius = -nearest[0][0] if len(nearest) == k else radius
+            if lower_bound > current_radius:
+                stats.count('templates_pruned', len(candidates) - cnt_checked)
+                break
+            dist = self.distance(ind, gesture_repr, current_radius, stats, refine_threshold)
+            if dist > current_radius:
+                continue
+            if len(nearest) == k:
+                # the farthest by (distance, index) is dropped, so ties don't depend on order of candidates
+                heapq.heappushpop(nearest, (-dist, -ind))
+            else:
+                heapq.heappush(nearest, (-dist, -ind))
+        return sorted((-neg_dist, -neg_ind) for neg_dist, neg_ind in nearest)
+
+    def pair_max_erases(self, len_a: int, len_b: int) -> int:
+        len_a, len_b = min(len_a, len_b), max(len_a, len_b)
+        return self.max_erases if isinstance(self.max_erases, int) else self.max_erases(len_a, len_b)
+
+    def template_prefix_sums(self, ind: int) -> np.array:
+        """ sorted_prefix_sums of template (computed lazily, if not given on loading) """
+        if self.prefix_sums[ind] is None:
+            self.prefix_sums[ind] = sorted_prefix_sums(self.templates[ind][:, :])
+        return self.prefix_sums[ind]
+
+    def coarse_template(self, ind: int) -> np.array:
+        """ Template downsampled by coarse_factor (computed lazily) """
+        if self.coarse_templates[ind] is None:
+            self.coarse_templates[ind] = piecewise_aggregate(self.templates[ind][:, :], self.coarse_factor)
+        return self.coarse_templates[ind]
+
+    def _append(self, gesture_repr: GestureRepr, prefix_sums: tp.Optional[np.array],
+                metadata: tp.Optional[tp.Dict[str, tp.Any]]) -> int:
+        ind = len(self.templates)
+        self.templates.append(gesture_repr)
+        self.lengths.append(len(gesture_repr))
+        self.metadata.append({} if metadata is None else metadata)
+        self.prefix_sums.append(prefix_sums)
+        self.envelopes.append(collections.OrderedDict())
+        self.coarse_templates.append(None)
+        self.length_buckets.setdefault(len(gesture_repr), []).append(ind)
+        return ind
+
+    def _envelope(self, ind: int, window: int) -> tp.Tuple[np.array, np.array]:
+        """ Envelope of template with enough points for any comparable gesture (LRU cache by window) """
+        envelopes = self.envelopes[ind]
+        if window in envelopes:
+            envelopes.move_to_end(window)
+        else:
+            values = np.asarray(self.templates[ind][:, :], dtype=np.float64)
+            envelopes[window] = erase_tolerant_envelope(values, window, len(values) + window)
+            if len(envelopes) > self.max_cached_envelopes:
+                envelopes.popitem(last=False)
+        return envelopes[window]
+
+    def candidates(self, gesture_repr: GestureRepr,
+                   stats: CallStats = DISABLED_STATS) -> tp.List[tp.Tuple[float, int]]:
+        """
+        Comparable templates with lower bounds of distance, sorted by lower bound (then by index),
+        templates with length not comparable with query length are skipped (templates_incomparable counter)
+        """
+        values = np.asarray(gesture_repr[:, :], dtype=np.float64)
+        length = len(values)
+        query_prefix_sums = sorted_prefix_sums(values) if self.use_lower_bounds else None
+        query_envelopes = {}
+        candidates = []
+        for bucket_length, bucket in self.length_buckets.items():
+            max_erases = self.pair_max_erases(bucket_length, length)
+            if abs(bucket_length - length) > max_erases:
+                continue
+            if not self.use_lower_bounds:
+                candidates.extend((-np.inf, ind) for ind in bucket)
+                continue
+            if max_erases not in query_envelopes:
+                query_envelopes[max_erases] = erase_tolerant_envelope(values, max_erases, length + max_erases)
+            for ind in bucket:
+                lower_bound = max(dp_sum_lower_bound(self.template_prefix_sums(ind), query_prefix_sums,
+                                                     max_erases).max(),
+                                  dp_envelope_lower_bound(self.templates[ind][:, :], values, max_erases,
+                                                          self._envelope(ind, max_erases),
+                                                          query_envelopes[max_erases]).max())
+                candidates.append((lower_bound * (1.0 - self.lower_bound_rtol), ind))
+        stats.count('templates_incomparable', len(self) - len(candidates))
+        return sorted(candidates)
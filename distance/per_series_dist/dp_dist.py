@@ -1,15 +1,42 @@
 import numpy as np
 import typing as tp
 
+from instrumentation.call_stats import CallStats
+
+
+def abs_diff(x: tp.Any, y: tp.Any) -> tp.Any:
+    """ Absolute difference between samples, works elementwise on np.arrays """
+    return np.abs(x - y)
+
+
+def neighbour_diff_erase_cost(x: tp.Sequence, ind: tp.Any) -> tp.Any:
+    """
+    Cost of erasing x[ind]: tenth of the absolute difference with the next element (0 for the last element).
+    ind may be an int or np.array of indexes.
+    """
+    x = np.asarray(x)
+    ind = np.asarray(ind)
+    has_next = ind + 1 < len(x)
+    next_ind = np.where(has_next, ind + 1, ind)
+    # multichannel x: (len, channels), broadcast mask over channels
+    has_next = has_next.reshape(has_next.shape + (1,) * (x.ndim - 1))
+    return np.where(has_next, np.abs(x[next_ind] - x[ind]) / 10.0, 0.0)
+
+
+# callables that accept np.arrays (pairwise_distance) or arrays of indexes (erase_cost)
+VECTORIZED_FUNCS = {abs_diff, neighbour_diff_erase_cost}
+
 
 def dp_time_series_distance(a: tp.Sequence,
                             b: tp.Sequence,
                             max_erases: tp.Union[int, tp.Callable[[int, int], int]] = 10,
-                            pairwise_distance: tp.Callable = lambda x, y: np.abs(x - y),
-                            erase_cost: tp.Callable[[tp.Sequence, int], tp.Any]
-                            = lambda x, ind: abs(x[ind + 1] - x[ind]) / 10.0 if ind + 1 < len(x) else 0.0,
+                            pairwise_distance: tp.Callable = abs_diff,
+                            erase_cost: tp.Callable[[tp.Sequence, int], tp.Any] = neighbour_diff_erase_cost,
                             inf_const: tp.Any = 1e18,
-                            dp_dtype: np.dtype = np.float32) -> tp.Any:
+                            dp_dtype: np.dtype = np.float32,
+                            engine: str = 'auto',
+                            abandon_threshold: tp.Optional[float] = None,
+                            return_alignment: bool = False) -> tp.Any:
     """
     computes distance like longest common subsecuence dp:
         from each sequence can erase any max_erases elements (with shift)
@@ -29,14 +56,229 @@ def dp_time_series_distance(a: tp.Sequence,
     :param erase_cost: cost of erasing element from time series
     :param inf_const: const used to initialise dp (very large constant), (inf_const >= dp).all()
     :param dp_dtype: type of elements of dp
-    :return: minimal average distance
+    :param engine: dp implementation
+            - 'python': loops over every state, calls pairwise_distance and erase_cost once per transition
+            - 'numpy': sweeps whole (a_shift, b_shift) planes, pairwise_distance and erase_cost
+                       must accept np.arrays (pairwise_distance(x, y) elementwise, erase_cost(x, index_array))
+            - 'auto': 'numpy' if both functions are in VECTORIZED_FUNCS, else 'python'
+    :param abandon_threshold: if not None, dp is stopped as soon as the answer surely exceeds abandon_threshold
+            (minimal average over current a_id plane is a lower bound, costs are supposed to be nonnegative)
+    :param return_alignment: if True, optimal alignment is recovered too (see dp_alignment), numpy engine only
+    :return: minimal average distance (np.inf if abandoned),
+            with return_alignment: (distance, alignment) (alignment is None if abandoned)
+
+    Both engines keep only two a_id planes in memory, O(max_erases^2) instead of the whole dp tensor.
+    """
+    if return_alignment:
+        dist, alignments = dp_alignment(np.asarray(a)[:, None], np.asarray(b)[:, None], max_erases,
+                                        pairwise_distance, erase_cost, inf_const, dp_dtype, engine,
+                                        abandon_threshold)
+        return dist[0], None if alignments is None else alignments[0]
+    len_a = len(a)
+    len_b = len(b)
+    if len_a > len_b:
+        a, b = b, a
+        len_a, len_b = len_b, len_a
+    max_erases = resolve_max_erases(max_erases, len_a, len_b)
+    engine = _resolve_engine(engine, pairwise_distance, erase_cost)
+
+    if engine == 'numpy':
+        last_plane = _numpy_dp_last_plane(np.asarray(a)[:, None], np.asarray(b)[:, None], max_erases,
+                                          pairwise_distance, erase_cost, inf_const, dp_dtype, abandon_threshold)
+        last_plane = None if last_plane is None else last_plane[0]
+    else:
+        last_plane = _python_dp_last_plane(a, b, max_erases, pairwise_distance, erase_cost, inf_const, dp_dtype,
+                                           abandon_threshold)
+    if last_plane is None:
+        return np.inf
+    return _min_average_distance(last_plane, len_a, len_b, max_erases)
+
+
+def dp_multichannel_distance(a: np.array,
+                             b: np.array,
+                             max_erases: tp.Union[int, tp.Callable[[int, int], int]] = 10,
+                             pairwise_distance: tp.Callable = abs_diff,
+                             erase_cost: tp.Callable[[tp.Sequence, int], tp.Any] = neighbour_diff_erase_cost,
+                             inf_const: tp.Any = 1e18,
+                             dp_dtype: np.dtype = np.float32,
+                             engine: str = 'auto',
+                             abandon_threshold: tp.Optional[float] = None,
+                             stats: tp.Optional[CallStats] = None,
+                             return_alignment: bool = False) -> tp.Any:
     """
+    dp_time_series_distance for every channel of two multichannel time series at once.
+    With numpy engine all channels are swept in lockstep over one (channels, max_erases+1, max_erases+1) plane,
+    so loop overhead is paid once per pair of series instead of once per channel.
+
+    :param a: first time series, 2d np.array (time, channels)
+    :param b: second time series, 2d np.array (time, channels)
+    :param abandon_threshold: if not None, dp is stopped as soon as distance of some channel
+            surely exceeds abandon_threshold (so maximum over channels exceeds it too)
+    other params are the same as in dp_time_series_distance
+    :param stats: if not None, count of evaluated dp cells is added to its dp_cells counter
+    :param return_alignment: if True, optimal alignment of every channel is recovered too (see dp_alignment)
+    :return: np.array of per-channel distances, shape (channels,) (all np.inf if abandoned),
+            with return_alignment: (distances, list of per-channel alignments) (None if abandoned)
+    """
+    if return_alignment:
+        return dp_alignment(a, b, max_erases, pairwise_distance, erase_cost, inf_const, dp_dtype, engine,
+                            abandon_threshold, stats=stats)
+    a = np.asarray(a)
+    b = np.asarray(b)
+    assert a.ndim == 2 and b.ndim == 2 and a.shape[1] == b.shape[1], \
+        f'expected two 2d arrays (time, channels) with equal count of channels, got {a.shape=}, {b.shape=}'
     len_a = len(a)
     len_b = len(b)
     if len_a > len_b:
         a, b = b, a
         len_a, len_b = len_b, len_a
+    max_erases = resolve_max_erases(max_erases, len_a, len_b)
+    engine = _resolve_engine(engine, pairwise_distance, erase_cost)
+
+    if engine == 'numpy':
+        last_plane = _numpy_dp_last_plane(a, b, max_erases, pairwise_distance, erase_cost, inf_const, dp_dtype,
+                                          abandon_threshold, stats)
+    else:
+        last_plane = []
+        for i in range(a.shape[1]):
+            last_plane.append(_python_dp_last_plane(a[:, i], b[:, i], max_erases, pairwise_distance, erase_cost,
+                                                    inf_const, dp_dtype, abandon_threshold, stats))
+            if last_plane[-1] is None:
+                last_plane = None
+                break
+    if last_plane is None:
+        return np.full(a.shape[1], np.inf)
+    return _min_average_distance(np.array(last_plane), len_a, len_b, max_erases)
+
+
+def dp_alignment(a: np.array,
+                 b: np.array,
+                 max_erases: tp.Union[int, tp.Callable[[int, int], int]] = 10,
+                 pairwise_distance: tp.Callable = abs_diff,
+                 erase_cost: tp.Callable[[tp.Sequence, int], tp.Any] = neighbour_diff_erase_cost,
+                 inf_const: tp.Any = 1e18,
+                 dp_dtype: np.dtype = np.float32,
+                 engine: str = 'auto',
+                 abandon_threshold: tp.Optional[float] = None,
+                 checkpoint_step: tp.Optional[int] = None,
+                 stats: tp.Optional[CallStats] = None) -> tp.Tuple[np.array, tp.Optional[tp.List[tp.Dict]]]:
+    """
+    dp_multichannel_distance with optimal alignment of every channel (e.g. to see why gesture is rejected).
+    Checkpointing: forward pass keeps every checkpoint_step-th a_id plane, then path is traced back
+    segment by segment from the final state, planes of a segment are recomputed from its first checkpoint.
+    Memory is O((len / checkpoint_step + checkpoint_step) * (max_erases+1)^2 * channels),
+    O(sqrt(len)) planes with default checkpoint_step, time is about twice the time of the distance.
+
+    :param checkpoint_step: distance between checkpoint planes, round(sqrt(len)) if None
+    other params are the same as in dp_multichannel_distance,
+    pairwise_distance and erase_cost should accept np.arrays (see VECTORIZED_FUNCS)
+    :return: (per-channel distances, per-channel alignments), alignments are None if abandoned,
+            alignment is dict of np.arrays of indexes in a and b (in the order of input series):
+                - matched: (cnt_matched, 2) pairs (a index, b index)
+                - erased_a: erased elements of a
+                - erased_b: erased elements of b
+    """
+    a = np.asarray(a)
+    b = np.asarray(b)
+    assert a.ndim == 2 and b.ndim == 2 and a.shape[1] == b.shape[1], \
+        f'expected two 2d arrays (time, channels) with equal count of channels, got {a.shape=}, {b.shape=}'
+    swapped = len(a) > len(b)
+    if swapped:
+        a, b = b, a
+    len_a, cnt_channels = a.shape
+    len_b = len(b)
+    max_erases = resolve_max_erases(max_erases, len_a, len_b)
+    engine = _resolve_engine(engine, pairwise_distance, erase_cost)
+    assert engine == 'numpy', f'alignment is recovered by numpy engine only, got {engine=}'
+    # with max_erases >= len_a the answer may be normalised by nonpositive count (see _exceeds_threshold)
+    assert max_erases < len_a, f'alignment needs max_erases < length of series, got {max_erases=}, {len_a=}'
+    if checkpoint_step is None:
+        checkpoint_step = max(1, int(round(np.sqrt(len_a))))
+    assert checkpoint_step >= 1, f'checkpoint_step should be positive, got {checkpoint_step=}'
+
+    checkpoints = {}
+    for a_id, plane in _numpy_dp_planes(a, b, max_erases, pairwise_distance, erase_cost, inf_const, dp_dtype):
+        if a_id % checkpoint_step == 0:
+            checkpoints[a_id] = plane
+        if _exceeds_threshold(plane, len_a, abandon_threshold).any():
+            _count_cells(stats, a_id + 1, max_erases, cnt_channels)
+            return np.full(cnt_channels, np.inf), None
+    _count_cells(stats, len_a + 1, max_erases, cnt_channels)
+    dists = _min_average_distance(plane, len_a, len_b, max_erases)
+
+    # final state of every channel: the best a_shift of the last plane
+    len_diff = len_b - len_a
+    a_shifts = np.arange(max(0, -len_diff), min(max_erases + 1, max_erases - len_diff + 1))
+    finals = plane[:, a_shifts, a_shifts + len_diff] / (len_a - a_shifts)
+    states = [(len_a, int(a_shifts[s]), int(a_shifts[s]) + len_diff) for s in np.argmin(finals, axis=-1)]
+    paths = [[] for _ in range(cnt_channels)]
+
+    a_erase = np.asarray(erase_cost(a, np.arange(len_a)), dtype=np.float64)
+    b_erase = np.asarray(erase_cost(b, np.arange(len_b)), dtype=np.float64)
+    for start in sorted(checkpoints, reverse=True):
+        if start == len_a:
+            continue
+        stop = min(start + checkpoint_step, len_a)
+        segment = {start: checkpoints[start]}
+        segment.update(_numpy_dp_planes(a, b, max_erases, pairwise_distance, erase_cost, inf_const, dp_dtype,
+                                        start, checkpoints[start], stop))
+        for channel in range(cnt_channels):
+            states[channel] = _trace_back(segment, start, channel, states[channel], a, b, a_erase, b_erase,
+                                          pairwise_distance, paths[channel])
+    # planes of segments are computed twice
+    _count_cells(stats, len_a, max_erases, cnt_channels)
 
+    alignments = []
+    for path in paths:
+        path.reverse()
+        matched = np.array([(a_id, b_id) for move, a_id, b_id in path if move == 'match'], dtype=int).reshape(-1, 2)
+        erased_a = np.array([a_id for move, a_id, _ in path if move == 'erase_a'], dtype=int)
+        erased_b = np.array([b_id for move, _, b_id in path if move == 'erase_b'], dtype=int)
+        if swapped:
+            matched, erased_a, erased_b = matched[:, ::-1], erased_b, erased_a
+        alignments.append({'matched': matched, 'erased_a': erased_a, 'erased_b': erased_b})
+    return dists, alignments
+
+
+def _trace_back(planes: tp.Dict[int, np.array],
+                start: int,
+                channel: int,
+                state: tp.Tuple[int, int, int],
+                a: np.array,
+                b: np.array,
+                a_erase: np.array,
+                b_erase: np.array,
+                pairwise_distance: tp.Callable,
+                path: tp.List[tp.Tuple[str, int, int]]) -> tp.Tuple[int, int, int]:
+    """
+    Traces optimal path of channel back from state while its a_id > start (planes[start..a_id] are given),
+    appends moves (move, a_id, b_id) to path, returns the first state with a_id == start
+    (predecessor of it may be in plane start - 1, so it is traced in the previous segment).
+    Predecessor is the one whose value plus transition cost is the closest to the value of state
+    (the same as equal up to rounding of dp_dtype).
+    """
+    a_id, a_shift, b_shift = state
+    # a_id == 0: only erases from b are left
+    while a_id > start or (a_id == 0 and b_shift > 0):
+        value = float(planes[a_id][channel, a_shift, b_shift])
+        b_id = a_id - a_shift + b_shift
+        candidates = []
+        if b_shift > 0:
+            candidates.append(('erase_b', (a_id, a_shift, b_shift - 1), b_erase[b_id - 1, channel]))
+        if a_id > start and b_id > 0 and a_id - 1 >= a_shift:
+            candidates.append(('match', (a_id - 1, a_shift, b_shift),
+                               np.asarray(pairwise_distance(a[a_id - 1], b[b_id - 1]))[channel]))
+        if a_id > start and a_shift > 0:
+            candidates.append(('erase_a', (a_id - 1, a_shift - 1, b_shift), a_erase[a_id - 1, channel]))
+        move, prev, _ = min(candidates,
+                            key=lambda candidate: abs(float(planes[candidate[1][0]][(channel,) + candidate[1][1:]])
+                                                      + candidate[2] - value))
+        path.append((move, a_id - 1, b_id - 1))
+        a_id, a_shift, b_shift = prev
+    return a_id, a_shift, b_shift
+
+
+def resolve_max_erases(max_erases: tp.Union[int, tp.Callable[[int, int], int]], len_a: int, len_b: int) -> int:
     if isinstance(max_erases, int):
         assert max_erases >= 0, \
             f'count of erase operations should be a nonnegative integer or function(int,int)->int, got {max_erases=}'
@@ -44,40 +286,175 @@ def dp_time_series_distance(a: tp.Sequence,
         max_erases = max_erases(len_a, len_b)
 
     assert abs(len_a - len_b) <= max_erases, \
-        f'time series are not comparable, try increase max_erases. Got {len(a)=}, {len(b)=}, {max_erases=}'
+        f'time series are not comparable, try increase max_erases. Got {len_a=}, {len_b=}, {max_erases=}'
+    return max_erases
+
+
+def _resolve_engine(engine: str, pairwise_distance: tp.Callable, erase_cost: tp.Callable) -> str:
+    assert engine in ('auto', 'python', 'numpy'), f'unknown dp engine, got {engine=}'
+    if engine == 'auto':
+        engine = 'numpy' if pairwise_distance in VECTORIZED_FUNCS and erase_cost in VECTORIZED_FUNCS else 'python'
+    return engine
+
 
-    dp: np.array = np.ones((len_a + 1, max_erases + 1, max_erases + 1)) * inf_const
-    dp = dp.astype(dp_dtype)
-    dp[0][0][0] = 0
+def _python_dp_last_plane(a: tp.Sequence,
+                          b: tp.Sequence,
+                          max_erases: int,
+                          pairwise_distance: tp.Callable,
+                          erase_cost: tp.Callable,
+                          inf_const: tp.Any,
+                          dp_dtype: np.dtype,
+                          abandon_threshold: tp.Optional[float] = None,
+                          stats: tp.Optional[CallStats] = None) -> tp.Optional[np.array]:
+    """
+    Reference dp, returns dp[len_a] plane (len(a) <= len(b)) or None if abandoned.
+    Only planes of the current and the next a_id are kept in memory
+    """
+    len_a = len(a)
+    len_b = len(b)
+    plane = np.full((max_erases + 1, max_erases + 1), inf_const, dtype=dp_dtype)
+    plane[0][0] = 0
 
     for a_id in range(len_a + 1):
+        next_plane = np.full((max_erases + 1, max_erases + 1), inf_const, dtype=dp_dtype)
         for a_shift in range(max_erases + 1):
             if a_id < a_shift:
                 break
             for b_shift in range(max_erases + 1):
                 b_id = a_id - a_shift + b_shift
                 if a_id < len_a and b_id < len_b:
-                    dp[a_id + 1, a_shift, b_shift] = min(dp[a_id + 1, a_shift, b_shift],
-                                                         dp[a_id, a_shift, b_shift]
-                                                         + pairwise_distance(a[a_id], b[b_id]))
+                    next_plane[a_shift, b_shift] = min(next_plane[a_shift, b_shift],
+                                                       plane[a_shift, b_shift] + pairwise_distance(a[a_id], b[b_id]))
 
                 if a_shift < max_erases and a_id < len_a:
-                    dp[a_id + 1, a_shift + 1, b_shift] = min(dp[a_id + 1, a_shift + 1, b_shift],
-                                                             dp[a_id, a_shift, b_shift]
-                                                             + erase_cost(a, a_id))
+                    next_plane[a_shift + 1, b_shift] = min(next_plane[a_shift + 1, b_shift],
+                                                           plane[a_shift, b_shift] + erase_cost(a, a_id))
 
                 if b_shift < max_erases and b_id < len_b:
-                    dp[a_id, a_shift, b_shift + 1] = min(dp[a_id, a_shift, b_shift + 1],
-                                                         dp[a_id, a_shift, b_shift]
-                                                         + erase_cost(b, b_id))
+                    plane[a_shift, b_shift + 1] = min(plane[a_shift, b_shift + 1],
+                                                      plane[a_shift, b_shift] + erase_cost(b, b_id))
+        if _exceeds_threshold(plane, len_a, abandon_threshold).any():
+            _count_cells(stats, a_id + 1, max_erases, 1)
+            return None
+        if a_id < len_a:
+            plane = next_plane
+    _count_cells(stats, len_a + 1, max_erases, 1)
+    return plane
+
+
+def _numpy_dp_last_plane(a: np.array,
+                         b: np.array,
+                         max_erases: int,
+                         pairwise_distance: tp.Callable,
+                         erase_cost: tp.Callable,
+                         inf_const: tp.Any,
+                         dp_dtype: np.dtype,
+                         abandon_threshold: tp.Optional[float] = None,
+                         stats: tp.Optional[CallStats] = None) -> tp.Optional[np.array]:
+    """
+    Same dp as _python_dp_last_plane for every channel of a, b (shapes (len, channels)),
+    computed plane by plane by _numpy_dp_planes. Returns None if abandoned.
+    """
+    len_a, cnt_channels = a.shape
+    for a_id, plane in _numpy_dp_planes(a, b, max_erases, pairwise_distance, erase_cost, inf_const, dp_dtype):
+        if _exceeds_threshold(plane, len_a, abandon_threshold).any():
+            _count_cells(stats, a_id + 1, max_erases, cnt_channels)
+            return None
+    _count_cells(stats, len_a + 1, max_erases, cnt_channels)
+    return plane
+
 
+def _numpy_dp_planes(a: np.array,
+                     b: np.array,
+                     max_erases: int,
+                     pairwise_distance: tp.Callable,
+                     erase_cost: tp.Callable,
+                     inf_const: tp.Any,
+                     dp_dtype: np.dtype,
+                     start: int = 0,
+                     start_plane: tp.Optional[np.array] = None,
+                     stop: tp.Optional[int] = None) -> tp.Iterator[tp.Tuple[int, np.array]]:
+    """
+    Yields (a_id, plane) of dp for a_id in [start, stop] (without start if start_plane of it is given),
+    planes are (channels, max_erases+1, max_erases+1):
+        - erase from b moves along b_shift inside plane, computed as prefix minimum with cumulative erase costs
+        - match and erase from a move to the next plane, computed with shifted whole-plane operations
+    Only two planes are kept in memory, pairwise distances of the next plane are computed on the fly,
+    so memory doesn't depend on length of series (except of O(len) erase costs).
+    States with b_id > len(b) are unreachable in the reference dp, here they get finite garbage values,
+    but the answer never depends on them (b_id never decreases).
+    """
+    len_a, cnt_channels = a.shape
+    len_b = len(b)
+    n = max_erases + 1
+    stop = len_a if stop is None else stop
+
+    # pad b-indexed costs: b_id in [a_id - max_erases, a_id + max_erases] is mapped to b_id + max_erases
+    b_pad_erase = np.zeros((len_b + 2 * n, cnt_channels), dtype=np.float64)
+    b_pad_erase[max_erases:max_erases + len_b] = erase_cost(b, np.arange(len_b))
+    a_erase = np.asarray(erase_cost(a, np.arange(len_a)), dtype=np.float64)
+
+    # shift_diff[a_shift, b_shift] = b_shift - a_shift
+    shift_diff = np.arange(n)[None, :] - np.arange(n)[:, None]
+    cum_erase = np.zeros((cnt_channels, n, n), dtype=np.float64)
+
+    def erase_from_b(plane: np.array, a_id: int) -> np.array:
+        b_erase = np.moveaxis(b_pad_erase[a_id + shift_diff + max_erases], -1, 0)
+        np.cumsum(b_erase[..., :-1], axis=-1, out=cum_erase[..., 1:])
+        return (np.minimum.accumulate(plane - cum_erase, axis=-1) + cum_erase).astype(dp_dtype)
+
+    a_id = start
+    if start_plane is None:
+        plane = np.full((cnt_channels, n, n), inf_const, dtype=dp_dtype)
+        plane[:, 0, 0] = 0
+        plane = erase_from_b(plane, a_id)
+        yield a_id, plane
+    else:
+        plane = start_plane
+    while a_id < stop:
+        # row of pairwise distances: row[k + max_erases] = pairwise_distance(a[a_id], b[a_id + k])
+        b_ids = a_id + np.arange(-max_erases, max_erases + 1)
+        row = np.where(((b_ids >= 0) & (b_ids < len_b))[:, None],
+                       pairwise_distance(a[a_id][None], b[np.clip(b_ids, 0, len_b - 1)]),
+                       0.0)
+        next_plane = (plane + np.moveaxis(row[shift_diff + max_erases], -1, 0)).astype(dp_dtype)
+        np.minimum(next_plane[:, 1:], (plane[:, :-1] + a_erase[a_id][:, None, None]).astype(dp_dtype),
+                   out=next_plane[:, 1:])
+        a_id += 1
+        plane = erase_from_b(next_plane, a_id)
+        yield a_id, plane
+
+
+def _count_cells(stats: tp.Optional[CallStats], cnt_planes: int, max_erases: int, cnt_channels: int) -> None:
+    if stats is not None:
+        stats.count('dp_cells', cnt_planes * (max_erases + 1) ** 2 * cnt_channels)
+
+
+def _exceeds_threshold(plane: np.array, len_a: int, abandon_threshold: tp.Optional[float]) -> np.array:
+    """
+    Checks (for each channel) whether every continuation of states from the final plane of some a_id
+    has average distance > abandon_threshold.
+    Costs are nonnegative, so the sum only grows and state with a_shift erases will be divided by <= len_a - a_shift
+    """
+    n = plane.shape[-1]
+    if abandon_threshold is None or n > len_a:
+        # with max_erases >= len_a the answer may be normalised by nonpositive count, no bound
+        return np.zeros(plane.shape[:-2], dtype=bool)
+    lower_bound = (plane / (len_a - np.arange(n))[:, None]).min(axis=(-2, -1))
+    return lower_bound > abandon_threshold
+
+
+def _min_average_distance(last_plane: np.array, len_a: int, len_b: int, max_erases: int) -> tp.Any:
+    """
+    Chooses best final state of dp (both sequences are over), normalises by count of matched elements.
+    last_plane may have leading channel dims, then answer is computed for each channel
+    """
     len_diff = len_b - len_a
     cnt_usd = len_a - np.arange(max(0, -len_diff),
                                 min(max_erases + 1, max_erases - len_diff + 1))
-    ans = (dp[len_a,
-              np.arange(max(0, -len_diff),
-                        min(max_erases + 1, max_erases - len_diff + 1)),
-              np.arange(max(0, -len_diff),
-                        min(max_erases + 1, max_erases - len_diff + 1))
-              + len_diff] / cnt_usd).min()
+    ans = (last_plane[..., np.arange(max(0, -len_diff),
+                                     min(max_erases + 1, max_erases - len_diff + 1)),
+                           np.arange(max(0, -len_diff),
+                                     min(max_erases + 1, max_erases - len_diff + 1))
+                           + len_diff] / cnt_usd).min(axis=-1)
     return ans
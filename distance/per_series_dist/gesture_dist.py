@@ -8,6 +8,8 @@ from distance.per_series_dist.dp_dist import dp_time_series_distance
 def gesture_series_dist(first_gesture_repr: GestureRepr,
                         second_gesture_repr: GestureRepr,
                         time_series_dist: tp.Callable = dp_time_series_distance,
+                        batched: bool = False,
+                        abandon_threshold: tp.Optional[float] = None,
                         **time_series_dist_params
                         ) -> np.array:
     """
@@ -16,10 +18,21 @@ def gesture_series_dist(first_gesture_repr: GestureRepr,
     :param first_gesture_repr: first input gesture
     :param second_gesture_repr: second input gesture
     :param time_series_dist: Time series distance function
+    :param batched: if True, time_series_dist gets whole 2d (time, channels) gestures at once
+        and returns per-channel distances (e.g. dp_multichannel_distance)
+    :param abandon_threshold: if not None, passed to time_series_dist. Once some channel distance exceeds it
+        (maximum over channels exceeds it too) remaining channels are skipped and set to np.inf
     :param time_series_dist_params: Time series distance function params
     :return: np.array of time series distances
     """
-    ans = np.empty((first_gesture_repr.shape[1],))
+    if abandon_threshold is not None:
+        time_series_dist_params['abandon_threshold'] = abandon_threshold
+    if batched:
+        return np.asarray(time_series_dist(first_gesture_repr[:, :], second_gesture_repr[:, :],
+                                           **time_series_dist_params), dtype=np.float64)
+    ans = np.full((first_gesture_repr.shape[1],), np.inf)
     for i in range(first_gesture_repr.shape[1]):
         ans[i] = time_series_dist(first_gesture_repr[:, i], second_gesture_repr[:, i], **time_series_dist_params)
-    return ans
\ No newline at end of file
+        if abandon_threshold is not None and ans[i] > abandon_threshold:
+            break
+    return ans
@@ -0,0 +1,116 @@
+import numpy as np
+import typing as tp
+
+from distance.per_series_dist.dp_dist import resolve_max_erases
+
+
+def erase_tolerant_envelope(x: np.array, window: int, length: tp.Optional[int] = None) -> tp.Tuple[np.array, np.array]:
+    """
+    Computes lower and upper envelopes of time series: lower[i], upper[i] = min, max of x[i - window: i + window + 1]
+
+    :param x: time series, np.array (time, ...)
+    :param window: half-width of window, for dp distance it is max_erases (matched elements are at most
+        max_erases apart)
+    :param length: count of envelope points (default len(x)), points outside of x use its nearest part
+    :return: (lower, upper) np.arrays of shape (length, ...)
+    """
+    x = np.asarray(x, dtype=np.float64)
+    length = len(x) if length is None else length
+    assert length <= len(x) + window, f'envelope points should have nonempty windows, got {length=}, {len(x)=}'
+    pad_width = [(window, window + max(0, length - len(x)))] + [(0, 0)] * (x.ndim - 1)
+    lower_windows = np.lib.stride_tricks.sliding_window_view(np.pad(x, pad_width, constant_values=np.inf),
+                                                             2 * window + 1, axis=0)[:length]
+    upper_windows = np.lib.stride_tricks.sliding_window_view(np.pad(x, pad_width, constant_values=-np.inf),
+                                                             2 * window + 1, axis=0)[:length]
+    return lower_windows.min(axis=-1), upper_windows.max(axis=-1)
+
+
+def envelope_distance_sum(x: np.array, lower: np.array, upper: np.array, cnt_erases: int) -> np.array:
+    """
+    Sum of distances from x[i] to [lower[i], upper[i]], without cnt_erases largest of them (per channel)
+    """
+    dist = np.maximum(np.maximum(x - upper, lower - x), 0.0)
+    cnt_kept = len(x) - cnt_erases
+    if cnt_kept <= 0:
+        return np.zeros(dist.shape[1:])
+    return np.partition(dist, cnt_kept - 1, axis=0)[:cnt_kept].sum(axis=0)
+
+
+def sorted_prefix_sums(x: np.array) -> np.array:
+    """ Prefix sums of sorted (by time, for each channel) time series, shape (len(x) + 1, ...) """
+    x = np.sort(np.asarray(x, dtype=np.float64), axis=0)
+    return np.concatenate([np.zeros((1,) + x.shape[1:]), np.cumsum(x, axis=0)])
+
+
+def erase_tolerant_sum_range(prefix_sums: np.array, cnt_erases: int) -> tp.Tuple[np.array, np.array]:
+    """
+    Range of sum of time series elements after erasing at most cnt_erases of them
+    :param prefix_sums: result of sorted_prefix_sums
+    :param cnt_erases: maximal count of erased elements
+    :return: (min_sum, max_sum)
+    """
+    length = len(prefix_sums) - 1
+    cnt_erases = min(cnt_erases, length)
+    # erase k largest elements --> sum of length - k smallest, erase k smallest --> total - sum of k smallest
+    min_sum = prefix_sums[length - cnt_erases:].min(axis=0)
+    max_sum = prefix_sums[-1] - prefix_sums[:cnt_erases + 1].min(axis=0)
+    return min_sum, max_sum
+
+
+def dp_sum_lower_bound(a_prefix_sums: np.array,
+                       b_prefix_sums: np.array,
+                       max_erases: tp.Union[int, tp.Callable[[int, int], int]] = 10) -> np.array:
+    """
+    Admissible lower bound of dp_time_series_distance (see dp_envelope_lower_bound) in O(max_erases) per channel.
+    Sum of pairwise abs_diff distances of matched elements is at least the difference of sums of non-erased elements.
+
+    :param a_prefix_sums: sorted_prefix_sums of the first time series
+    :param b_prefix_sums: sorted_prefix_sums of the second time series
+    :param max_erases: the same as in dp_time_series_distance
+    :return: lower bound (per channel for multichannel input)
+    """
+    len_a, len_b = len(a_prefix_sums) - 1, len(b_prefix_sums) - 1
+    max_erases = resolve_max_erases(max_erases, min(len_a, len_b), max(len_a, len_b))
+    if max_erases >= min(len_a, len_b):
+        return np.full(a_prefix_sums.shape[1:], -np.inf)
+    a_min, a_max = erase_tolerant_sum_range(a_prefix_sums, max_erases)
+    b_min, b_max = erase_tolerant_sum_range(b_prefix_sums, max_erases)
+    return np.maximum(np.maximum(a_min - b_max, b_min - a_max), 0.0) / min(len_a, len_b)
+
+
+def dp_envelope_lower_bound(a: np.array,
+                            b: np.array,
+                            max_erases: tp.Union[int, tp.Callable[[int, int], int]] = 10,
+                            a_envelope: tp.Optional[tp.Tuple[np.array, np.array]] = None,
+                            b_envelope: tp.Optional[tp.Tuple[np.array, np.array]] = None) -> np.array:
+    """
+    Admissible lower bound of dp_time_series_distance (dp_multichannel_distance for 2d input)
+    with abs_diff pairwise distance and nonnegative erase costs.
+
+    Every non-erased element x[i] is matched with element of the other series at most max_erases apart,
+    so its cost is at least distance from x[i] to the envelope of the other series.
+    At most max_erases elements are erased (largest distances are dropped),
+    count of matched elements is at most len of shorter series.
+
+    :param a: first time series, np.array (time, ...)
+    :param b: second time series, np.array (time, ...)
+    :param max_erases: the same as in dp_time_series_distance
+    :param a_envelope: precomputed erase_tolerant_envelope of a with window max_erases,
+        at least len(b) points (computed if None)
+    :param b_envelope: the same for b
+    :return: lower bound (per channel for multichannel input)
+    """
+    a = np.asarray(a, dtype=np.float64)
+    b = np.asarray(b, dtype=np.float64)
+    if len(a) > len(b):
+        a, b = b, a
+        a_envelope, b_envelope = b_envelope, a_envelope
+    max_erases = resolve_max_erases(max_erases, len(a), len(b))
+    if max_erases >= len(a):
+        # see _exceeds_threshold in dp_dist, no bound for degenerate normalisation
+        return np.full(a.shape[1:], -np.inf)
+
+    b_lower, b_upper = erase_tolerant_envelope(b, max_erases, len(a)) if b_envelope is None else b_envelope
+    a_lower, a_upper = erase_tolerant_envelope(a, max_erases, len(b)) if a_envelope is None else a_envelope
+    return np.maximum(envelope_distance_sum(a, b_lower[:len(a)], b_upper[:len(a)], max_erases),
+                      envelope_distance_sum(b, a_lower[:len(b)], a_upper[:len(b)], max_erases)) / len(a)
@@ -0,0 +1,70 @@
+import typing as tp
+import numpy as np
+
+from distance.per_series_dist.dp_dist import dp_multichannel_distance
+from instrumentation.call_stats import CallStats
+
+
+def piecewise_aggregate(x: np.array, factor: int) -> np.array:
+    """
+    Piecewise aggregate approximation: means of consecutive windows of factor samples
+    (the last window may be shorter), shape (ceil(len(x) / factor), ...)
+    """
+    x = np.asarray(x, dtype=np.float64)
+    assert factor >= 1, f'factor should be positive, got {factor=}'
+    starts = np.arange(0, len(x), factor)
+    window_lengths = np.diff(np.append(starts, len(x))).reshape((-1,) + (1,) * (x.ndim - 1))
+    return np.add.reduceat(x, starts, axis=0) / window_lengths
+
+
+def coarse_max_erases(max_erases: int, factor: int) -> int:
+    """
+    max_erases of series downsampled by factor: erases of max_erases samples span at most ceil(max_erases / factor)
+    windows, and lengths of downsampled series differ by at most this count
+    """
+    return int(np.ceil(max_erases / factor))
+
+
+def is_decided_by_coarse(coarse_dist: float, threshold: float, band: float) -> bool:
+    """ Whether coarse distance is outside of the refinement band [threshold * (1 - band), threshold * (1 + band)] """
+    return coarse_dist < threshold * (1.0 - band) or coarse_dist > threshold * (1.0 + band)
+
+
+def multires_dp_distance(a: np.array,
+                         b: np.array,
+                         threshold: float,
+                         factor: int = 4,
+                         band: float = 0.5,
+                         max_erases: tp.Union[int, tp.Callable[[int, int], int]] = 10,
+                         stats: tp.Optional[CallStats] = None,
+                         **dp_dist_params) -> np.array:
+    """
+    Coarse-to-fine dp_multichannel_distance for threshold decisions (distance = max over channels <= threshold):
+    dp is computed on series downsampled by piecewise_aggregate with max_erases scaled by coarse_max_erases,
+    full resolution dp is computed only if coarse distance is inside of the refinement band around threshold.
+    Coarse distance is not a bound of the exact one, so decisions outside of the band are approximate,
+    wider band gives fewer wrong decisions and more refinements.
+
+    :param a: first time series, 2d np.array (time, channels)
+    :param b: second time series, 2d np.array (time, channels)
+    :param threshold: threshold of decision
+    :param factor: downsampling factor
+    :param band: relative half-width of refinement band
+    :param stats: if not None, counts coarse_decided and refined pairs (and dp_cells of both dps)
+    other params are the same as in dp_multichannel_distance
+    :return: per-channel distances, exact if refined, else coarse ones
+        (coarse dp is abandoned above the band, then distances are np.inf)
+    """
+    len_a, len_b = min(len(a), len(b)), max(len(a), len(b))
+    max_erases = max_erases if isinstance(max_erases, int) else max_erases(len_a, len_b)
+    # coarse distance above the band is not needed
+    coarse_params = {**dp_dist_params, 'abandon_threshold': threshold * (1.0 + band)}
+    coarse = dp_multichannel_distance(piecewise_aggregate(a, factor), piecewise_aggregate(b, factor),
+                                      coarse_max_erases(max_erases, factor), stats=stats, **coarse_params)
+    if is_decided_by_coarse(coarse.max(), threshold, band):
+        if stats is not None:
+            stats.count('coarse_decided')
+        return coarse
+    if stats is not None:
+        stats.count('refined')
+    return dp_multichannel_distance(a, b, max_erases, stats=stats, **dp_dist_params)
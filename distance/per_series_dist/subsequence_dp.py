@@ -0,0 +1,224 @@
+import typing as tp
+import numpy as np
+
+from distance.per_series_dist.dp_dist import abs_diff, neighbour_diff_erase_cost, resolve_max_erases
+
+
+class SubsequenceDPMatcher:
+    """
+    Subsequence variant of dp_multichannel_distance: template is matched against every segment of a stream,
+    stream is consumed sample by sample (one dp column per sample).
+
+    State is (a_id, a_shift, b_shift) of template a and stream segment b as in dp_time_series_distance,
+    segment start is not a part of dp: it is defined by the state, start = end - (a_id - a_shift + b_shift),
+    so every (start, end) pair gets exact dp_multichannel_distance and per-channel distances of one segment
+    are combined by max (as in TemplateGallery). Column is stored as (channels, diag, a_shift, b_shift) array,
+    diag = a_id - a_shift, so per sample cost is O(len(template) * (max_erases + 1)^2 * channels),
+    independent of length of the stream.
+        - match: moves to the next column and the next diag
+        - erase from stream: moves to the next column and the next b_shift
+        - erase from template: moves along a_shift inside column (prefix minimum with cumulative erase costs)
+    Erase cost of stream sample depends on the next sample, so column of segments ending before sample t
+    is computed when sample t is pushed (one sample latency). The last sample of finished segment has no next
+    sample (its erase cost is erase_cost of the last element, 0 for neighbour_diff_erase_cost), so final states
+    are computed separately with this cost, states which may be continued use the next sample.
+
+    Match events (as in SPRING algorithm): the best segment with distance <= threshold is kept as candidate,
+    it is reported when no overlapping segment can be better (lower bound of every state which starts
+    before candidate end is >= its distance), then states overlapping with it are dropped,
+    so reported segments don't overlap.
+    pairwise_distance and erase_cost should accept np.arrays (see VECTORIZED_FUNCS).
+    """
+    def __init__(self,
+                 template: np.array,
+                 threshold: float,
+                 max_erases: tp.Union[int, tp.Callable[[int, int], int]] = 10,
+                 pairwise_distance: tp.Callable = abs_diff,
+                 erase_cost: tp.Callable[[tp.Sequence, int], tp.Any] = neighbour_diff_erase_cost,
+                 inf_const: float = 1e18,
+                 max_length_diff: int = 0):
+        """
+        :param template: 2d np.array (time, channels)
+        :param threshold: segments with distance <= threshold are matches
+        :param max_erases: maximal count of erases from template and from segment
+            (if callable, it is resolved for segment longer than template by max_length_diff)
+        :param max_length_diff: see max_erases
+        other params are the same as in dp_time_series_distance
+        """
+        self.template = np.asarray(template, dtype=np.float64)
+        assert self.template.ndim == 2, f'expected 2d template (time, channels), got {self.template.shape=}'
+        self.threshold = threshold
+        self.pairwise_distance = pairwise_distance
+        self.erase_cost = erase_cost
+        self.inf_const = inf_const
+        len_a = len(self.template)
+        self.max_erases = min(resolve_max_erases(max_erases, len_a, len_a + max_length_diff), len_a - 1)
+        n = self.max_erases + 1
+
+        diags = np.arange(len_a + 1)[:, None]
+        shifts = np.arange(n)[None, :]
+        # a_id of (diag, a_shift) cell, states with a_id > len_a don't exist
+        self._a_ids = diags + shifts
+        self._valid = self._a_ids <= len_a
+        a_erase = np.asarray(erase_cost(self.template, np.arange(len_a)), dtype=np.float64)
+        # template can't be erased after its end
+        a_erase = np.concatenate([a_erase, np.full((n, a_erase.shape[1]), inf_const)])
+        # cum_erase[c, diag, a_shift] = cost of erasing a_shift template samples starting from a_id = diag
+        cum_erase = np.zeros((len_a + 1, n, self.template.shape[1]))
+        np.cumsum(a_erase[self._a_ids[:, :-1]], axis=1, out=cum_erase[:, 1:])
+        self._cum_erase = np.moveaxis(cum_erase, -1, 0)[..., None]
+        # count of matched samples of final states (a_id == len_a): len_a - a_shift
+        self._final_matched = len_a - np.arange(n)
+        # lower bound of distance of any continuation of state: its sum / max count of matched samples
+        self._matched_bound = np.where(self._valid & (shifts < len_a), len_a - shifts, 0)
+
+        self.reset()
+
+    def reset(self) -> None:
+        """ Drops all states and candidate (e.g. after a gap in the stream) """
+        self.cnt_samples = 0
+        self._prev_sample = None
+        self._column = None
+        self._finals = None
+        self._candidate: tp.Optional[tp.Tuple[float, int, int]] = None
+
+    def push(self, sample: np.array) -> tp.Optional[tp.Tuple[float, int, int]]:
+        """
+        Consumes the next sample of the stream (channels,)
+        :return: reported match (distance, start, end) (segment is stream[start:end]) or None
+        """
+        sample = np.asarray(sample, dtype=np.float64)
+        prev_sample, self._prev_sample = self._prev_sample, sample
+        self._extend(prev_sample, sample)
+        self.cnt_samples += 1
+        if prev_sample is None:
+            return None
+        return self._update_candidate(self.cnt_samples - 1)
+
+    def flush(self) -> tp.Optional[tp.Tuple[float, int, int]]:
+        """
+        Reports candidate without waiting for better overlapping segments (e.g. at the end of stream,
+        before reset), segments ending with the last pushed sample are scored too
+        """
+        if self._prev_sample is not None:
+            last_erase = self.erase_cost(np.stack([self._prev_sample]), 0)
+            self._finals = self._final_states(self._matched_column(self._prev_sample), last_erase)
+            self._propose_candidate(self.cnt_samples)
+        candidate, self._candidate = self._candidate, None
+        if candidate is not None:
+            self._drop_overlapping(candidate[2], self.cnt_samples - 1, self.cnt_samples)
+        return candidate
+
+    def _extend(self, prev_sample: tp.Optional[np.array], sample: np.array) -> None:
+        """ Computes column of segments ending before sample (prev_sample is the last sample of segments) """
+        len_a, cnt_channels = self.template.shape
+        n = self.max_erases + 1
+        if prev_sample is None:
+            column = np.full((cnt_channels, len_a + 1, n, n), self.inf_const)
+        else:
+            column = self._matched_column(prev_sample)
+            # final states (diag = len_a - a_shift) of segments ending with prev_sample
+            self._finals = self._final_states(column, self.erase_cost(np.stack([prev_sample]), 0))
+            # erase prev_sample from segment
+            b_erase = np.asarray(self.erase_cost(np.stack([prev_sample, sample]), 0), dtype=np.float64)
+            np.minimum(column[..., 1:], self._column[..., :-1] + b_erase[:, None, None, None],
+                       out=column[..., 1:])
+        # segments starting with sample
+        column[:, 0, 0, 0] = 0.0
+        self._column = self._erase_from_template(column, slice(None))
+
+    def _matched_column(self, prev_sample: np.array) -> np.array:
+        """ Column of segments ending with prev_sample after match transitions (template[a_id] with prev_sample) """
+        len_a, cnt_channels = self.template.shape
+        n = self.max_erases + 1
+        column = np.full((cnt_channels, len_a + 1, n, n), self.inf_const)
+        match_cost = np.where(self._valid[..., None],
+                              self.pairwise_distance(self.template[np.minimum(self._a_ids, len_a - 1)], prev_sample),
+                              0.0)
+        column[:, 1:] = self._column[:, :-1] + np.moveaxis(match_cost, -1, 0)[:, :-1, :, None]
+        return column
+
+    def _erase_from_template(self, column: np.array, diags: slice) -> np.array:
+        """ Erases from template inside column of diags (moves along a_shift) """
+        cum_erase = self._cum_erase[:, diags]
+        column = np.minimum.accumulate(column - cum_erase, axis=2) + cum_erase
+        column[:, ~self._valid[diags]] = self.inf_const
+        return column
+
+    def _final_states(self, matched: np.array, last_erase: np.array) -> np.array:
+        """
+        Final states (channels, a_shift, b_shift) of segments ending with the last pushed sample
+        :param matched: column after match transitions
+        :param last_erase: erase cost of the last sample of segment
+        """
+        len_a = len(self.template)
+        n = self.max_erases + 1
+        # only diags of final states are needed, diag = len_a - a_shift
+        diags = slice(len_a - n + 1, len_a + 1)
+        final_column = matched[:, diags].copy()
+        np.minimum(final_column[..., 1:],
+                   self._column[:, diags, :, :-1] + np.asarray(last_erase, dtype=np.float64)[:, None, None, None],
+                   out=final_column[..., 1:])
+        final_column = self._erase_from_template(final_column, diags)
+        a_shifts = np.arange(n)
+        return final_column[:, n - 1 - a_shifts, a_shifts, :]
+
+    def _update_candidate(self, end: int) -> tp.Optional[tp.Tuple[float, int, int]]:
+        """ Checks whether candidate can be reported, then updates it by segments ending at end """
+        len_a = len(self.template)
+        report = None
+        if self._candidate is not None:
+            dist, start, candidate_end = self._candidate
+            with np.errstate(divide='ignore'):
+                bounds = (self._column / self._matched_bound[..., None]).min(axis=2)
+            bounds = self._group_by_length(bounds, np.arange(len_a + 1))
+            # only segments starting before candidate end overlap with it
+            overlapping = np.arange(len(bounds)) > end - candidate_end
+            if not (bounds[overlapping] < dist).any():
+                report, self._candidate = self._candidate, None
+                self._drop_overlapping(candidate_end, end, end)
+        self._propose_candidate(end)
+        return report
+
+    def _drop_overlapping(self, candidate_end: int, end: int, finals_end: int) -> None:
+        """
+        Drops states of segments starting before end of reported segment
+        (column contains segments ending at end, final states - segments ending at finals_end)
+        """
+        len_a = len(self.template)
+        n = self.max_erases + 1
+        lengths = np.arange(len_a + 1)[:, None, None] + np.arange(n)[None, None, :]
+        self._column[:, np.broadcast_to(lengths > end - candidate_end, self._column.shape[1:])] = self.inf_const
+        if self._finals is not None:
+            final_lengths = len_a - np.arange(n)[:, None] + np.arange(n)[None, :]
+            self._finals[:, final_lengths > finals_end - candidate_end] = self.inf_const
+
+    def _propose_candidate(self, end: int) -> None:
+        """ Replaces candidate by the best segment ending at end if it is a better match """
+        dists = self.segment_distances()
+        length = int(np.argmin(dists))
+        if dists[length] <= self.threshold and (self._candidate is None or dists[length] < self._candidate[0]):
+            self._candidate = (float(dists[length]), end - length, end)
+
+    def segment_distances(self) -> np.array:
+        """
+        Distances of segments ending with the last complete sample (stream[cnt_samples - 1 - length:cnt_samples - 1],
+        after flush: with the last pushed sample) indexed by segment length,
+        np.inf for lengths without states (incomparable or dropped after report)
+        """
+        if self._finals is None:
+            return np.full(1, np.inf)
+        # final states: diag = len_a - a_shift, segment length = diag + b_shift
+        a_shifts = np.arange(self.max_erases + 1)
+        return self._group_by_length(self._finals / self._final_matched[:, None], len(self.template) - a_shifts)
+
+    def _group_by_length(self, values: np.array, diags: np.array) -> np.array:
+        """
+        values (channels, diag, b_shift) -> maximum over channels of minimum over states
+        of every segment length (diag + b_shift), np.inf for lengths without states
+        """
+        n = self.max_erases + 1
+        by_length = np.full((values.shape[0], diags.max() + n), np.inf)
+        for b_shift in range(n):
+            np.minimum.at(by_length, (slice(None), diags + b_shift), values[:, :, b_shift])
+        return by_length.max(axis=0)
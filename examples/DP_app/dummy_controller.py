@@ -1,58 +1,260 @@
+import os
 import cv2
+import copy
+import inspect
 import typing as tp
 import numpy as np
+from concurrent.futures import Future, ProcessPoolExecutor
 
-from abstract_classes.controller import Controller
+from abstract_classes.controller import Controller, call_or_exception
 from examples.DP_app.dummy_dp_comp import DummyDPComparator
+from examples.DP_app.dummy_spotter import DummyGestureSpotter
 from gesture_repr.points_repr.points_repr import PointsRepr
+from gesture_repr.points_repr.frame_sources import iterate_video_capture
+from gesture_repr.points_repr.landmark_cache import LandmarkCache
 from gesture_repr.angles_repr.angles_repr import AnglesRepr
 from gesture_repr.angles_repr.utils import PointsToAnglesTransformer
 from gesture_repr.repr_modify_utils.utils import erase_nan_prefix_suffix, interpolate, nan_percentage
-from smoothing.smooth_gesture import smooth_gesture
+from smoothing.smooth_gesture import smooth_gesture, _limit_blas_threads
+from smoothing.gpr_smoothing import gpr_time_series_smoothing
 from examples.DP_app.angle_description_config import angles_description
+from instrumentation.call_stats import CallStats, StatsRecorder, DISABLED_STATS, recording
+
+
+def log_scaled_max_erases(x: int, y: int) -> int:
+    return abs(x - y) + int(min(x, y) * 0.015 * np.log(min(x, y) + 1))
 
 
 class DummyController(Controller):
-    def __init__(self):
-        self.comparator = DummyDPComparator(0.2,
-                                            max_erases=lambda x, y: abs(x - y) + int(min(x, y) * 0.015
-                                                                                     * np.log(min(x, y) + 1)))
+    def __init__(self,
+                 smoothing_func: tp.Callable = gpr_time_series_smoothing,
+                 landmark_cache: tp.Optional[LandmarkCache] = None,
+                 hands_params: tp.Optional[tp.Dict[str, tp.Any]] = None,
+                 stats_recorder: tp.Optional[StatsRecorder] = None,
+                 **smoothing_func_params):
+        """
+        Videos are cv2.VideoCapture or paths to video files
+        :param smoothing_func: smoothing function passed to smooth_gesture, should support return_last_gpr_mean_std
+            (e.g. gpr_time_series_smoothing or linear time smoothers from smoothing.robust_smoothing)
+        :param landmark_cache: if not None, landmarks of videos given by path are cached by content
+        :param hands_params: MediaPipe params passed to PointsRepr
+        :param stats_recorder: if not None, records CallStats of every add_valid_gesture, is_valid
+            and proba_is_valid call: time of stages (decode, landmarks, angles, nan_preproc, smoothing, matching)
+            and counters (frames, nan_ratio, gpr_iterations if smoothing_func accepts stats and runs
+            in this process, dp_cells, templates_pruned and other counters of TemplateGallery)
+        :param smoothing_func_params: params passed to smooth_gesture
+        """
+        self.stats_recorder = stats_recorder
+        self.comparator = DummyDPComparator(0.2, stats_recorder=stats_recorder, max_erases=log_scaled_max_erases)
 
         self.angle_transformer = PointsToAnglesTransformer(angles_description, 21)
+        self.smoothing_func = smoothing_func
+        self.smoothing_func_params = smoothing_func_params
+        self.landmark_cache = landmark_cache
+        self.hands_params = {} if hands_params is None else hands_params
+
+    def extract_points(self, video: tp.Union[str, cv2.VideoCapture], stats: CallStats = DISABLED_STATS) -> PointsRepr:
+        decode_time = stats.stage_times.get('decode', 0.0)
+        with stats.stage('landmarks'):
+            points_repr = self._extract_points(video, stats)
+        if stats.enabled:
+            # frames are decoded lazily during landmark extraction (stats may be shared by several calls)
+            stats.stage_times['landmarks'] -= stats.stage_times.get('decode', 0.0) - decode_time
+        stats.count('frames', len(points_repr))
+        return points_repr
+
+    def _extract_points(self, video: tp.Union[str, cv2.VideoCapture], stats: CallStats) -> PointsRepr:
+        if not isinstance(video, str):
+            return PointsRepr(stats.timed_iter(iterate_video_capture(video), 'decode'), **self.hands_params)
+        if self.landmark_cache is None:
+            return PointsRepr(stats.timed_iter(iterate_video_capture(cv2.VideoCapture(video)), 'decode'),
+                              **self.hands_params)
+        key = self.landmark_cache.key(video, PointsRepr.hands_settings(**self.hands_params))
+        return PointsRepr.from_points(self.landmark_cache.get_or_compute(
+            key, lambda: PointsRepr(stats.timed_iter(iterate_video_capture(cv2.VideoCapture(video)), 'decode'),
+                                    **self.hands_params).values))
 
-    def preproc_video(self, video_cap: cv2.VideoCapture) -> tp.Optional[AnglesRepr]:
-        all_frames = []
-        while video_cap.isOpened():
-            ret, frame = video_cap.read()
-            if not ret:
-                break
-            all_frames.append(frame)
-        all_frames = np.array(all_frames)
-        angle_repr = PointsRepr(all_frames)
-        angle_repr = AnglesRepr(angle_repr, self.angle_transformer)
-        angle_repr.values = erase_nan_prefix_suffix(angle_repr.values)
-        if angle_repr is None or nan_percentage(angle_repr) > 0.15:
-            return None
-        angle_repr = interpolate(angle_repr)
-        angle_repr = smooth_gesture(angle_repr, return_last_gpr_mean_std=True)
+    def preproc_video(self, video_cap: tp.Union[str, cv2.VideoCapture],
+                      stats: CallStats = DISABLED_STATS) -> tp.Optional[AnglesRepr]:
+        return self.preproc_points(self.extract_points(video_cap, stats), stats)
+
+    def preproc_points(self, points_repr: PointsRepr, stats: CallStats = DISABLED_STATS) -> tp.Optional[AnglesRepr]:
+        with stats.stage('angles'):
+            angle_repr = AnglesRepr(points_repr, self.angle_transformer)
+        with stats.stage('nan_preproc'):
+            angle_repr = erase_nan_prefix_suffix(angle_repr, inplace=True)
+            if angle_repr is None:
+                return None
+            nan_ratio = nan_percentage(angle_repr)
+            stats.count('nan_ratio', nan_ratio)
+            if nan_ratio > 0.15:
+                return None
+            interpolate(angle_repr, inplace=True)
+        with stats.stage('smoothing'):
+            angle_repr = smooth_gesture(angle_repr, self.smoothing_func, return_last_gpr_mean_std=True,
+                                        **self._smoothing_params(stats))
         angle_repr = angle_repr[:, 1, :].T
         return angle_repr
 
-    def add_valid_gesture(self, video_cap: cv2.VideoCapture) -> bool:
-        angle_repr = self.preproc_video(video_cap)
-        if angle_repr is None:
-            return False
-        self.comparator.add_valid_gesture(angle_repr)
-        return True
-
-    def is_valid(self, video_cap: cv2.VideoCapture) -> bool:
-        angle_repr = self.preproc_video(video_cap)
-        if angle_repr is None:
-            return False
-        return self.comparator.is_valid(angle_repr)
-
-    def proba_is_valid(self, video_cap: cv2.VideoCapture) -> float:
-        angle_repr = self.preproc_video(video_cap)
-        if angle_repr is None:
-            return 0.0
-        return self.comparator.proba_is_valid(angle_repr)
+    def _smoothing_params(self, stats: CallStats) -> tp.Dict[str, tp.Any]:
+        if stats.enabled and 'stats' in inspect.signature(self.smoothing_func).parameters:
+            return dict(self.smoothing_func_params, stats=stats)
+        return self.smoothing_func_params
+
+    def add_valid_gesture(self, video_cap: tp.Union[str, cv2.VideoCapture]) -> bool:
+        with recording(self.stats_recorder, 'add_valid_gesture') as stats:
+            angle_repr = self.preproc_video(video_cap, stats)
+            if angle_repr is None:
+                return False
+            self.comparator.add_valid_gesture(angle_repr)
+            return True
+
+    def is_valid(self, video_cap: tp.Union[str, cv2.VideoCapture]) -> bool:
+        with recording(self.stats_recorder, 'is_valid') as stats:
+            angle_repr = self.preproc_video(video_cap, stats)
+            if angle_repr is None:
+                return False
+            return self.comparator.is_valid(angle_repr, stats)
+
+    def proba_is_valid(self, video_cap: tp.Union[str, cv2.VideoCapture]) -> float:
+        with recording(self.stats_recorder, 'proba_is_valid') as stats:
+            angle_repr = self.preproc_video(video_cap, stats)
+            if angle_repr is None:
+                return 0.0
+            return self.comparator.proba_is_valid(angle_repr, stats)
+
+    def spotter(self, **spotter_params) -> DummyGestureSpotter:
+        """ Streaming recognizer of valid gestures (see DummyGestureSpotter) with the same templates and threshold """
+        return DummyGestureSpotter(self.comparator.gallery, self.angle_transformer,
+                                   **dict(dict(threshold=self.comparator.threshold, hands_params=self.hands_params),
+                                          **spotter_params))
+
+    def preproc_many(self, videos: tp.Iterable[str],
+                     n_jobs: tp.Optional[int] = None,
+                     max_in_flight: tp.Optional[int] = None) -> tp.Iterator[tp.Union[AnglesRepr, None, Exception]]:
+        """
+        Pipelined preproc_video of many videos: decoding with landmark extraction and angles with smoothing
+        are two stages, each run by its own pool of n_jobs worker processes, so stages of different videos overlap
+        (and overlap with consumer of results, e.g. dp matching in the main process).
+        Not more than max_in_flight videos are in pipeline at once (bounded queue).
+
+        :param videos: paths to video files (cv2.VideoCapture can't be passed to worker processes)
+        :param n_jobs: count of worker processes of every stage, os.cpu_count() if None
+        :param max_in_flight: 2 * n_jobs if None
+        :return: iterator over preproc_video results (or raised exceptions) in input order
+        """
+        n_jobs = os.cpu_count() if n_jobs is None else n_jobs
+        max_in_flight = 2 * n_jobs if max_in_flight is None else max_in_flight
+        assert n_jobs >= 1 and max_in_flight >= 1, f'wrong pipeline size, got {n_jobs=}, {max_in_flight=}'
+        # workers get controller without comparator (gallery and its workers stay in the main process)
+        preprocessor = copy.copy(self)
+        preprocessor.comparator = None
+        preprocessor.stats_recorder = None
+        worker_params = dict(initializer=_init_pipeline_worker, initargs=(preprocessor,))
+        with ProcessPoolExecutor(n_jobs, **worker_params) as extractor, \
+                ProcessPoolExecutor(n_jobs, **worker_params) as smoother:
+            in_flight = []
+            videos = iter(videos)
+            try:
+                while True:
+                    for video in videos:
+                        in_flight.append(_submit_pipeline(extractor, smoother, video))
+                        if len(in_flight) >= max_in_flight:
+                            break
+                    if not in_flight:
+                        break
+                    yield call_or_exception(in_flight.pop(0).result)
+            finally:
+                # consumer stopped early: jobs of not consumed videos are cancelled, running ones are awaited
+                for future in in_flight:
+                    future.cancel()
+                extractor.shutdown(wait=False, cancel_futures=True)
+                smoother.shutdown(wait=False, cancel_futures=True)
+
+    def add_valid_gestures(self, videos: tp.Iterable[str], n_jobs: tp.Optional[int] = None,
+                           max_in_flight: tp.Optional[int] = None) -> tp.List[tp.Union[bool, Exception]]:
+        """
+        Pipelined add_valid_gesture of video files (see preproc_many), gestures are added in input order
+        :return: for every video add_valid_gesture result or exception raised on it
+        """
+        results = []
+        for angle_repr in self.preproc_many(videos, n_jobs, max_in_flight):
+            if isinstance(angle_repr, Exception) or angle_repr is None:
+                results.append(False if angle_repr is None else angle_repr)
+                continue
+            exception = call_or_exception(self.comparator.add_valid_gesture, angle_repr)
+            results.append(True if exception is None else exception)
+        return results
+
+    def score_many(self, videos: tp.Iterable[str], n_jobs: tp.Optional[int] = None,
+                   max_in_flight: tp.Optional[int] = None) -> tp.List[tp.Union[float, Exception]]:
+        """
+        Pipelined proba_is_valid of video files (see preproc_many)
+        :return: for every video proba_is_valid result or exception raised on it
+        """
+        results = []
+        for angle_repr in self.preproc_many(videos, n_jobs, max_in_flight):
+            if isinstance(angle_repr, Exception) or angle_repr is None:
+                results.append(0.0 if angle_repr is None else angle_repr)
+                continue
+            results.append(call_or_exception(self.comparator.proba_is_valid, angle_repr))
+        return results
+
+
+def _init_pipeline_worker(preprocessor: DummyController) -> None:
+    _limit_blas_threads(1)
+    _init_pipeline_worker.preprocessor = preprocessor
+
+
+def _extract_points_job(video: str) -> np.array:
+    return np.asarray(_init_pipeline_worker.preprocessor.extract_points(video).values)
+
+
+def _preproc_points_job(points: np.array) -> tp.Optional[AnglesRepr]:
+    return _init_pipeline_worker.preprocessor.preproc_points(PointsRepr.from_points(points))
+
+
+def _submit_pipeline(extractor: ProcessPoolExecutor, smoother: ProcessPoolExecutor, video: str) -> Future:
+    """
+    Future of preprocessed video: its points are passed to smoother as soon as extractor finishes,
+    cancelling of it cancels jobs of stages (which are not running yet)
+    """
+    result = Future()
+    stages: tp.List[Future] = []
+
+    def cancel_stages(future: Future) -> None:
+        if future.cancelled():
+            for stage in stages:
+                stage.cancel()
+
+    def copy_result(future: Future) -> None:
+        if result.cancelled():
+            return
+        if future.cancelled():
+            result.cancel()
+        elif future.exception() is not None:
+            result.set_exception(future.exception())
+        else:
+            result.set_result(future.result())
+
+    def submit_smoothing(future: Future) -> None:
+        if future.cancelled() or future.exception() is not None or result.cancelled():
+            copy_result(future)
+            return
+        try:
+            smoothing = smoother.submit(_preproc_points_job, future.result())
+        except RuntimeError as exc:
+            # smoother is shut down, pipeline is closed before the video is consumed
+            result.set_exception(exc)
+            return
+        stages.append(smoothing)
+        if result.cancelled():
+            # result is cancelled while smoothing was being submitted
+            smoothing.cancel()
+        smoothing.add_done_callback(copy_result)
+
+    extraction = extractor.submit(_extract_points_job, video)
+    stages.append(extraction)
+    result.add_done_callback(cancel_stages)
+    extraction.add_done_callback(submit_smoothing)
+    return result
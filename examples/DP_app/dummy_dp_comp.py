@@ -1,7 +1,14 @@
+import typing as tp
+import numpy as np
+
 from abstract_classes.gesture_comparator import GestureComparator
 from gesture_repr.angles_repr.angles_repr import AnglesRepr
-from distance.per_series_dist.gesture_dist import gesture_series_dist
-from distance.per_series_dist.dp_dist import dp_time_series_distance
+from distance.gallery.template_gallery import TemplateGallery
+from distance.gallery.parallel_matching import ParallelMatcher
+from distance.gallery.gallery_storage import save_gallery, load_gallery
+from distance.gallery.condensation import merge_redundant
+from distance.gallery.pairwise_distances import pairwise_gesture_distances
+from instrumentation.call_stats import CallStats, StatsRecorder, recording
 
 
 class DummyDPComparator(GestureComparator):
@@ -10,33 +17,129 @@ class DummyDPComparator(GestureComparator):
     If for given gesture exists valid gesture with distance <= threshold,
     given gesture considered valid.
     Probability is computed as 0.5**(min_dist)
+
+    Valid gestures are stored in TemplateGallery, which prunes them with lower bounds before exact dp.
+    Valid gestures with length not comparable with given gesture (length difference > max_erases) are skipped,
+    so such gesture is not valid (dp distance raises AssertionError for them).
+    If n_jobs is not None, dp jobs are computed by ParallelMatcher with the same results.
+    If coarse_factor is not None, gallery works in coarse-to-fine mode (see TemplateGallery):
+    exact dp is computed only for templates with coarse distance within refine_band around threshold,
+    gallery counters coarse_decided and refined show how often refinement happens (serial mode only).
+    proba_is_valid of gesture far from every valid gesture uses coarse distance of the nearest one,
+    so its probability is approximate (but not saturated to 0).
+    If gallery_budget is not None, gallery is condensed when it exceeds the budget: redundant valid gesture
+    is merged into the nearest one of its class (see merge_redundant, class is metadata[class_key]),
+    so cost of queries is bounded. coverage_radius is a heuristic estimate of the maximal distance
+    from evicted gestures to kept ones (sum of dp distances along merges, dp distance is not a metric,
+    so it is not a bound and decisions may change even for gestures farther than it from the threshold).
+    Distances between valid gestures of one class are kept, so every enrollment over budget costs
+    one dp per gesture of its class.
+
+    If stats_recorder is not None, it records 'matching' stage time and gallery counters
+    (templates_pruned, dp_cells, ...) of every is_valid and proba_is_valid call.
+    When comparator is called by controller, controller passes statistics of its own call.
     """
-    def __init__(self, threshold: float = 0.2, **dp_dist_params):
+    def __init__(self, threshold: float = 0.2,
+                 n_jobs: tp.Optional[int] = None,
+                 executor: str = 'process',
+                 stats_recorder: tp.Optional[StatsRecorder] = None,
+                 coarse_factor: tp.Optional[int] = None,
+                 refine_band: float = 0.5,
+                 gallery_budget: tp.Optional[int] = None,
+                 class_key: str = 'gesture',
+                 **dp_dist_params):
         assert threshold >= 0.0, "gesture dp_dist cannot be less than 0"
+        assert coarse_factor is None or n_jobs is None, 'coarse-to-fine mode is supported only in serial mode'
         self.threshold = threshold
+        self.stats_recorder = stats_recorder
         self.dp_dist_params = dp_dist_params
-        self.valid_gestures = []
-
-    def add_valid_gesture(self, gesture_repr: AnglesRepr) -> None:
-        self.valid_gestures.append(gesture_repr)
-
-    def is_valid(self, gesture_repr: AnglesRepr) -> bool:
-        for valid_gesture in self.valid_gestures:
-            dist = gesture_series_dist(valid_gesture,
-                                        gesture_repr,
-                                        dp_time_series_distance,
-                                        **self.dp_dist_params).max()
-            if dist <= self.threshold:
-                return True
-        return False
-
-    def proba_is_valid(self, gesture_repr: AnglesRepr):
-        min_dist = None
-        for valid_gesture in self.valid_gestures:
-            dist = gesture_series_dist(valid_gesture,
-                                        gesture_repr,
-                                        dp_time_series_distance,
-                                        **self.dp_dist_params).max()
-            if min_dist is None or min_dist > dist:
-                min_dist = dist
+        self.gallery_params = dict(coarse_factor=coarse_factor, refine_band=refine_band)
+        self.gallery = TemplateGallery(**self.gallery_params, **dp_dist_params)
+        self.matcher = None if n_jobs is None else ParallelMatcher(self.gallery, n_jobs, executor)
+        assert gallery_budget is None or gallery_budget >= 1, f'budget should be positive, got {gallery_budget=}'
+        self.gallery_budget = gallery_budget
+        self.class_key = class_key
+        # distances between valid gestures (np.inf for different classes) and coverage radii of condensation
+        self._template_dists: tp.Optional[np.array] = None
+        self._template_radii: tp.Optional[np.array] = None
+
+    @property
+    def valid_gestures(self) -> tp.List[AnglesRepr]:
+        return self.gallery.templates
+
+    def close(self) -> None:
+        """ Shuts down workers of parallel mode """
+        if self.matcher is not None:
+            self.matcher.close()
+
+    @property
+    def coverage_radius(self) -> float:
+        """ Estimated maximal distance from evicted valid gestures to kept ones (0 if nothing is evicted) """
+        return 0.0 if self._template_radii is None else float(self._template_radii.max(initial=0.0))
+
+    def add_valid_gesture(self, gesture_repr: AnglesRepr, metadata: tp.Optional[tp.Dict[str, tp.Any]] = None) -> None:
+        self.gallery.add(gesture_repr, metadata)
+        if self.gallery_budget is not None and len(self.gallery) > self.gallery_budget:
+            self._condense()
+
+    def _condense(self) -> None:
+        """ Merges redundant valid gestures until gallery fits into budget """
+        classes = [metadata.get(self.class_key) for metadata in self.gallery.metadata]
+        if self._template_dists is None or len(self._template_dists) != len(self.gallery) - 1:
+            dists = pairwise_gesture_distances(self.gallery.templates, np.max, n_jobs=1, **self.dp_dist_params)
+            dists[np.array(classes, dtype=object)[:, None] != np.array(classes, dtype=object)[None, :]] = np.inf
+            radii = np.zeros(len(self.gallery))
+        else:
+            # distances of the new gesture (np.inf for other classes and incomparable lengths, as in
+            # pairwise_gesture_distances)
+            new = len(self.gallery) - 1
+            lengths = self.gallery.lengths
+            row = np.full(new + 1, np.inf)
+            row[new] = 0.0
+            for ind in range(new):
+                if classes[ind] == classes[new] and \
+                        abs(lengths[ind] - lengths[new]) <= self.gallery.pair_max_erases(lengths[ind], lengths[new]):
+                    row[ind] = self.gallery.distance(ind, self.gallery[new])
+            dists = np.block([[self._template_dists, row[:-1, None]], [row[None, :]]])
+            radii = np.append(self._template_radii, 0.0)
+
+        kept, _, radii = merge_redundant(dists, classes, radii, self.gallery_budget)
+        # summaries of kept gestures are reused
+        self.gallery.remove(set(range(len(self.gallery))) - set(kept))
+        if self.matcher is not None:
+            self.matcher.set_gallery(self.gallery)
+        self._template_dists = dists[kept][:, kept]
+        self._template_radii = radii[kept]
+
+    def save_gallery(self, path: str) -> None:
+        """ Saves valid gestures into one file (see distance.gallery.gallery_storage) """
+        save_gallery(self.gallery, path)
+
+    def load_gallery(self, path: str) -> None:
+        """ Replaces valid gestures by memory-mapped gallery saved by save_gallery """
+        self.gallery = load_gallery(path, **self.gallery_params, **self.dp_dist_params)
+        self._template_dists = None
+        self._template_radii = None
+        if self.matcher is not None:
+            self.matcher.set_gallery(self.gallery)
+
+    def is_valid(self, gesture_repr: AnglesRepr, stats: tp.Optional[CallStats] = None) -> bool:
+        with recording(self.stats_recorder, 'comparator.is_valid', stats) as stats:
+            with stats.stage('matching'):
+                return self._index().has_within(gesture_repr, self.threshold, stats)
+
+    def proba_is_valid(self, gesture_repr: AnglesRepr, stats: tp.Optional[CallStats] = None):
+        with recording(self.stats_recorder, 'comparator.proba_is_valid', stats) as stats:
+            with stats.stage('matching'):
+                nearest = (self.gallery.k_nearest(gesture_repr, 1, stats=stats, refine_threshold=self.threshold)
+                           if self.gallery.coarse_factor is not None
+                           else self._index().k_nearest(gesture_repr, 1, stats=stats))
+        min_dist = nearest[0][0] if nearest else float('inf')
         return 0.5 ** (min_dist / self.threshold)
+
+    def k_nearest(self, gesture_repr: AnglesRepr, k: int = 1) -> tp.List[tp.Tuple[float, AnglesRepr]]:
+        """ k nearest valid gestures with distances, sorted by distance """
+        return [(dist, self.gallery[ind]) for dist, ind in self._index().k_nearest(gesture_repr, k)]
+
+    def _index(self) -> tp.Union[TemplateGallery, ParallelMatcher]:
+        return self.gallery if self.matcher is None else self.matcher
@@ -0,0 +1,135 @@
+import typing as tp
+import numpy as np
+import mediapipe as mp
+
+from distance.gallery.template_gallery import TemplateGallery
+from distance.per_series_dist.subsequence_dp import SubsequenceDPMatcher
+from gesture_repr.points_repr.points_repr import PointsRepr
+from gesture_repr.angles_repr.utils import PointsToAnglesTransformer
+from smoothing.streaming_smoothing import StreamingKalmanSmoother
+
+
+class DummyGestureSpotter:
+    """
+    Spots valid gestures in continuous stream of frames (e.g. live camera feed).
+    Every frame is processed once, state is updated incrementally:
+        frame -> landmarks (MediaPipe Hands in video mode) -> angles -> StreamingKalmanSmoother
+        -> SubsequenceDPMatcher of every template (one dp column per frame)
+    so cost of frame doesn't depend on length of the stream.
+    If hand is not found on more than max_gap frames in a row, smoother and matchers are reset
+    (gestures are not matched across long gaps), shorter gaps are filled by Kalman prediction.
+    Causal filter lags behind motion, while templates (e.g. GPR means of DummyController.preproc_video)
+    don't, so templates are filtered by the same StreamingKalmanSmoother (smooth_templates),
+    otherwise the lag biases every distance against the threshold.
+
+    Match event: dict(template=index in gallery, metadata=template metadata, distance=..., start=..., end=...),
+    matched frames are [start, end) in numbering of pushed frames. Event is emitted after the last frame
+    of gesture, as soon as no overlapping segment can match the template better.
+    """
+    # dp params of gallery which are not supported by SubsequenceDPMatcher
+    ignored_dp_params = ('dp_dtype', 'engine')
+
+    def __init__(self,
+                 gallery: TemplateGallery,
+                 angle_transformer: PointsToAnglesTransformer,
+                 threshold: float = 0.2,
+                 max_gap: int = 15,
+                 length_tolerance: float = 0.1,
+                 hands_params: tp.Optional[tp.Dict[str, tp.Any]] = None,
+                 smoother_params: tp.Optional[tp.Dict[str, tp.Any]] = None,
+                 smooth_templates: bool = True):
+        """
+        :param gallery: templates (smoothed angle gestures) and dp params, e.g. DummyDPComparator.gallery
+        :param angle_transformer: transformer of landmarks used for templates
+        :param threshold: segment with distance <= threshold to template is a match
+        :param max_gap: maximal count of frames without hand in a row inside gesture
+        :param length_tolerance: if max_erases of gallery is callable, it is resolved for gestures
+            longer than template by length_tolerance * template length
+        :param hands_params: MediaPipe Hands params (model_complexity, min_detection_confidence, max_num_hands)
+        :param smoother_params: params of StreamingKalmanSmoother
+        :param smooth_templates: whether templates are filtered by StreamingKalmanSmoother as the stream
+        """
+        self.gallery = gallery
+        self.angle_transformer = angle_transformer
+        self.threshold = threshold
+        self.max_gap = max_gap
+        self.hands_params = {} if hands_params is None else hands_params
+        self.smoother_params = {} if smoother_params is None else smoother_params
+        self.smoother = StreamingKalmanSmoother(len(angle_transformer), **self.smoother_params)
+        dp_params = {key: val for key, val in gallery.dp_dist_params.items() if key not in self.ignored_dp_params}
+        templates = [np.asarray(gallery[ind][:, :], dtype=np.float64) for ind in range(len(gallery))]
+        if smooth_templates:
+            templates = [self.causal_smoothing(template) for template in templates]
+        self.matchers = [SubsequenceDPMatcher(template, threshold,
+                                              max_length_diff=int(np.ceil(length_tolerance * len(template))),
+                                              **dp_params)
+                         for template in templates]
+        self.cnt_frames = 0
+        self._matchers_start = 0
+        self._cnt_missing = 0
+        self._hands = None
+
+    def causal_smoothing(self, gesture: np.array) -> np.array:
+        """ Filters gesture (time, channels) by StreamingKalmanSmoother with params of the stream """
+        smoother = StreamingKalmanSmoother(gesture.shape[1], **self.smoother_params)
+        return np.array([smoother.push(sample) for sample in gesture])
+
+    def close(self) -> None:
+        """ Releases MediaPipe Hands """
+        if self._hands is not None:
+            self._hands.close()
+            self._hands = None
+
+    def __enter__(self) -> 'DummyGestureSpotter':
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def push_frame(self, frame: np.array) -> tp.List[tp.Dict[str, tp.Any]]:
+        """ Processes the next frame (h, w, rgb), returns match events """
+        if self._hands is None:
+            params = PointsRepr.hands_settings(**self.hands_params)
+            self._hands = mp.solutions.hands.Hands(static_image_mode=False,
+                                                   max_num_hands=params['max_num_hands'],
+                                                   model_complexity=params['model_complexity'],
+                                                   min_detection_confidence=params['min_detection_confidence'])
+        return self.push_points(PointsRepr.frame_landmarks(self._hands, np.asarray(frame)))
+
+    def push_points(self, points: np.array) -> tp.List[tp.Dict[str, tp.Any]]:
+        """ Processes landmarks (21, 3) of the next frame (np.nan if hand is not found), returns match events """
+        points = np.broadcast_to(np.asarray(points, dtype=np.float64), (self.angle_transformer.cnt_points, 3))
+        if np.isnan(points).any():
+            return self.push_angles(np.full(len(self.angle_transformer), np.nan))
+        return self.push_angles(self.angle_transformer.transform_batch(points[None])[0])
+
+    def push_angles(self, angles: np.array) -> tp.List[tp.Dict[str, tp.Any]]:
+        """ Processes angles of the next frame (np.nan if hand is not found), returns match events """
+        self.cnt_frames += 1
+        if np.isnan(angles).any():
+            self._cnt_missing += 1
+            if self._cnt_missing > self.max_gap:
+                return self.reset()
+        else:
+            self._cnt_missing = 0
+        smoothed = self.smoother.push(angles)
+        if np.isnan(smoothed).any():
+            # nothing is seen since the last reset
+            self._matchers_start = self.cnt_frames
+            return []
+        return self._events(matcher.push(smoothed) for matcher in self.matchers)
+
+    def reset(self) -> tp.List[tp.Dict[str, tp.Any]]:
+        """ Forgets the stream (candidates of matchers are reported), returns match events """
+        events = self._events(matcher.flush() for matcher in self.matchers)
+        for matcher in self.matchers:
+            matcher.reset()
+        self.smoother.reset()
+        self._matchers_start = self.cnt_frames
+        self._cnt_missing = 0
+        return events
+
+    def _events(self, matches: tp.Iterable[tp.Optional[tp.Tuple[float, int, int]]]) -> tp.List[tp.Dict[str, tp.Any]]:
+        return [dict(template=ind, metadata=self.gallery.metadata[ind], distance=match[0],
+                     start=self._matchers_start + match[1], end=self._matchers_start + match[2])
+                for ind, match in enumerate(matches) if match is not None]
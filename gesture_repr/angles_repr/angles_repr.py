@@ -10,10 +10,7 @@ class AnglesRepr(GestureRepr):
     """Extracts and stores key angles from some point_repr using transformer"""
 
     def __init__(self, points_repr: PointsRepr, transformer: PointsToAnglesTransformer):
-        self.angles = np.empty((len(points_repr), len(transformer)))
-        # self.angles.shape
-        for i in range(len(points_repr)):
-            self.angles[i] = transformer.transform(points_repr[i])
+        self.angles = transformer.transform_batch(points_repr[:])
 
     def __len__(self) -> int:
         return len(self.angles)
@@ -32,6 +32,25 @@ class PointsToAnglesTransformer:
                                        points[second_to] - points[second_from])
                          for (first_from, first_to), (second_from, second_to) in self.angle_descriptions])
 
+    def transform_batch(self, points: np.array) -> np.array:
+        """
+        Vectorized transform for all frames at once
+        :param points: np.array (cnt_frames, cnt_points, dims)
+        :return: np.array of angles (cnt_frames, len(self)), np.nan if any coord of angle vectors is np.nan
+        """
+        points = np.asarray(points, dtype=np.float64)
+        assert points.ndim == 3 and points.shape[1] == self.cnt_points, \
+            f'expected points of shape (cnt_frames, {self.cnt_points}, dims), got {points.shape=}'
+        # indexes of shape (len(self), 2 vectors, (from, to))
+        indexes = np.array(self.angle_descriptions, dtype=int).reshape(-1, 2, 2)
+        vectors = points[:, indexes[:, :, 1]] - points[:, indexes[:, :, 0]]
+        norms = np.linalg.norm(vectors, axis=-1)
+        # as in angle_between, angle is np.nan if any of its vectors has np.nan, zero vectors are checked for the rest
+        defined = ~np.isnan(vectors).any(axis=(-2, -1))
+        assert not (norms[defined] == 0.0).any(), "Invalid vector norm, got zero vector"
+        cos = np.einsum('tkd,tkd->tk', vectors[:, :, 0], vectors[:, :, 1]) / (norms[:, :, 0] * norms[:, :, 1])
+        return np.arccos(np.clip(cos, -1.0, 1.0))
+
 
 def unit_vector(vector: tp.Sequence) -> tp.Sequence[float]:
     """ Returns the unit vector of the vector. """
@@ -0,0 +1,11 @@
+import typing as tp
+import numpy as np
+
+
+def iterate_video_capture(video_cap: tp.Any) -> tp.Iterator[np.array]:
+    """ Yields frames of cv2.VideoCapture one by one (without reading the whole video into memory) """
+    while video_cap.isOpened():
+        ret, frame = video_cap.read()
+        if not ret:
+            break
+        yield frame
@@ -0,0 +1,106 @@
+import os
+import json
+import hashlib
+import tempfile
+import typing as tp
+import numpy as np
+
+
+class LandmarkCache:
+    """
+    Content-addressed on-disk cache of landmarks (PointsRepr.values, (cnt_frames, 21, 3) float32 arrays).
+    Key is a hash of video file bytes and landmark extraction settings (e.g. MediaPipe params),
+    arrays are stored as .npy files and loaded memory-mapped.
+    Total size of cache is bounded by max_bytes, least recently used arrays are evicted.
+    """
+    # increase if format of stored arrays changes
+    format_version = 1
+
+    def __init__(self, cache_dir: str, max_bytes: int = 2 ** 30):
+        """
+        :param cache_dir: directory for cached arrays (created if doesn't exist)
+        :param max_bytes: maximal total size of cached arrays
+        """
+        assert max_bytes > 0, f'cache size should be positive, got {max_bytes=}'
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def key(self, video_path: str, settings: tp.Dict[str, tp.Any]) -> str:
+        """ Hash of video bytes and settings """
+        digest = hashlib.sha256()
+        with open(video_path, 'rb') as file:
+            for chunk in iter(lambda: file.read(2 ** 20), b''):
+                digest.update(chunk)
+        digest.update(json.dumps({'settings': settings, 'format_version': self.format_version},
+                                 sort_keys=True).encode())
+        return digest.hexdigest()
+
+    def get(self, key: str) -> tp.Optional[np.array]:
+        """ Memory-mapped cached array or None """
+        path = self._path(key)
+        try:
+            points = np.load(path, mmap_mode='r')
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        # modification time is used as time of last access for eviction
+        os.utime(path)
+        self.hits += 1
+        return points
+
+    def put(self, key: str, points: np.array) -> None:
+        """ Stores array (atomically) and evicts least recently used arrays to fit max_bytes """
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as file:
+            np.save(file, np.asarray(points, dtype=np.float32))
+        os.replace(tmp_path, self._path(key))
+        self._evict()
+
+    def get_or_compute(self, key: str, compute: tp.Callable[[], np.array]) -> np.array:
+        points = self.get(key)
+        if points is None:
+            points = compute()
+            self.put(key, points)
+        return points
+
+    @property
+    def stats(self) -> tp.Dict[str, int]:
+        entries = self._entries()
+        return {'hits': self.hits, 'misses': self.misses,
+                'entries': len(entries), 'bytes': sum(size for _, size, _ in entries)}
+
+    def clear(self) -> None:
+        for path, _, _ in self._entries():
+            os.remove(path)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + '.npy')
+
+    def _entries(self) -> tp.List[tp.Tuple[str, int, float]]:
+        """ (path, size, last access time) of cached arrays """
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.npy'):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((path, stat.st_size, stat.st_mtime))
+        return entries
+
+    def _evict(self) -> None:
+        entries = sorted(self._entries(), key=lambda entry: entry[2])
+        total_bytes = sum(size for _, size, _ in entries)
+        for path, size, _ in entries[:-1]:
+            if total_bytes <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total_bytes -= size
@@ -1,3 +1,5 @@
+import inspect
+import contextlib
 import numpy as np
 import mediapipe as mp
 import typing as tp
@@ -9,25 +11,125 @@ class PointsRepr(GestureRepr):
     """
     Extracts and stores key-points from frames of video.
     Uses MediaPipe -> 21 3d float points for each frame (or np.nan)
+
+    Frames are processed one by one, so video_frames may be any iterable (e.g. generator reading video),
+    only one frame (detection_step frames with decimation) and the landmarks buffer are kept in memory.
+
+    Decimation: MediaPipe processes every detection_step-th frame (and the last one),
+    if motion_tolerance is not None and landmarks of two consecutive processed frames differ by more than it
+    (or hand is found only on one of them), skipped frames between them are processed too.
+    Other skipped frames are linearly interpolated between processed frames (np.nan if hand is not found
+    on any of them), so shape of points is the same as without decimation.
+    MediaPipe tracks hand between frames (static_image_mode=False), so frames are given to every Hands instance
+    in increasing order: skipped frames are processed by a separate instance. With decimation the tracker sees
+    every detection_step-th frame only, so detections may differ from full-rate extraction
+    (not only on interpolated frames), benchmarks/landmark_decimation_benchmark.py measures it.
     """
+    initial_capacity = 256
+
+    def __init__(self, video_frames: tp.Iterable,
+                 model_complexity: int = 1,
+                 min_detection_confidence: float = 0.5,
+                 max_num_hands: int = 1,
+                 detection_step: int = 1,
+                 motion_tolerance: tp.Optional[float] = None):
+        """
+        :param video_frames: iterable of frames (h, w, rgb)
+        :param model_complexity: MediaPipe Hands param
+        :param min_detection_confidence: MediaPipe Hands param
+        :param max_num_hands: MediaPipe Hands param
+        :param detection_step: MediaPipe processes every detection_step-th frame
+        :param motion_tolerance: maximal displacement of landmark (in normalized MediaPipe coords)
+            between processed frames without processing skipped frames between them
+        """
+        assert detection_step >= 1, f'detection_step should be positive, got {detection_step=}'
+        capacity = len(video_frames) if hasattr(video_frames, '__len__') else self.initial_capacity
+        self.points = np.empty((max(capacity, 1), 21, 3), dtype='float32')
+        processed = []
+        skipped_frames: tp.List[tp.Tuple[int, np.array]] = []
+        last_processed = None
+        cnt_frames = 0
+        hands_params = dict(static_image_mode=False,
+                            max_num_hands=max_num_hands,
+                            model_complexity=model_complexity,
+                            min_detection_confidence=min_detection_confidence)
+        with contextlib.ExitStack() as stack:
+            hands = stack.enter_context(mp.solutions.hands.Hands(**hands_params))
+            # skipped frames are earlier than the last processed frame, so they are not given to its tracker
+            backfill_hands = (stack.enter_context(mp.solutions.hands.Hands(**hands_params))
+                              if motion_tolerance is not None and detection_step > 1 else None)
+            for frame in video_frames:
+                frame = np.asarray(frame)
+                assert len(frame.shape) == 3, f"Video is a sequence of frames, expected " \
+                                              f"3(h, w, rgb) dimensions of frame, got {len(frame.shape)=} " \
+                                              f"dimensions"
+                if cnt_frames == len(self.points):
+                    self.points = np.concatenate([self.points, np.empty_like(self.points)])
+                if last_processed is not None and cnt_frames - last_processed < detection_step:
+                    skipped_frames.append((cnt_frames, frame))
+                else:
+                    self._process_frame(hands, backfill_hands, cnt_frames, frame, last_processed, skipped_frames,
+                                        motion_tolerance, processed)
+                    last_processed = cnt_frames
+                cnt_frames += 1
+            if skipped_frames:
+                # the last frame is always processed, so there is no extrapolation
+                ind, frame = skipped_frames.pop()
+                self._process_frame(hands, backfill_hands, ind, frame, last_processed, skipped_frames,
+                                    motion_tolerance, processed)
+        self.points = self.points[:cnt_frames].copy()
+        self._interpolate_skipped(np.array(processed, dtype=int))
+
+    def _process_frame(self, hands: tp.Any, backfill_hands: tp.Any, ind: int, frame: np.array,
+                       last_processed: tp.Optional[int], skipped_frames: tp.List[tp.Tuple[int, np.array]],
+                       motion_tolerance: tp.Optional[float], processed: tp.List[int]) -> None:
+        """
+        Processes frame by hands, then skipped frames before it by backfill_hands
+        if landmarks moved too much since last processed one
+        """
+        self.points[ind] = self.frame_landmarks(hands, frame)
+        if motion_tolerance is not None and skipped_frames:
+            motion = np.abs(self.points[ind] - self.points[last_processed]).max()
+            if not motion <= motion_tolerance:
+                # nan motion: hand is found only on one of frames
+                for skipped_ind, skipped_frame in skipped_frames:
+                    self.points[skipped_ind] = self.frame_landmarks(backfill_hands, skipped_frame)
+                    processed.append(skipped_ind)
+        skipped_frames.clear()
+        processed.append(ind)
+
+    @staticmethod
+    def frame_landmarks(hands: tp.Any, frame: np.array) -> np.array:
+        """ Landmarks (21, 3) of the first hand found by MediaPipe Hands on frame, np.nan if there is no hand """
+        res = hands.process(frame)
+        return (np.array([[landmark.x, landmark.y, landmark.z]
+                          for landmark in res.multi_hand_landmarks[0].landmark])
+                if res.multi_hand_landmarks is not None
+                else np.nan)
+
+    def _interpolate_skipped(self, processed: np.array) -> None:
+        """ Fills not processed frames by linear interpolation between nearest processed frames """
+        processed = np.sort(processed)
+        skipped = np.setdiff1d(np.arange(len(self.points)), processed)
+        if len(skipped) == 0:
+            return
+        right = processed[np.searchsorted(processed, skipped)]
+        left = processed[np.searchsorted(processed, skipped) - 1]
+        weights = ((skipped - left) / (right - left)).astype('float32')[:, None, None]
+        self.points[skipped] = (1 - weights) * self.points[left] + weights * self.points[right]
+
+    @classmethod
+    def hands_settings(cls, **hands_params) -> tp.Dict[str, tp.Any]:
+        """ MediaPipe params used by constructor with given hands_params (including defaults) """
+        params = list(inspect.signature(cls.__init__).parameters.values())[2:]
+        return {param.name: hands_params.get(param.name, param.default) for param in params}
 
-    def __init__(self, video_frames: tp.Sequence):
-        video_frames = np.array(video_frames)
-        assert len(video_frames.shape) == 4, f"Video is a sequence of frames, expected" \
-                                             f"4(cnt_frames, h, w, rgb) dimensions, got {len(video_frames.shape)=} " \
-                                             f"dimensions"
-        self.points = np.empty((video_frames.shape[0], 21, 3), dtype='float32')
-        with mp.solutions.hands.Hands(
-                static_image_mode=False,
-                max_num_hands=1,
-                model_complexity=1,
-                min_detection_confidence=0.5) as hands:
-            for i, frame in enumerate(video_frames):
-                res = hands.process(frame)
-                self.points[i] = (np.array([[landmark.x, landmark.y, landmark.z]
-                                            for landmark in res.multi_hand_landmarks[0].landmark])
-                                  if res.multi_hand_landmarks is not None
-                                  else np.array([[np.nan, np.nan, np.nan]] * 21))
+    @classmethod
+    def from_points(cls, points: np.array) -> 'PointsRepr':
+        """ Creates representation from already extracted key-points (cnt_frames, 21, 3) """
+        points_repr = cls.__new__(cls)
+        points_repr.points = points
+        return points_repr
 
     def __len__(self) -> int:
         return len(self.points)
@@ -45,4 +147,4 @@ class PointsRepr(GestureRepr):
 
     @values.setter
     def values(self, val: tp.Any):
-        self.points = val
\ No newline at end of file
+        self.points = val
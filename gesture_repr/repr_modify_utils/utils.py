@@ -1,32 +1,95 @@
+import copy
 import numpy as np
 import typing as tp
-import pandas as pd
-from copy import deepcopy
 
 from abstract_classes.gesture_repr import GestureRepr
 
+# Functions accept GestureRepr (e.g. PointsRepr, AnglesRepr) or np.array (time, ...) and return the same type.
+# Rows (time points) are checked for np.nan over all other dims, columns are all other dims flattened.
+# inplace=True modifies given repr (its values are replaced by view or modified in place),
+# otherwise shallow copy of repr is returned, its values may share memory with values of given repr.
 
-def erase_nan_prefix_suffix(gesture_repr: GestureRepr) -> tp.Optional[GestureRepr]:
-    """Erases lines with at least one np.nan on prefix and suffix"""
-    left, right = 0, gesture_repr.shape[0]
-    while left < right and np.isnan(gesture_repr[left:left + 1, :]).any():
-        left += 1
-    while left < right and np.isnan(gesture_repr[right - 1:right, :]).any():
-        right -= 1
-    if left == right:
+
+def nan_rows(gesture_repr: tp.Union[GestureRepr, np.array]) -> np.array:
+    """ Boolean mask of rows with at least one np.nan """
+    values = _values(gesture_repr)
+    return np.isnan(values.reshape(len(values), -1)).any(axis=1)
+
+
+def nan_prefix_suffix_bounds(gesture_repr: tp.Union[GestureRepr, np.array]) -> tp.Optional[tp.Tuple[int, int]]:
+    """ [left, right) bounds of rows without nan prefix and suffix, None if all rows have np.nan """
+    not_nan = np.flatnonzero(~nan_rows(gesture_repr))
+    if len(not_nan) == 0:
         return None
-    return gesture_repr[left:right, :]
+    return not_nan[0], not_nan[-1] + 1
 
 
-def nan_percentage(gesture_repr: GestureRepr) -> float:
+def erase_nan_prefix_suffix(gesture_repr: tp.Union[GestureRepr, np.array],
+                            inplace: bool = False) -> tp.Optional[tp.Union[GestureRepr, np.array]]:
+    """Erases lines with at least one np.nan on prefix and suffix (values become view), None if nothing is left"""
+    bounds = nan_prefix_suffix_bounds(gesture_repr)
+    if bounds is None:
+        return None
+    left, right = bounds
+    return _with_values(gesture_repr, _values(gesture_repr)[left:right], inplace)
+
+
+def nan_percentage(gesture_repr: tp.Union[GestureRepr, np.array]) -> float:
     """Calculates percentage of lines with at least one np.nan"""
-    return np.isnan(gesture_repr).any(axis=1).sum() / gesture_repr.shape[0]
+    return nan_rows(gesture_repr).mean()
+
+
+def interpolate(gesture_repr: tp.Union[GestureRepr, np.array],
+                inplace: bool = False) -> tp.Union[GestureRepr, np.array]:
+    """
+    Interpolates every np.nan by columns linearly, np.nan on prefix and suffix of column
+    is filled by the nearest not nan value (columns of only np.nan are left as is).
+    Without inplace, values are copied only if they have np.nan. Inplace values are copied if they are read-only
+    (e.g. memory-mapped), non-contiguous values are modified in place too (through flattened copy)
+    """
+    values = _values(gesture_repr)
+    is_nan = np.isnan(values)
+    if not is_nan.any():
+        return _with_values(gesture_repr, values, inplace)
+    if not inplace or not values.flags.writeable:
+        values = values.copy()
+    # view for contiguous values, copy otherwise (then it is written back)
+    columns = values.reshape(len(values), -1)
+    is_nan = is_nan.reshape(columns.shape)
+
+    rows = np.arange(len(columns))[:, None]
+    # previous and next not nan row of every cell (-1 and len if there is no such row)
+    prev_rows = np.maximum.accumulate(np.where(is_nan, -1, rows), axis=0)
+    next_rows = np.minimum.accumulate(np.where(is_nan, len(columns), rows)[::-1], axis=0)[::-1]
+
+    nan_row_ids, nan_col_ids = np.nonzero(is_nan)
+    prev_ids = prev_rows[nan_row_ids, nan_col_ids]
+    next_ids = next_rows[nan_row_ids, nan_col_ids]
+    # columns of only np.nan are skipped, prefix and suffix are filled by the nearest value
+    filled = (prev_ids >= 0) | (next_ids < len(columns))
+    nan_row_ids, nan_col_ids = nan_row_ids[filled], nan_col_ids[filled]
+    prev_ids, next_ids = prev_ids[filled], next_ids[filled]
+    prev_ids, next_ids = (np.where(prev_ids < 0, next_ids, prev_ids),
+                          np.where(next_ids == len(columns), prev_ids, next_ids))
+
+    prev_vals = columns[prev_ids, nan_col_ids]
+    next_vals = columns[next_ids, nan_col_ids]
+    weights = (nan_row_ids - prev_ids) / np.maximum(next_ids - prev_ids, 1)
+    columns[nan_row_ids, nan_col_ids] = prev_vals + weights * (next_vals - prev_vals)
+    if not np.shares_memory(columns, values):
+        values[...] = columns.reshape(values.shape)
+    return _with_values(gesture_repr, values, inplace)
+
+
+def _values(gesture_repr: tp.Union[GestureRepr, np.array]) -> np.array:
+    return np.asarray(gesture_repr.values if isinstance(gesture_repr, GestureRepr) else gesture_repr)
 
 
-def interpolate(gesture_repr: GestureRepr) -> GestureRepr:
-    """Interpolates every np.nan by columns, supposes that gesture_repr.values is 2d np.array"""
-    ans = deepcopy(gesture_repr)
-    df = pd.DataFrame(ans.values)
-    df.interpolate(method='linear', limit_direction='both', inplace=True)
-    ans.values = df.values
-    return ans
+def _with_values(gesture_repr: tp.Union[GestureRepr, np.array], values: np.array,
+                 inplace: bool) -> tp.Union[GestureRepr, np.array]:
+    if not isinstance(gesture_repr, GestureRepr):
+        return values
+    if not inplace:
+        gesture_repr = copy.copy(gesture_repr)
+    gesture_repr.values = values
+    return gesture_repr
@@ -0,0 +1,160 @@
+import time
+import contextlib
+import typing as tp
+import numpy as np
+
+
+class CallStats:
+    """
+    Statistics of one call (e.g. DummyController.proba_is_valid):
+        stage_times: wall time of stages in seconds (time of repeated stage is summed)
+        counters: work counters (e.g. frames, nan_ratio, gpr_iterations, dp_cells, templates_pruned)
+    """
+    enabled = True
+
+    def __init__(self, name: str):
+        self.name = name
+        self.total_time = 0.0
+        self.stage_times: tp.Dict[str, float] = {}
+        self.counters: tp.Dict[str, float] = {}
+
+    @contextlib.contextmanager
+    def stage(self, name: str) -> tp.Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stage_times[name] = self.stage_times.get(name, 0.0) + time.perf_counter() - start
+
+    def count(self, name: str, value: float = 1) -> None:
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def timed_iter(self, iterable: tp.Iterable, stage: str) -> tp.Iterator:
+        """ Iterates over iterable, time spent in its __next__ (e.g. decoding of frames) is added to stage """
+        iterator = iter(iterable)
+        while True:
+            with self.stage(stage):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+    def as_dict(self) -> tp.Dict[str, tp.Any]:
+        return {'name': self.name, 'total_time': self.total_time,
+                'stage_times': dict(self.stage_times), 'counters': dict(self.counters)}
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}({self.as_dict()})'
+
+
+class _DisabledCallStats(CallStats):
+    """ Does nothing, used when statistics are not recorded """
+    enabled = False
+
+    def stage(self, name: str) -> tp.ContextManager[None]:
+        return contextlib.nullcontext()
+
+    def count(self, name: str, value: float = 1) -> None:
+        pass
+
+    def timed_iter(self, iterable: tp.Iterable, stage: str) -> tp.Iterable:
+        return iterable
+
+
+DISABLED_STATS = _DisabledCallStats('disabled')
+
+
+class Histogram:
+    """ Histogram with logarithmic buckets (4 per decade), values <= 0 are counted in separate bucket """
+    edges = 10.0 ** np.arange(-7.0, 13.0, 0.25)
+
+    def __init__(self):
+        self.bucket_counts = np.zeros(len(self.edges) + 1, dtype=np.int64)
+        self.cnt_nonpositive = 0
+        self.count = 0
+        self.sum = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        self.sum += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        if value <= 0:
+            self.cnt_nonpositive += 1
+        else:
+            self.bucket_counts[np.searchsorted(self.edges, value)] += 1
+
+    def quantile(self, q: float) -> float:
+        """ Upper edge of bucket with q-quantile (clipped by min and max) """
+        if self.count == 0:
+            return np.nan
+        rank = q * self.count
+        if rank <= self.cnt_nonpositive:
+            return min(0.0, self.max)
+        bucket = np.searchsorted(np.cumsum(self.bucket_counts), rank - self.cnt_nonpositive)
+        upper = self.edges[bucket] if bucket < len(self.edges) else np.inf
+        return float(np.clip(upper, self.min, self.max))
+
+    def summary(self) -> tp.Dict[str, float]:
+        return {'count': self.count, 'mean': self.sum / self.count if self.count else np.nan,
+                'min': self.min, 'p50': self.quantile(0.5), 'p90': self.quantile(0.9), 'p99': self.quantile(0.99),
+                'max': self.max}
+
+
+class StatsRecorder:
+    """
+    Collects CallStats of calls: keeps the last one of every call name and cumulative histograms
+    of stage times and counters, keyed by '{call name}.time', '{call name}.time.{stage}', '{call name}.{counter}'.
+    callback (if not None) is called with every recorded CallStats, e.g. to export it into monitoring.
+    """
+    def __init__(self, callback: tp.Optional[tp.Callable[[CallStats], None]] = None):
+        self.callback = callback
+        self.last: tp.Dict[str, CallStats] = {}
+        self.histograms: tp.Dict[str, Histogram] = {}
+
+    def record(self, stats: CallStats) -> None:
+        self.last[stats.name] = stats
+        self._add(f'{stats.name}.time', stats.total_time)
+        for stage, stage_time in stats.stage_times.items():
+            self._add(f'{stats.name}.time.{stage}', stage_time)
+        for counter, value in stats.counters.items():
+            self._add(f'{stats.name}.{counter}', value)
+        if self.callback is not None:
+            self.callback(stats)
+
+    def summary(self) -> tp.Dict[str, tp.Dict[str, float]]:
+        return {key: histogram.summary() for key, histogram in sorted(self.histograms.items())}
+
+    def reset(self) -> None:
+        self.last.clear()
+        self.histograms.clear()
+
+    def _add(self, key: str, value: float) -> None:
+        if key not in self.histograms:
+            self.histograms[key] = Histogram()
+        self.histograms[key].add(value)
+
+
+@contextlib.contextmanager
+def recording(recorder: tp.Optional[StatsRecorder], name: str,
+              stats: tp.Optional[CallStats] = None) -> tp.Iterator[CallStats]:
+    """
+    Statistics of call: if stats is given (call is a part of outer call), they are used as is,
+    else new CallStats are recorded by recorder after the call (DISABLED_STATS if recorder is None)
+    """
+    if stats is not None:
+        yield stats
+        return
+    if recorder is None:
+        yield DISABLED_STATS
+        return
+    stats = CallStats(name)
+    start = time.perf_counter()
+    try:
+        yield stats
+    finally:
+        stats.total_time = time.perf_counter() - start
+        recorder.record(stats)
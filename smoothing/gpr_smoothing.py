@@ -1,16 +1,21 @@
 import typing as tp
 import pandas as pd
 import numpy as np
+from scipy.linalg import cho_solve
 from sklearn.gaussian_process import GaussianProcessRegressor
 from sklearn.gaussian_process.kernels import WhiteKernel, RBF, Kernel
 
+from instrumentation.call_stats import CallStats
+
 
 def gpr_time_series_smoothing(time_series: np.array,
                               cnt_iter: int = 15,
                               kernel: tp.Optional[Kernel] = None,
                               method: str = 'linear',
                               return_last_gpr_mean_std: bool = False,
-                              remove_convergence_warnings: bool = True) -> tp.Sequence:
+                              remove_convergence_warnings: bool = True,
+                              refit_kernel: str = 'always',
+                              stats: tp.Optional[CallStats] = None) -> tp.Sequence:
     """
     Uses Gauss Process Regression (GPR) for estimating mean and std of time series
      if x_t not in mean_t +- std_t, then x_t treated as outlier and it will be interpolated
@@ -30,36 +35,139 @@ def gpr_time_series_smoothing(time_series: np.array,
             Defines whether return mean and std of last iteration GPR fitting with smoothed time series or not.
     :param remove_convergence_warnings:
         Just defines whether to remove sklearn.exceptions.ConvergenseWarning or not
+    :param refit_kernel:
+            Defines how kernel hyperparameters are fitted on iterations
+               - 'always': kernel is optimized from scratch on every iteration
+               - 'warm_start': optimization starts from kernel optimized on previous iteration
+               - 'first': kernel is optimized on the first iteration only, then its Cholesky factorization
+                          is reused (only targets change), iteration costs O(n^2) instead of O(n^3)
+    :param stats:
+            If not None, count of used iterations is added to its gpr_iterations counter
     :return:
             - if return_last_gpr_mean_std == True --> tuple(smoothed_ts, gpr_mean, gpr_std)
             - else --> smoothed_ts
     """
     assert cnt_iter >= 1, f"wrong cnt_iter! got {cnt_iter=}"
+    assert refit_kernel in ('always', 'warm_start', 'first'), f"wrong refit_kernel! got {refit_kernel=}"
 
     time_series_ = pd.Series(time_series.copy())
     len_ts = len(time_series)
+    time_grid = np.arange(len_ts)[..., None]
 
     if kernel is None:
-        kernel = WhiteKernel(noise_level_bounds=[0.001, 0.05]) + RBF(length_scale_bounds=[2, len_ts / 7])
+        kernel = default_kernel(len_ts)
 
     if remove_convergence_warnings:
-        import warnings
-        from sklearn.exceptions import ConvergenceWarning
-        warnings.filterwarnings("ignore", category=ConvergenceWarning)
+        _remove_convergence_warnings()
 
+    factorization = None
     for it in range(cnt_iter):
-        model = GaussianProcessRegressor(kernel=kernel)
-        model.fit(np.arange(len_ts)[..., None], time_series_)
-        mean, std = model.predict(np.arange(len_ts)[..., None], return_std=True)
+        if it == 0 or refit_kernel != 'first':
+            model = GaussianProcessRegressor(kernel=kernel)
+            model.fit(time_grid, time_series_)
+            mean, std = model.predict(time_grid, return_std=True)
+            if refit_kernel == 'warm_start':
+                kernel = model.kernel_
+        else:
+            if factorization is None:
+                factorization = _factorize(model, time_grid)
+            mean = _factorized_mean(factorization, time_series_.values)
 
         mask = (time_series_ < mean - std) | (time_series_ > mean + std)
         if not mask.any():
             break
         time_series_[mask] = np.nan
 
-        assert not np.isnan(time_series_).all(), f"All time series considered as outlier, got {kernel=},  {time_series=}"
+        assert not np.isnan(time_series_).all(), \
+            f"All time series considered as outlier, got {kernel=},  {time_series=}"
         time_series_.interpolate(method=method, limit_direction='both', inplace=True)
 
+    if stats is not None:
+        stats.count('gpr_iterations', it + 1)
     if return_last_gpr_mean_std:
         return time_series_.values, mean, std
     return time_series_.values
+
+
+def gpr_gesture_smoothing(gesture: np.array,
+                          cnt_iter: int = 15,
+                          kernel: tp.Optional[Kernel] = None,
+                          method: str = 'linear',
+                          return_last_gpr_mean_std: bool = False,
+                          remove_convergence_warnings: bool = True,
+                          stats: tp.Optional[CallStats] = None) -> np.array:
+    """
+    gpr_time_series_smoothing for all time series (columns) of gesture at once.
+    All columns lie on the same time grid, so one kernel is fitted on all of them (multi-output GPR)
+    on the first iteration, its Cholesky factorization is shared by all columns and all iterations.
+    Iterations of a column stop when it has no outliers, as in gpr_time_series_smoothing.
+
+    :param gesture: 2d np.array (time, columns)
+    other params are the same as in gpr_time_series_smoothing
+    :return: the same as np.array of gpr_time_series_smoothing results for every column:
+            - if return_last_gpr_mean_std == True --> np.array (columns, 3 (smoothed_ts, gpr_mean, gpr_std), time)
+            - else --> np.array (columns, time)
+    """
+    assert cnt_iter >= 1, f"wrong cnt_iter! got {cnt_iter=}"
+    gesture_ = pd.DataFrame(np.array(gesture, dtype=np.float64))
+    len_ts = len(gesture_)
+    time_grid = np.arange(len_ts)[..., None]
+
+    if kernel is None:
+        kernel = default_kernel(len_ts)
+
+    if remove_convergence_warnings:
+        _remove_convergence_warnings()
+
+    model = GaussianProcessRegressor(kernel=kernel)
+    model.fit(time_grid, gesture_.values)
+    mean, std = model.predict(time_grid, return_std=True)
+    # sklearn drops the target axis of one column gesture
+    mean = mean.reshape(len_ts, -1)
+    std = std if std.ndim == 1 else std[:, 0]
+    factorization = None
+
+    active = np.ones(gesture_.shape[1], dtype=bool)
+    for it in range(cnt_iter):
+        if it > 0:
+            if factorization is None:
+                factorization = _factorize(model, time_grid)
+            mean[:, active] = _factorized_mean(factorization, gesture_.values[:, active])
+
+        mask = (gesture_.values < mean - std[:, None]) | (gesture_.values > mean + std[:, None])
+        mask[:, ~active] = False
+        active &= mask.any(axis=0)
+        if not active.any():
+            break
+        gesture_[mask] = np.nan
+
+        assert not np.isnan(gesture_.values).all(axis=0).any(), \
+            f"All time series considered as outlier, got {kernel=},  {gesture=}"
+        gesture_.interpolate(method=method, limit_direction='both', inplace=True)
+
+    if stats is not None:
+        stats.count('gpr_iterations', it + 1)
+    if return_last_gpr_mean_std:
+        return np.stack([gesture_.values.T, mean.T, np.broadcast_to(std, mean.T.shape)], axis=1)
+    return gesture_.values.T
+
+
+def default_kernel(len_ts: int) -> Kernel:
+    return WhiteKernel(noise_level_bounds=[0.001, 0.05]) + RBF(length_scale_bounds=[2, len_ts / 7])
+
+
+def _remove_convergence_warnings() -> None:
+    import warnings
+    from sklearn.exceptions import ConvergenceWarning
+    warnings.filterwarnings("ignore", category=ConvergenceWarning)
+
+
+def _factorize(model: GaussianProcessRegressor, time_grid: np.array) -> tp.Tuple[np.array, np.array]:
+    """ Cross-covariance of time grid with training points and Cholesky factor of fitted model """
+    return model.kernel_(time_grid, model.X_train_), model.L_
+
+
+def _factorized_mean(factorization: tp.Tuple[np.array, np.array], targets: np.array) -> np.array:
+    """ GPR posterior mean for new targets on the same training points (normalize_y=False) """
+    k_trans, cholesky_factor = factorization
+    return k_trans @ cho_solve((cholesky_factor, True), targets)
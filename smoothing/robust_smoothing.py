@@ -0,0 +1,154 @@
+import typing as tp
+import pandas as pd
+import numpy as np
+from scipy.signal import savgol_filter
+
+# Linear time outlier-robust alternatives of gpr_time_series_smoothing with the same contract:
+#     x_t not in mean_t +- n_sigmas * std_t is treated as outlier and interpolated,
+#     return_last_gpr_mean_std (named as in gpr_time_series_smoothing, so smooth_gesture params are the same)
+#     defines whether to return (smoothed_ts, mean, std) or smoothed_ts.
+#     NaN samples are missing: they are not used for estimation of mean and std and are interpolated as outliers
+
+# std of normal distribution = MAD_SCALE * median absolute deviation
+MAD_SCALE = 1.4826
+
+
+def hampel_time_series_smoothing(time_series: np.array,
+                                 window: int = 7,
+                                 n_sigmas: float = 3.0,
+                                 method: str = 'linear',
+                                 return_last_gpr_mean_std: bool = False) -> tp.Sequence:
+    """
+    Hampel filter: mean is rolling median, std is scaled rolling median absolute deviation, O(n * log(window))
+
+    :param time_series: Time series to be smoothed
+    :param window: half-width of rolling window (window size is 2 * window + 1)
+    :param n_sigmas: x_t is outlier if |x_t - mean_t| > n_sigmas * std_t
+    :param method: Interpolation method passed to pandas.Series.interpolate
+    :param return_last_gpr_mean_std: return (smoothed_ts, mean, std) or smoothed_ts
+    """
+    time_series_ = pd.Series(np.array(time_series, dtype=np.float64))
+    rolling_params = dict(window=2 * window + 1, center=True, min_periods=1)
+    mean = time_series_.rolling(**rolling_params).median().values
+    std = MAD_SCALE * pd.Series(np.abs(time_series_.values - mean)).rolling(**rolling_params).median().values
+    time_series_ = _interpolate_outliers(time_series_, mean, n_sigmas * std, method)
+    if return_last_gpr_mean_std:
+        return time_series_.values, mean, std
+    return time_series_.values
+
+
+def savgol_time_series_smoothing(time_series: np.array,
+                                 window: int = 7,
+                                 polyorder: int = 3,
+                                 n_sigmas: float = 2.0,
+                                 cnt_iter: int = 3,
+                                 method: str = 'linear',
+                                 return_last_gpr_mean_std: bool = False) -> tp.Sequence:
+    """
+    Savitzky-Golay filter with iterative outlier removal (fit->find_outliers->interpolate), O(n * window) per iteration.
+    std is robust (MAD) estimation of residuals std, constant over time.
+
+    :param time_series: Time series to be smoothed
+    :param window: half-width of filter window (window size is 2 * window + 1, clipped by series length)
+    :param polyorder: order of polynomial fitted in window
+    :param n_sigmas: x_t is outlier if |x_t - mean_t| > n_sigmas * std_t
+    :param cnt_iter: maximal count of iterations, cnt_iter >= 1
+    :param method: Interpolation method passed to pandas.Series.interpolate
+    :param return_last_gpr_mean_std: return (smoothed_ts, mean, std) or smoothed_ts
+    """
+    assert cnt_iter >= 1, f"wrong cnt_iter! got {cnt_iter=}"
+    time_series_ = pd.Series(np.array(time_series, dtype=np.float64))
+    window_length = min(2 * window + 1, len(time_series_) - (len(time_series_) + 1) % 2)
+    polyorder = min(polyorder, window_length - 1)
+    # missing samples are interpolated, savgol_filter doesn't accept NaN
+    time_series_ = _interpolate_outliers(time_series_, np.zeros(len(time_series_)), np.inf, method)
+    for it in range(cnt_iter):
+        mean = savgol_filter(time_series_.values, window_length, polyorder, mode='interp')
+        std = np.full(len(mean), _robust_std(time_series_.values - mean))
+        outliers = np.abs(time_series_.values - mean) > n_sigmas * std
+        if not outliers.any():
+            break
+        time_series_ = _interpolate_outliers(time_series_, mean, n_sigmas * std, method)
+    if return_last_gpr_mean_std:
+        return time_series_.values, mean, std
+    return time_series_.values
+
+
+def kalman_time_series_smoothing(time_series: np.array,
+                                 process_noise: float = 1e-4,
+                                 measurement_noise: tp.Optional[float] = None,
+                                 n_sigmas: float = 3.0,
+                                 method: str = 'linear',
+                                 return_last_gpr_mean_std: bool = False) -> tp.Sequence:
+    """
+    Kalman filter + Rauch-Tung-Striebel smoother with constant velocity model, O(n).
+    Measurements with innovation > n_sigmas * innovation std are skipped by the filter (treated as outliers).
+    mean is smoothed state, std is std of measurement around it.
+
+    :param time_series: Time series to be smoothed
+    :param process_noise: variance of acceleration per step
+    :param measurement_noise: variance of measurement noise,
+        if None it is estimated with MAD of first differences of time series
+    :param n_sigmas: measurement is outlier if its innovation > n_sigmas * innovation std
+    :param method: Interpolation method passed to pandas.Series.interpolate
+    :param return_last_gpr_mean_std: return (smoothed_ts, mean, std) or smoothed_ts
+    """
+    values = np.array(time_series, dtype=np.float64)
+    len_ts = len(values)
+    observed = ~np.isnan(values)
+    assert observed.any(), f"All time series is missing, got {time_series=}"
+    if measurement_noise is None:
+        measurement_noise = max(_robust_std(np.diff(values[observed])) ** 2 / 2, 1e-12) \
+            if observed.sum() > 1 else 1.0
+
+    transition = np.array([[1.0, 1.0], [0.0, 1.0]])
+    process_cov = process_noise * np.array([[0.25, 0.5], [0.5, 1.0]])
+    filtered_states = np.empty((len_ts, 2))
+    filtered_covs = np.empty((len_ts, 2, 2))
+    predicted_states = np.empty((len_ts, 2))
+    predicted_covs = np.empty((len_ts, 2, 2))
+    state = np.array([values[observed][0], 0.0])
+    cov = np.diag([measurement_noise, measurement_noise])
+    for t in range(len_ts):
+        if t > 0:
+            state = transition @ state
+            cov = transition @ cov @ transition.T + process_cov
+        predicted_states[t], predicted_covs[t] = state, cov
+        innovation = values[t] - state[0]
+        innovation_var = cov[0, 0] + measurement_noise
+        # missing measurement is skipped as outlier
+        if innovation ** 2 <= n_sigmas ** 2 * innovation_var:
+            gain = cov[:, 0] / innovation_var
+            state = state + gain * innovation
+            cov = cov - np.outer(gain, cov[0])
+        filtered_states[t], filtered_covs[t] = state, cov
+
+    smoothed_states = filtered_states.copy()
+    smoothed_covs = filtered_covs.copy()
+    for t in range(len_ts - 2, -1, -1):
+        smoother_gain = filtered_covs[t] @ transition.T @ np.linalg.inv(predicted_covs[t + 1])
+        smoothed_states[t] = filtered_states[t] + smoother_gain @ (smoothed_states[t + 1] - predicted_states[t + 1])
+        smoothed_covs[t] = filtered_covs[t] + smoother_gain @ (smoothed_covs[t + 1] - predicted_covs[t + 1]) \
+            @ smoother_gain.T
+
+    mean = smoothed_states[:, 0]
+    std = np.sqrt(smoothed_covs[:, 0, 0] + measurement_noise)
+    time_series_ = _interpolate_outliers(pd.Series(values), mean, n_sigmas * std, method)
+    if return_last_gpr_mean_std:
+        return time_series_.values, mean, std
+    return time_series_.values
+
+
+def _robust_std(residuals: np.array) -> float:
+    return MAD_SCALE * np.median(np.abs(residuals - np.median(residuals)))
+
+
+def _interpolate_outliers(time_series: pd.Series, mean: np.array, tolerance: np.array, method: str) -> pd.Series:
+    """ Replaces x_t not in mean_t +- tolerance_t (and missing x_t) by interpolation of other points """
+    outliers = ~(np.abs(time_series.values - mean) <= tolerance)
+    if not outliers.any():
+        return time_series
+    assert not outliers.all(), f"All time series considered as outlier, got {time_series.values=}"
+    time_series = time_series.copy()
+    time_series[outliers] = np.nan
+    return time_series.interpolate(method=method, limit_direction='both')
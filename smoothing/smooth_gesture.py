@@ -1,5 +1,7 @@
 import typing as tp
+import functools
 import numpy as np
+from concurrent.futures import Executor, ProcessPoolExecutor
 
 from abstract_classes.gesture_repr import GestureRepr
 from smoothing.gpr_smoothing import gpr_time_series_smoothing
@@ -7,6 +9,9 @@ from smoothing.gpr_smoothing import gpr_time_series_smoothing
 
 def smooth_gesture(gesture_repr: GestureRepr,
                    smoothing_func: tp.Callable = gpr_time_series_smoothing,
+                   channelwise: bool = True,
+                   n_jobs: tp.Optional[int] = None,
+                   executor: tp.Optional[Executor] = None,
                    **smoothing_func_params):
     """
     Supposes that gesture_repr is a 2d np.array with first dim --- time
@@ -14,11 +19,42 @@ def smooth_gesture(gesture_repr: GestureRepr,
         Some gesture representation to be smoothed
     :param smoothing_func:
         Function that smooth each time series of gesture
+    :param channelwise:
+        If False, smoothing_func gets the whole 2d gesture and returns stacked results for all time series
+        (e.g. gpr_gesture_smoothing, which shares one fitted kernel across time series)
+    :param n_jobs:
+        If not None (and executor is None), time series are smoothed by a temporary pool of n_jobs processes
+        (see smoothing_executor). smoothing_func and its params should be picklable
+    :param executor:
+        Executor used for smoothing time series in parallel, reuse it between calls to avoid starting workers
+        on every gesture. Results are in the order of time series for any executor
     :param smoothing_func_params:
         Params for passing to the smoothing_func
     :return:
         Smoothed gesture in the same representation
     """
+    if not channelwise:
+        return np.asarray(smoothing_func(gesture_repr[:, :], **smoothing_func_params))
+    if executor is None and n_jobs is not None:
+        with smoothing_executor(n_jobs) as executor:
+            return smooth_gesture(gesture_repr, smoothing_func, executor=executor, **smoothing_func_params)
+    if executor is not None:
+        return np.array(list(executor.map(functools.partial(smoothing_func, **smoothing_func_params),
+                                          [gesture_repr[:, i] for i in range(gesture_repr.shape[1])])))
     ans = np.array([smoothing_func(gesture_repr[:, i], **smoothing_func_params)
                     for i in range(gesture_repr.shape[1])])
     return ans
+
+
+def smoothing_executor(n_jobs: int, blas_threads_per_job: int = 1) -> ProcessPoolExecutor:
+    """
+    Process pool for smooth_gesture. Every worker limits BLAS/OpenMP threads (used by sklearn GPR)
+    to blas_threads_per_job, so n_jobs workers don't oversubscribe the machine
+    """
+    return ProcessPoolExecutor(n_jobs, initializer=_limit_blas_threads, initargs=(blas_threads_per_job,))
+
+
+def _limit_blas_threads(cnt_threads: int) -> None:
+    from threadpoolctl import threadpool_limits
+    # limits are kept for the whole life of worker process
+    _limit_blas_threads.limits = threadpool_limits(limits=cnt_threads)
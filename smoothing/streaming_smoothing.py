@@ -0,0 +1,63 @@
+import typing as tp
+import numpy as np
+
+
+class StreamingKalmanSmoother:
+    """
+    Causal (filtering only) version of kalman_time_series_smoothing for streams: constant velocity
+    Kalman filter for every channel, updated with one sample per push, O(channels) per sample.
+    Measurements with innovation > n_sigmas * innovation std are skipped (treated as outliers),
+    but after max_skipped skipped measurements in a row the next one is accepted (motion, not outlier).
+    np.nan measurements (e.g. hand is not found) are skipped too, state is predicted.
+    """
+    def __init__(self, cnt_channels: int,
+                 process_noise: float = 1e-2,
+                 measurement_noise: float = 1e-3,
+                 n_sigmas: float = 3.0,
+                 max_skipped: int = 3):
+        """
+        :param cnt_channels: count of channels of samples
+        :param process_noise: variance of acceleration per step
+        :param measurement_noise: variance of measurement noise
+        :param n_sigmas: measurement is outlier if its innovation > n_sigmas * innovation std
+        :param max_skipped: count of outliers in a row after which measurement is accepted
+        """
+        self.cnt_channels = cnt_channels
+        self.process_noise = process_noise
+        self.measurement_noise = measurement_noise
+        self.n_sigmas = n_sigmas
+        self.max_skipped = max_skipped
+        self.transition = np.array([[1.0, 1.0], [0.0, 1.0]])
+        self.process_cov = process_noise * np.array([[0.25, 0.5], [0.5, 1.0]])
+        self.reset()
+
+    def reset(self) -> None:
+        """ Forgets state, the next sample starts new series """
+        self.state: tp.Optional[np.array] = None  # (channels, 2): value and velocity
+        self.cov: tp.Optional[np.array] = None  # (channels, 2, 2)
+        self.cnt_skipped = np.zeros(self.cnt_channels, dtype=int)
+
+    def push(self, sample: np.array) -> np.array:
+        """ Filters the next sample (channels,), returns smoothed value (np.nan until the first measurement) """
+        sample = np.asarray(sample, dtype=np.float64)
+        if self.state is None:
+            if np.isnan(sample).any():
+                return np.full(self.cnt_channels, np.nan)
+            self.state = np.stack([sample, np.zeros(self.cnt_channels)], axis=1)
+            self.cov = np.broadcast_to(np.diag([self.measurement_noise] * 2), (self.cnt_channels, 2, 2)).copy()
+            return sample.copy()
+
+        state = self.state @ self.transition.T
+        cov = self.transition @ self.cov @ self.transition.T + self.process_cov
+        innovation = sample - state[:, 0]
+        innovation_var = cov[:, 0, 0] + self.measurement_noise
+        is_outlier = innovation ** 2 > self.n_sigmas ** 2 * innovation_var
+        accepted = ~np.isnan(sample) & (~is_outlier | (self.cnt_skipped >= self.max_skipped))
+        self.cnt_skipped = np.where(accepted, 0, self.cnt_skipped + 1)
+
+        gain = cov[:, :, 0] / innovation_var[:, None]
+        updated_state = state + gain * np.nan_to_num(innovation)[:, None]
+        updated_cov = cov - gain[:, :, None] * cov[:, None, 0, :]
+        self.state = np.where(accepted[:, None], updated_state, state)
+        self.cov = np.where(accepted[:, None, None], updated_cov, cov)
+        return self.state[:, 0].copy()
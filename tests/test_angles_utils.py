@@ -0,0 +1,29 @@
+import numpy as np
+import pytest
+
+from gesture_repr.angles_repr.utils import PointsToAnglesTransformer
+
+ANGLE_DESCRIPTIONS = [((0, 1), (1, 2)), ((0, 2), (3, 4)), ((4, 3), (2, 0)), ((1, 4), (1, 3))]
+
+
+def test_transform_batch_matches_transform():
+    rng = np.random.default_rng(0)
+    transformer = PointsToAnglesTransformer(ANGLE_DESCRIPTIONS, cnt_points=5)
+    points = rng.normal(size=(12, 5, 3))
+    # frame without hand and a frame with one lost point
+    points[3] = np.nan
+    points[7, 2, 1] = np.nan
+    # zero vector (points 1 and 0 coincide) together with np.nan vector: angle is np.nan, not an error
+    points[9, 1] = points[9, 0]
+    points[9, 2] = np.nan
+    expected = np.array([transformer.transform(frame) for frame in points])
+    np.testing.assert_allclose(transformer.transform_batch(points), expected)
+    assert np.isnan(expected[[3, 7, 9]]).any(axis=1).all()
+
+
+def test_zero_vector_is_rejected():
+    transformer = PointsToAnglesTransformer(ANGLE_DESCRIPTIONS, cnt_points=5)
+    points = np.random.default_rng(1).normal(size=(2, 5, 3))
+    points[1, 1] = points[1, 0]
+    with pytest.raises(AssertionError):
+        transformer.transform_batch(points)
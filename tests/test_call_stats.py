@@ -0,0 +1,104 @@
+import time
+import types
+import numpy as np
+import pytest
+import mediapipe as mp
+
+from examples.DP_app import dummy_controller
+from examples.DP_app.dummy_controller import DummyController
+from instrumentation.call_stats import CallStats, Histogram, StatsRecorder, recording, DISABLED_STATS
+
+
+class FastHands:
+    """ MediaPipe Hands stub without work """
+    def __init__(self, **params):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def process(self, frame):
+        landmarks = [types.SimpleNamespace(x=0.5, y=0.5, z=float(ind)) for ind in range(21)]
+        return types.SimpleNamespace(multi_hand_landmarks=[types.SimpleNamespace(landmark=landmarks)])
+
+
+def test_call_stats():
+    stats = CallStats('call')
+    for _ in range(2):
+        with stats.stage('work'):
+            time.sleep(0.01)
+    stats.count('items')
+    stats.count('items', 2)
+
+    def slow_items():
+        for item in range(3):
+            time.sleep(0.01)
+            yield item
+
+    assert list(stats.timed_iter(slow_items(), 'decode')) == [0, 1, 2]
+    assert stats.stage_times['work'] >= 0.02 and stats.stage_times['decode'] >= 0.03
+    assert stats.counters == {'items': 3}
+    assert list(DISABLED_STATS.timed_iter([1, 2], 'decode')) == [1, 2]
+    DISABLED_STATS.count('items')
+    assert DISABLED_STATS.counters == {}
+
+
+def test_histogram_quantiles():
+    values = np.random.default_rng(0).lognormal(size=1000)
+    histogram = Histogram()
+    for value in values:
+        histogram.add(value)
+    histogram.add(0.0)
+    summary = histogram.summary()
+    assert summary['count'] == 1001 and summary['min'] == 0.0 and summary['max'] == values.max()
+    assert summary['mean'] == pytest.approx(values.sum() / 1001)
+    # upper edge of bucket is at most one bucket (10 ** 0.25) above the quantile
+    for q in (0.5, 0.9, 0.99):
+        exact = np.quantile(np.append(values, 0.0), q)
+        assert exact * 0.99 <= histogram.quantile(q) <= exact * 10 ** 0.25 * 1.01
+    assert histogram.quantile(0.0) == 0.0
+    assert np.isnan(Histogram().quantile(0.5))
+
+
+def test_recorder_and_recording():
+    recorded = []
+    recorder = StatsRecorder(callback=recorded.append)
+    for cnt_items in (1, 3):
+        with recording(recorder, 'call') as stats:
+            with stats.stage('work'):
+                stats.count('items', cnt_items)
+            # statistics of inner call are the same object
+            with recording(recorder, 'inner', stats) as inner_stats:
+                assert inner_stats is stats
+    assert [stats.name for stats in recorded] == ['call', 'call']
+    assert recorder.last['call'] is recorded[-1]
+    summary = recorder.summary()
+    assert sorted(summary) == ['call.items', 'call.time', 'call.time.work']
+    assert (summary['call.items']['count'], summary['call.items']['min'], summary['call.items']['max']) == (2, 1, 3)
+    with recording(None, 'call') as stats:
+        assert stats is DISABLED_STATS
+    recorder.reset()
+    assert recorder.summary() == {}
+
+
+def test_landmarks_time_of_shared_stats(monkeypatch):
+    monkeypatch.setattr(mp, 'solutions', types.SimpleNamespace(hands=types.SimpleNamespace(Hands=FastHands)),
+                        raising=False)
+
+    def slow_decode(video):
+        for _ in range(5):
+            time.sleep(0.02)
+            yield np.zeros((8, 8, 3), dtype=np.uint8)
+
+    monkeypatch.setattr(dummy_controller, 'iterate_video_capture', slow_decode)
+    controller = DummyController()
+    stats = CallStats('batch')
+    for _ in range(3):
+        controller.extract_points(object(), stats)
+    # decode time of every call is subtracted once
+    assert stats.stage_times['decode'] >= 0.3
+    assert 0.0 <= stats.stage_times['landmarks'] < stats.stage_times['decode']
+    assert stats.counters['frames'] == 15
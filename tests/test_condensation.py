@@ -0,0 +1,33 @@
+import numpy as np
+
+from distance.gallery.condensation import merge_redundant, condense_gallery
+from distance.gallery.template_gallery import TemplateGallery
+
+
+def test_merge_redundant_keeps_classes():
+    # two close pairs in class 'a', one template in class 'b'
+    dists = np.array([[0.0, 0.1, 2.0, 3.0, np.inf],
+                      [0.1, 0.0, 2.0, 3.0, np.inf],
+                      [2.0, 2.0, 0.0, 0.2, np.inf],
+                      [3.0, 3.0, 0.2, 0.0, np.inf],
+                      [np.inf, np.inf, np.inf, np.inf, 0.0]])
+    classes = ['a', 'a', 'a', 'a', 'b']
+    kept, merged, radii = merge_redundant(dists, classes, np.zeros(5), budget=3)
+    assert kept == [1, 3, 4]
+    assert merged == {0: 1, 2: 3}
+    assert radii[kept].max() == 0.2
+    # classes are never emptied
+    kept, merged, _ = merge_redundant(dists, classes, np.zeros(5), budget=1)
+    assert sorted(classes[ind] for ind in kept) == ['a', 'b']
+    assert all(prototype in kept for prototype in merged.values())
+
+
+def test_condense_gallery_report():
+    rng = np.random.default_rng(0)
+    gallery = TemplateGallery(max_erases=4)
+    for ind in range(6):
+        gallery.add(rng.normal(size=(20, 2)).cumsum(axis=0), {'gesture': ind % 2})
+    condensed, report = condense_gallery(gallery, budget=4)
+    assert len(condensed) == 4
+    assert all(gallery[ind] is template for ind, template in zip(report['kept'], condensed.templates))
+    assert report['coverage_radius'] == max(report['class_radii'].values()) > 0.0
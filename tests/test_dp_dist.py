@@ -0,0 +1,136 @@
+import numpy as np
+import pytest
+
+from distance.per_series_dist.dp_dist import dp_time_series_distance, dp_multichannel_distance, dp_alignment, \
+    abs_diff, neighbour_diff_erase_cost
+
+
+def baseline_dp_distance(a, b, max_erases):
+    """ The original full-tensor recurrence (float64), reference for both engines """
+    len_a, len_b = len(a), len(b)
+    if len_a > len_b:
+        a, b = b, a
+        len_a, len_b = len_b, len_a
+    dp = np.full((len_a + 1, max_erases + 1, max_erases + 1), 1e18)
+    dp[0, 0, 0] = 0
+    for a_id in range(len_a + 1):
+        for a_shift in range(min(a_id, max_erases) + 1):
+            for b_shift in range(max_erases + 1):
+                b_id = a_id - a_shift + b_shift
+                if a_id < len_a and b_id < len_b:
+                    dp[a_id + 1, a_shift, b_shift] = min(dp[a_id + 1, a_shift, b_shift],
+                                                         dp[a_id, a_shift, b_shift] + abs(a[a_id] - b[b_id]))
+                if a_shift < max_erases and a_id < len_a:
+                    dp[a_id + 1, a_shift + 1, b_shift] = min(dp[a_id + 1, a_shift + 1, b_shift],
+                                                             dp[a_id, a_shift, b_shift]
+                                                             + neighbour_diff_erase_cost(a, a_id))
+                if b_shift < max_erases and b_id < len_b:
+                    dp[a_id, a_shift, b_shift + 1] = min(dp[a_id, a_shift, b_shift + 1],
+                                                         dp[a_id, a_shift, b_shift]
+                                                         + neighbour_diff_erase_cost(b, b_id))
+    len_diff = len_b - len_a
+    a_shifts = np.arange(max(0, -len_diff), min(max_erases + 1, max_erases - len_diff + 1))
+    return (dp[len_a, a_shifts, a_shifts + len_diff] / (len_a - a_shifts)).min()
+
+
+def random_pair(rng, cnt_channels=None):
+    len_a, len_b = rng.integers(2, 30, size=2)
+    max_erases = int(rng.integers(abs(len_a - len_b), abs(len_a - len_b) + 6))
+    if max_erases >= min(len_a, len_b):
+        # answer may be normalised by nonpositive count of matched elements
+        return random_pair(rng, cnt_channels)
+    shape = (len_a,) if cnt_channels is None else (len_a, cnt_channels)
+    a = rng.normal(size=shape).cumsum(axis=0)
+    b = rng.normal(size=(len_b,) + shape[1:]).cumsum(axis=0)
+    return a, b, max_erases
+
+
+@pytest.mark.parametrize('seed', range(40))
+def test_engines_match_baseline(seed):
+    a, b, max_erases = random_pair(np.random.default_rng(seed))
+    expected = baseline_dp_distance(a, b, max_erases)
+    for engine in ('numpy', 'python'):
+        dist = dp_time_series_distance(a, b, max_erases, engine=engine, dp_dtype=np.float64)
+        assert dist == pytest.approx(expected, rel=1e-12, abs=1e-12)
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_engines_match_in_float32(seed):
+    a, b, max_erases = random_pair(np.random.default_rng(seed))
+    numpy_dist = dp_time_series_distance(a, b, max_erases, engine='numpy')
+    python_dist = dp_time_series_distance(a, b, max_erases, engine='python')
+    assert numpy_dist == pytest.approx(python_dist, rel=1e-5)
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_multichannel_matches_per_channel(seed):
+    a, b, max_erases = random_pair(np.random.default_rng(seed), cnt_channels=3)
+    expected = [baseline_dp_distance(a[:, i], b[:, i], max_erases) for i in range(3)]
+    for engine in ('numpy', 'python'):
+        dists = dp_multichannel_distance(a, b, max_erases, engine=engine, dp_dtype=np.float64)
+        np.testing.assert_allclose(dists, expected, rtol=1e-12, atol=1e-12)
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_abandon_threshold(seed):
+    a, b, max_erases = random_pair(np.random.default_rng(seed), cnt_channels=2)
+    for engine in ('numpy', 'python'):
+        exact = dp_multichannel_distance(a, b, max_erases, engine=engine)
+        # exact answer is never abandoned, answer above threshold is either exact or np.inf
+        assert np.array_equal(dp_multichannel_distance(a, b, max_erases, engine=engine,
+                                                       abandon_threshold=exact.max()), exact)
+        abandoned = dp_multichannel_distance(a, b, max_erases, engine=engine, abandon_threshold=exact.max() / 2)
+        assert np.isinf(abandoned).all() or np.array_equal(abandoned, exact)
+
+
+def test_auto_engine_with_custom_functions():
+    rng = np.random.default_rng(0)
+    a, b, max_erases = random_pair(rng)
+
+    def squared_diff(x, y):
+        return (x - y) ** 2
+
+    expected = dp_time_series_distance(a, b, max_erases, pairwise_distance=squared_diff, engine='numpy')
+    assert dp_time_series_distance(a, b, max_erases, pairwise_distance=squared_diff) == pytest.approx(expected)
+    assert dp_time_series_distance(a, b, max_erases) == dp_time_series_distance(a, b, max_erases,
+                                                                                pairwise_distance=abs_diff)
+
+
+def alignment_cost(a, b, alignment):
+    """ Distance of alignment of one channel recomputed from its indexes """
+    matched = alignment['matched']
+    cost = np.abs(a[matched[:, 0]] - b[matched[:, 1]]).sum()
+    cost += neighbour_diff_erase_cost(a, alignment['erased_a']).sum()
+    cost += neighbour_diff_erase_cost(b, alignment['erased_b']).sum()
+    return cost / len(matched)
+
+
+@pytest.mark.parametrize('seed', range(20))
+@pytest.mark.parametrize('checkpoint_step', [None, 1, 3, 100])
+def test_alignment_is_consistent_with_distance(seed, checkpoint_step):
+    a, b, max_erases = random_pair(np.random.default_rng(seed), cnt_channels=2)
+    expected = dp_multichannel_distance(a, b, max_erases, dp_dtype=np.float64)
+    for x, y in ((a, b), (b, a)):
+        dists, alignments = dp_alignment(x, y, max_erases, dp_dtype=np.float64, checkpoint_step=checkpoint_step)
+        np.testing.assert_allclose(dists, expected, rtol=1e-12, atol=1e-12)
+        for channel, alignment in enumerate(alignments):
+            matched = alignment['matched']
+            # every index is either matched or erased, matched pairs are monotone
+            np.testing.assert_array_equal(np.sort(np.concatenate([matched[:, 0], alignment['erased_a']])),
+                                          np.arange(len(x)))
+            np.testing.assert_array_equal(np.sort(np.concatenate([matched[:, 1], alignment['erased_b']])),
+                                          np.arange(len(y)))
+            assert (np.diff(matched, axis=0) > 0).all()
+            assert len(alignment['erased_a']) <= max_erases and len(alignment['erased_b']) <= max_erases
+            assert alignment_cost(x[:, channel], y[:, channel], alignment) == pytest.approx(dists[channel],
+                                                                                           rel=1e-12, abs=1e-12)
+
+
+def test_abandoned_alignment():
+    a, b, max_erases = random_pair(np.random.default_rng(0), cnt_channels=2)
+    dists, alignments = dp_alignment(a, b, max_erases, abandon_threshold=1e-6)
+    assert alignments is None and np.isinf(dists).all()
+    exact = dp_multichannel_distance(a, b, max_erases, engine='numpy')
+    dists, alignments = dp_alignment(a, b, max_erases, abandon_threshold=exact.max())
+    np.testing.assert_array_equal(dists, exact)
+    assert alignments is not None
@@ -0,0 +1,45 @@
+import threading
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+
+from examples.DP_app import dummy_controller
+from examples.DP_app.dummy_controller import DummyController, _submit_pipeline, _init_pipeline_worker
+
+
+class RecordingPreprocessor:
+    """ Stands for controller in pipeline workers, records processed videos """
+    def __init__(self):
+        self.extracted = []
+        self.preprocessed = 0
+
+    def extract_points(self, video):
+        self.extracted.append(video)
+        return dummy_controller.PointsRepr.from_points(np.zeros((5, 21, 3)))
+
+    def preproc_points(self, points_repr):
+        self.preprocessed += 1
+        return len(points_repr)
+
+
+def test_pipeline_result(monkeypatch):
+    monkeypatch.setattr(_init_pipeline_worker, 'preprocessor', RecordingPreprocessor(), raising=False)
+    with ThreadPoolExecutor(1) as extractor, ThreadPoolExecutor(1) as smoother:
+        assert _submit_pipeline(extractor, smoother, 'video').result() == 5
+
+
+def test_cancel_propagates_to_stage_jobs(monkeypatch):
+    preprocessor = RecordingPreprocessor()
+    monkeypatch.setattr(_init_pipeline_worker, 'preprocessor', preprocessor, raising=False)
+    release = threading.Event()
+    with ThreadPoolExecutor(1) as extractor, ThreadPoolExecutor(1) as smoother:
+        # the only extractor worker is busy, so extraction of video is pending
+        extractor.submit(release.wait)
+        result = _submit_pipeline(extractor, smoother, 'video')
+        assert result.cancel()
+        release.set()
+    assert preprocessor.extracted == []
+    assert preprocessor.preprocessed == 0
+
+
+def test_score_many_without_videos():
+    assert DummyController().score_many([], n_jobs=1) == []
@@ -0,0 +1,47 @@
+import numpy as np
+
+from examples.DP_app.dummy_dp_comp import DummyDPComparator
+
+
+def random_walk(rng, length, cnt_channels=2):
+    return rng.normal(size=(length, cnt_channels)).cumsum(axis=0)
+
+
+def test_coarse_proba_of_far_gesture():
+    rng = np.random.default_rng(0)
+    exact = DummyDPComparator(threshold=0.5, max_erases=4)
+    coarse = DummyDPComparator(threshold=0.5, coarse_factor=2, max_erases=4)
+    for _ in range(4):
+        gesture = random_walk(rng, 24)
+        exact.add_valid_gesture(gesture)
+        coarse.add_valid_gesture(gesture)
+    far = random_walk(rng, 24) + 5.0
+    assert 0.0 < coarse.proba_is_valid(far) < 0.5
+    assert not coarse.is_valid(far)
+    near = exact.valid_gestures[0] + 0.01
+    assert coarse.is_valid(near) and exact.is_valid(near)
+    assert coarse.proba_is_valid(near) > 0.5
+
+
+def test_condense_with_incomparable_lengths():
+    rng = np.random.default_rng(1)
+    comparator = DummyDPComparator(threshold=0.5, gallery_budget=2, max_erases=5)
+    for length in (30, 31, 60, 90):
+        comparator.add_valid_gesture(random_walk(rng, length), {'gesture': 'swipe'})
+    # the only comparable pair is merged, incomparable gestures are kept over budget
+    assert sorted(map(len, comparator.valid_gestures)) in ([30, 60, 90], [31, 60, 90])
+    assert np.isfinite(comparator.coverage_radius)
+
+
+def test_condense_reuses_summaries_of_kept_gestures():
+    rng = np.random.default_rng(2)
+    comparator = DummyDPComparator(threshold=0.5, gallery_budget=3, max_erases=4)
+    for _ in range(3):
+        comparator.add_valid_gesture(random_walk(rng, 24))
+    gallery = comparator.gallery
+    prefix_sums = list(gallery.prefix_sums)
+    comparator.add_valid_gesture(random_walk(rng, 24))
+    assert comparator.gallery is gallery and len(gallery) == 3
+    # every kept gesture except the new one has the same summaries
+    reused = [any(new is old for old in prefix_sums) for new in gallery.prefix_sums]
+    assert sum(reused) >= len(gallery) - 1
@@ -0,0 +1,32 @@
+import numpy as np
+import pytest
+
+from distance.gallery.template_gallery import TemplateGallery
+from examples.DP_app.dummy_spotter import DummyGestureSpotter
+from gesture_repr.angles_repr.utils import PointsToAnglesTransformer
+
+ANGLE_DESCRIPTIONS = [((0, 1), (1, 2)), ((0, 2), (3, 4)), ((4, 3), (2, 0))]
+
+
+def spot(template, smooth_templates):
+    """ Events of spotter after the template (as raw angles) between two gaps of the stream """
+    gallery = TemplateGallery(max_erases=2)
+    gallery.add(template, {'gesture': 'wave'})
+    spotter = DummyGestureSpotter(gallery, PointsToAnglesTransformer(ANGLE_DESCRIPTIONS, cnt_points=5),
+                                  threshold=10.0, max_gap=0, smooth_templates=smooth_templates)
+    events = spotter.push_angles(np.full(len(ANGLE_DESCRIPTIONS), np.nan))
+    for angles in template:
+        events += spotter.push_angles(angles)
+    return events + spotter.push_angles(np.full(len(ANGLE_DESCRIPTIONS), np.nan))
+
+
+def test_templates_are_smoothed_as_stream():
+    rng = np.random.default_rng(0)
+    template = 1.5 + np.cumsum(rng.normal(scale=0.1, size=(20, len(ANGLE_DESCRIPTIONS))), axis=0)
+    events = spot(template, smooth_templates=True)
+    assert len(events) == 1
+    assert events[0]['distance'] == pytest.approx(0.0, abs=1e-12)
+    assert (events[0]['start'], events[0]['metadata']) == (1, {'gesture': 'wave'})
+    # lag of causal filter biases distance to unsmoothed template
+    biased = spot(template, smooth_templates=False)
+    assert len(biased) == 1 and biased[0]['distance'] > 1e-3
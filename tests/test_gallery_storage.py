@@ -0,0 +1,40 @@
+import numpy as np
+
+from distance.gallery.template_gallery import TemplateGallery
+from distance.gallery.gallery_storage import save_gallery, load_gallery
+
+
+def random_gallery(rng: np.random.Generator, cnt_templates: int) -> TemplateGallery:
+    gallery = TemplateGallery(max_erases=5)
+    for i in range(cnt_templates):
+        gallery.add(rng.normal(size=(int(rng.integers(20, 25)), 3)), {'index': i})
+    return gallery
+
+
+def test_save_load_roundtrip(tmp_path):
+    rng = np.random.default_rng(0)
+    gallery = random_gallery(rng, 4)
+    path = str(tmp_path / 'gallery.bin')
+    save_gallery(gallery, path)
+    loaded = load_gallery(path, max_erases=5)
+    assert loaded.metadata == gallery.metadata
+    for i in range(len(gallery)):
+        np.testing.assert_array_equal(loaded[i][:, :], np.asarray(gallery[i][:, :], dtype=np.float32))
+    query = rng.normal(size=(22, 3))
+    assert loaded.k_nearest(query, 2) == sorted((loaded.distance(i, query), i) for i in range(len(loaded)))[:2]
+
+
+def test_save_to_path_it_was_loaded_from(tmp_path):
+    rng = np.random.default_rng(1)
+    path = str(tmp_path / 'gallery.bin')
+    save_gallery(random_gallery(rng, 3), path)
+    loaded = load_gallery(path, max_erases=5)
+    expected = [np.array(loaded[i][:, :]) for i in range(len(loaded))]
+    loaded.add(rng.normal(size=(21, 3)))
+    # templates of loaded gallery are views of the file being replaced
+    save_gallery(loaded, path)
+    reloaded = load_gallery(path, max_erases=5)
+    assert len(reloaded) == 4
+    for i, template in enumerate(expected):
+        np.testing.assert_array_equal(reloaded[i][:, :], template)
+    assert not [name for name in tmp_path.iterdir() if name.suffix == '.tmp']
@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+from sklearn.gaussian_process import GaussianProcessRegressor
+
+from smoothing.gpr_smoothing import gpr_time_series_smoothing, gpr_gesture_smoothing, default_kernel, \
+    _factorize, _factorized_mean
+
+
+def noisy_series(seed, length=40, outliers=(10, 25)):
+    rng = np.random.default_rng(seed)
+    time = np.linspace(0.0, 3.0, length)
+    clean = np.sin(time + seed)
+    noisy = clean + rng.normal(scale=0.05, size=length)
+    noisy[list(outliers)] += 2.0
+    return clean, noisy
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_factorized_mean_matches_predict(seed):
+    rng = np.random.default_rng(seed)
+    time_grid = np.arange(30)[:, None]
+    model = GaussianProcessRegressor(kernel=default_kernel(30)).fit(time_grid, rng.normal(size=30).cumsum())
+    targets = rng.normal(size=(30, 3)).cumsum(axis=0)
+    # the same hyperparameters, only targets are changed
+    fixed = GaussianProcessRegressor(kernel=model.kernel_, optimizer=None).fit(time_grid, targets)
+    np.testing.assert_allclose(_factorized_mean(_factorize(model, time_grid), targets), fixed.predict(time_grid),
+                               atol=1e-8)
+
+
+@pytest.mark.parametrize('refit_kernel', ['always', 'warm_start', 'first'])
+def test_outliers_are_replaced(refit_kernel):
+    clean, noisy = noisy_series(0)
+    smoothed, mean, std = gpr_time_series_smoothing(noisy, refit_kernel=refit_kernel, return_last_gpr_mean_std=True)
+    assert smoothed.shape == mean.shape == std.shape == noisy.shape
+    np.testing.assert_allclose(smoothed[[10, 25]], clean[[10, 25]], atol=0.2)
+
+
+def test_shared_kernel_of_one_column_matches_time_series():
+    _, noisy = noisy_series(1)
+    expected = gpr_time_series_smoothing(noisy, refit_kernel='first', return_last_gpr_mean_std=True)
+    result = gpr_gesture_smoothing(noisy[:, None], return_last_gpr_mean_std=True)
+    assert result.shape == (1, 3, len(noisy))
+    np.testing.assert_allclose(result[0], np.array(expected))
+
+
+def test_shared_kernel_keeps_column_order():
+    _, first = noisy_series(2)
+    _, second = noisy_series(3, outliers=(5,))
+    result = gpr_gesture_smoothing(np.stack([first, second], axis=1))
+    np.testing.assert_allclose(gpr_gesture_smoothing(np.stack([second, first], axis=1)), result[::-1])
+    # duplicated column is smoothed as the single one
+    duplicated = gpr_gesture_smoothing(np.stack([first, first], axis=1))
+    np.testing.assert_allclose(duplicated, np.stack([gpr_gesture_smoothing(first[:, None])[0]] * 2))
@@ -0,0 +1,101 @@
+import os
+import types
+import cv2
+import numpy as np
+import mediapipe as mp
+
+from examples.DP_app.dummy_controller import DummyController
+from gesture_repr.points_repr.landmark_cache import LandmarkCache
+from gesture_repr.points_repr.points_repr import PointsRepr
+
+
+class CountingHands:
+    """ MediaPipe Hands stub, counts processed frames """
+    cnt_frames = 0
+
+    def __init__(self, **params):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def close(self):
+        pass
+
+    def process(self, frame):
+        CountingHands.cnt_frames += 1
+        landmarks = [types.SimpleNamespace(x=0.5, y=0.5, z=float(ind)) for ind in range(21)]
+        return types.SimpleNamespace(multi_hand_landmarks=[types.SimpleNamespace(landmark=landmarks)])
+
+
+def write_file(path, content):
+    with open(path, 'wb') as file:
+        file.write(content)
+    return str(path)
+
+
+def test_key_depends_on_content_and_settings(tmp_path):
+    cache = LandmarkCache(str(tmp_path / 'cache'))
+    video = write_file(tmp_path / 'a.avi', b'frames' * 1000)
+    settings = PointsRepr.hands_settings()
+    key = cache.key(video, settings)
+    # stable across instances and order of settings
+    assert LandmarkCache(str(tmp_path / 'cache')).key(video, dict(reversed(list(settings.items())))) == key
+    assert cache.key(write_file(tmp_path / 'copy.avi', b'frames' * 1000), settings) == key
+    assert cache.key(write_file(tmp_path / 'b.avi', b'frames' * 999), settings) != key
+    assert cache.key(video, PointsRepr.hands_settings(model_complexity=0)) != key
+
+
+def test_get_or_compute(tmp_path):
+    cache = LandmarkCache(str(tmp_path))
+    points = np.random.default_rng(0).normal(size=(4, 21, 3))
+    calls = []
+    for _ in range(2):
+        result = cache.get_or_compute('key', lambda: calls.append(1) or points)
+        np.testing.assert_allclose(result, points.astype(np.float32))
+    assert len(calls) == 1
+    assert cache.stats == {'hits': 1, 'misses': 1, 'entries': 1, 'bytes': os.path.getsize(tmp_path / 'key.npy')}
+
+
+def test_least_recently_used_are_evicted(tmp_path):
+    points = np.zeros((10, 21, 3))
+    cache = LandmarkCache(str(tmp_path), max_bytes=1)
+    cache.put('probe', points)
+    entry_bytes = cache.stats['bytes']
+    cache.clear()
+
+    cache = LandmarkCache(str(tmp_path), max_bytes=2 * entry_bytes)
+    for age, key in enumerate(['new', 'middle', 'old']):
+        cache.put(key, points)
+        os.utime(tmp_path / f'{key}.npy', (1000.0 - age, 1000.0 - age))
+    # access of the oldest entry makes it the most recently used
+    assert cache.get('old') is not None
+    cache.put('newest', points)
+    assert sorted(name[:-len('.npy')] for name in os.listdir(tmp_path)) == ['newest', 'old']
+    # the newest entry is kept even if it is larger than max_bytes
+    cache = LandmarkCache(str(tmp_path), max_bytes=1)
+    cache.put('large', points)
+    assert os.listdir(tmp_path) == ['large.npy']
+
+
+def test_controller_cache_hits_with_the_same_settings(tmp_path, monkeypatch):
+    monkeypatch.setattr(mp, 'solutions', types.SimpleNamespace(hands=types.SimpleNamespace(Hands=CountingHands)),
+                        raising=False)
+    video = str(tmp_path / 'video.avi')
+    writer = cv2.VideoWriter(video, cv2.VideoWriter_fourcc(*'MJPG'), 30, (32, 32))
+    for value in range(5):
+        writer.write(np.full((32, 32, 3), value * 40, dtype=np.uint8))
+    writer.release()
+
+    cache = LandmarkCache(str(tmp_path / 'cache'))
+    CountingHands.cnt_frames = 0
+    first = DummyController(landmark_cache=cache).extract_points(video)
+    assert (CountingHands.cnt_frames, cache.hits, cache.misses) == (5, 0, 1)
+    second = DummyController(landmark_cache=cache).extract_points(video)
+    assert (CountingHands.cnt_frames, cache.hits, cache.misses) == (5, 1, 1)
+    np.testing.assert_array_equal(first[:], second[:])
+    DummyController(landmark_cache=cache, hands_params=dict(model_complexity=0)).extract_points(video)
+    assert (CountingHands.cnt_frames, cache.hits, cache.misses) == (10, 1, 2)
@@ -0,0 +1,59 @@
+import os
+import functools
+import numpy as np
+import pytest
+
+from distance.gallery.pairwise_distances import pairwise_gesture_distances, _param_fingerprint
+from distance.per_series_dist.dp_dist import dp_multichannel_distance
+from instrumentation.call_stats import CallStats
+
+
+def random_gestures(seed, cnt=7):
+    rng = np.random.default_rng(seed)
+    return [rng.normal(size=(int(rng.integers(15, 22)), 2)).cumsum(axis=0) for _ in range(cnt)]
+
+
+def test_matches_direct_dp():
+    gestures = random_gestures(0)
+    dists = pairwise_gesture_distances(gestures, n_jobs=1, block_size=3, max_erases=4)
+    for i, a in enumerate(gestures):
+        for j, b in enumerate(gestures):
+            if i == j:
+                np.testing.assert_array_equal(dists[i, j], 0.0)
+            elif abs(len(a) - len(b)) > 4:
+                assert np.isinf(dists[i, j]).all()
+            else:
+                np.testing.assert_allclose(dists[i, j], dp_multichannel_distance(a, b, 4))
+    np.testing.assert_array_equal(dists, dists.transpose(1, 0, 2))
+    threaded = pairwise_gesture_distances(gestures, reduce=np.max, n_jobs=2, executor='thread', max_erases=4)
+    np.testing.assert_array_equal(threaded, dists.max(axis=-1))
+
+
+def test_checkpoint_resume(tmp_path):
+    gestures = random_gestures(1)
+    expected = pairwise_gesture_distances(gestures, n_jobs=1, block_size=3, checkpoint_dir=str(tmp_path))
+    os.remove(tmp_path / 'block_0_3.npy')
+    stats = CallStats('pairwise')
+    resumed = pairwise_gesture_distances(gestures, n_jobs=1, block_size=3, checkpoint_dir=str(tmp_path),
+                                         stats=stats)
+    np.testing.assert_array_equal(resumed, expected)
+    assert stats.counters['blocks_computed'] == 1
+    assert stats.counters['blocks_restored'] == 5
+
+
+def test_checkpoint_of_other_params_is_rejected(tmp_path):
+    gestures = random_gestures(2)
+    pairwise_gesture_distances(gestures, n_jobs=1, checkpoint_dir=str(tmp_path), max_erases=lambda a, b: 3)
+    with pytest.raises(AssertionError):
+        pairwise_gesture_distances(gestures, n_jobs=1, checkpoint_dir=str(tmp_path), max_erases=lambda a, b: 5)
+
+
+def test_param_fingerprint():
+    def scaled_diff(scale):
+        return lambda x, y: np.abs(x - y) * scale
+
+    assert _param_fingerprint(lambda x: x + 1) != _param_fingerprint(lambda x: x + 2)
+    assert _param_fingerprint(scaled_diff(1)) != _param_fingerprint(scaled_diff(2))
+    assert _param_fingerprint(scaled_diff(1)) == _param_fingerprint(scaled_diff(1))
+    assert _param_fingerprint(functools.partial(max, 3)) != _param_fingerprint(functools.partial(max, 4))
+    assert _param_fingerprint(np.float32) == 'numpy.float32'
@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+from distance.gallery.parallel_matching import ParallelMatcher
+from distance.gallery.template_gallery import TemplateGallery
+
+
+def random_gallery(seed, cnt_templates=16):
+    rng = np.random.default_rng(seed)
+    gallery = TemplateGallery(max_erases=4)
+    for _ in range(cnt_templates):
+        gallery.add(rng.normal(size=(int(rng.integers(20, 26)), 3)).cumsum(axis=0))
+    # duplicates give ties of distances
+    for ind in (3, 5, 3):
+        gallery.add(gallery[ind].copy())
+    queries = [rng.normal(size=(int(rng.integers(20, 26)), 3)).cumsum(axis=0) for _ in range(4)]
+    return gallery, queries + [gallery[3] + 0.01]
+
+
+@pytest.mark.parametrize('executor', ['thread', 'process'])
+@pytest.mark.parametrize('channels_per_job', [None, 1])
+def test_matches_serial_gallery(executor, channels_per_job):
+    gallery, queries = random_gallery(0)
+    # one job in flight: radius shrinks between submissions
+    with ParallelMatcher(gallery, 2, executor, channels_per_job, jobs_in_flight=1) as matcher:
+        for query in queries:
+            nearest = gallery.k_nearest(query, 3)
+            assert matcher.k_nearest(query, 3) == nearest
+            assert matcher.k_nearest(query, 4, radius=nearest[1][0]) == gallery.k_nearest(query, 4, nearest[1][0])
+            assert matcher.has_within(query, nearest[0][0])
+            assert not matcher.has_within(query, nearest[0][0] * 0.99)
+
+
+def test_ties_are_broken_by_index():
+    gallery, queries = random_gallery(1)
+    with ParallelMatcher(gallery, 4, 'thread', channels_per_job=1) as matcher:
+        for _ in range(5):
+            nearest = matcher.k_nearest(queries[-1], 2)
+            # template 3 and its copies 16 and 18 have equal distances
+            assert [ind for _, ind in nearest] == [3, 16]
@@ -0,0 +1,65 @@
+import types
+import numpy as np
+import pytest
+import mediapipe as mp
+
+from gesture_repr.points_repr.points_repr import PointsRepr
+
+
+class FakeHands:
+    """ MediaPipe Hands stub: landmarks are shifted by the first pixel of frame, records order of frames """
+    instances = []
+
+    def __init__(self, **params):
+        self.params = params
+        self.frames = []
+        FakeHands.instances.append(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def process(self, frame):
+        value = float(frame.flat[0])
+        self.frames.append(value)
+        points = np.linspace(0.0, 1.0, 63).reshape(21, 3) + value
+        landmarks = [types.SimpleNamespace(x=x, y=y, z=z) for x, y, z in points]
+        return types.SimpleNamespace(multi_hand_landmarks=[types.SimpleNamespace(landmark=landmarks)])
+
+
+@pytest.fixture
+def fake_hands(monkeypatch):
+    FakeHands.instances = []
+    monkeypatch.setattr(mp, 'solutions', types.SimpleNamespace(hands=types.SimpleNamespace(Hands=FakeHands)),
+                        raising=False)
+    return FakeHands
+
+
+def frames(values):
+    return [np.full((2, 2, 3), value) for value in values]
+
+
+def test_full_rate(fake_hands):
+    values = np.sin(np.arange(20) / 3)
+    points = PointsRepr(frames(values))
+    np.testing.assert_allclose(points[:, 0, 0], values, atol=1e-6)
+
+
+def test_decimation_interpolates_skipped_frames(fake_hands):
+    values = np.arange(10) * 0.1
+    points = PointsRepr(frames(values), detection_step=3)
+    # linear motion is interpolated exactly
+    np.testing.assert_allclose(points[:, 0, 0], values, atol=1e-6)
+    assert fake_hands.instances[0].frames == pytest.approx(values[[0, 3, 6, 9]])
+
+
+def test_every_tracker_gets_frames_in_order(fake_hands):
+    values = np.concatenate([np.zeros(6), np.ones(6)])
+    points = PointsRepr(frames(values), detection_step=4, motion_tolerance=0.1)
+    # jump between frames 4 and 8 is backfilled, so it is not interpolated
+    np.testing.assert_allclose(points[:, 0, 0], values, atol=1e-6)
+    for hands in fake_hands.instances:
+        assert hands.frames == sorted(hands.frames)
+        assert hands.params['static_image_mode'] is False
@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from gesture_repr.repr_modify_utils.utils import erase_nan_prefix_suffix, interpolate, nan_percentage
+
+
+def random_with_nan(rng, shape, nan_rate=0.3):
+    values = rng.normal(size=shape)
+    values[rng.random(shape) < nan_rate] = np.nan
+    return values
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_interpolate_matches_pandas(seed):
+    values = random_with_nan(np.random.default_rng(seed), (30, 5))
+    # the last column is all np.nan
+    values[:, -1] = np.nan
+    expected = pd.DataFrame(values).interpolate(method='linear', limit_direction='both').values
+    np.testing.assert_allclose(interpolate(values), expected)
+    # input is not changed without inplace
+    assert np.isnan(values[:, :-1]).any()
+
+
+def test_interpolate_inplace_non_contiguous():
+    rng = np.random.default_rng(0)
+    base = random_with_nan(rng, (20, 6, 4))
+    expected = interpolate(base[:, ::2].copy())
+    # non-contiguous 3d values can't be flattened without copy
+    values = base[:, ::2]
+    assert not values.flags.c_contiguous
+    result = interpolate(values, inplace=True)
+    assert result is values
+    np.testing.assert_allclose(base[:, ::2], expected)
+    assert not np.isnan(base[:, ::2]).any()
+
+
+def test_interpolate_inplace_read_only_is_copied():
+    values = random_with_nan(np.random.default_rng(1), (10, 2))
+    values.flags.writeable = False
+    result = interpolate(values, inplace=True)
+    assert not np.isnan(result).any()
+    assert np.isnan(values).any()
+
+
+def test_erase_nan_prefix_suffix():
+    values = np.arange(12.0).reshape(6, 2)
+    values[0, 1] = values[4, 0] = values[5, 1] = values[2, 0] = np.nan
+    np.testing.assert_array_equal(erase_nan_prefix_suffix(values), values[1:4])
+    assert erase_nan_prefix_suffix(np.full((3, 2), np.nan)) is None
+    assert nan_percentage(values) == pytest.approx(4 / 6)
@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from smoothing.robust_smoothing import hampel_time_series_smoothing, savgol_time_series_smoothing, \
+    kalman_time_series_smoothing
+from smoothing.smooth_gesture import smooth_gesture
+
+BACKENDS = [hampel_time_series_smoothing, savgol_time_series_smoothing, kalman_time_series_smoothing]
+
+
+def noisy_series(seed, length=40):
+    rng = np.random.default_rng(seed)
+    clean = np.sin(np.linspace(0.0, 3.0, length) + seed)
+    return clean, clean + rng.normal(scale=0.02, size=length)
+
+
+@pytest.mark.parametrize('smoothing_func', BACKENDS)
+def test_smooth_gesture_contract(smoothing_func):
+    gesture = np.stack([noisy_series(seed)[1] for seed in range(3)], axis=1)
+    smoothed = smooth_gesture(gesture, smoothing_func)
+    assert smoothed.shape == (3, 40)
+    with_mean_std = smooth_gesture(gesture, smoothing_func, return_last_gpr_mean_std=True)
+    assert with_mean_std.shape == (3, 3, 40)
+    np.testing.assert_array_equal(with_mean_std[:, 0], smoothed)
+    assert (with_mean_std[:, 2] >= 0.0).all()
+
+
+@pytest.mark.parametrize('smoothing_func', BACKENDS)
+def test_outlier_is_replaced(smoothing_func):
+    clean, noisy = noisy_series(0)
+    noisy[20] += 1.0
+    smoothed = smoothing_func(noisy)
+    assert abs(smoothed[20] - clean[20]) < 0.1
+    # input is not changed
+    assert noisy[20] > clean[20] + 0.9
+
+
+@pytest.mark.parametrize('smoothing_func', BACKENDS)
+def test_missing_samples_are_interpolated(smoothing_func):
+    clean, noisy = noisy_series(1)
+    noisy[[0, 7, 8, 20]] = np.nan
+    smoothed, mean, std = smoothing_func(noisy, return_last_gpr_mean_std=True)
+    assert np.isfinite(smoothed).all() and np.isfinite(mean).all() and np.isfinite(std).all()
+    np.testing.assert_allclose(smoothed[[7, 8, 20]], clean[[7, 8, 20]], atol=0.1)
+
+
+def test_hampel_mean_std():
+    values = np.zeros(21)
+    values[10] = 5.0
+    smoothed, mean, std = hampel_time_series_smoothing(values, window=3, return_last_gpr_mean_std=True)
+    np.testing.assert_array_equal(mean, 0.0)
+    np.testing.assert_array_equal(std, 0.0)
+    np.testing.assert_array_equal(smoothed, 0.0)
@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+
+from smoothing.gpr_smoothing import gpr_time_series_smoothing
+from smoothing.robust_smoothing import hampel_time_series_smoothing
+from smoothing.smooth_gesture import smooth_gesture, smoothing_executor
+
+
+def random_gesture(seed, cnt_channels=5):
+    rng = np.random.default_rng(seed)
+    gesture = np.sin(np.linspace(0.0, 3.0, 30)[:, None] + np.arange(cnt_channels)) \
+        + rng.normal(scale=0.05, size=(30, cnt_channels))
+    gesture[rng.integers(0, 30, size=cnt_channels), np.arange(cnt_channels)] += 1.0
+    return gesture
+
+
+@pytest.mark.parametrize('smoothing_func, params', [(gpr_time_series_smoothing, dict(cnt_iter=3)),
+                                                    (hampel_time_series_smoothing, dict(window=4))])
+def test_parallel_matches_serial(smoothing_func, params):
+    gesture = random_gesture(0)
+    expected = smooth_gesture(gesture, smoothing_func, **params)
+    # every channel is different, so results in wrong order are not equal
+    assert expected.shape == (5, 30)
+    # BLAS of workers is limited to one thread, so results may differ by rounding
+    np.testing.assert_allclose(smooth_gesture(gesture, smoothing_func, n_jobs=2, **params), expected, rtol=1e-8)
+    with ThreadPoolExecutor(2) as executor:
+        np.testing.assert_allclose(smooth_gesture(gesture, smoothing_func, executor=executor, **params), expected,
+                                   rtol=1e-8)
+    with smoothing_executor(2) as executor:
+        for seed in range(2):
+            gesture = random_gesture(seed)
+            np.testing.assert_allclose(smooth_gesture(gesture, smoothing_func, executor=executor, **params),
+                                       smooth_gesture(gesture, smoothing_func, **params), rtol=1e-8)
+
+
+def blas_threads():
+    from threadpoolctl import threadpool_info
+    return [pool['num_threads'] for pool in threadpool_info()]
+
+
+def test_smoothing_executor_limits_blas_threads():
+    with smoothing_executor(2, blas_threads_per_job=1) as executor:
+        assert all(cnt_threads == 1 for cnt_threads in executor.submit(blas_threads).result())
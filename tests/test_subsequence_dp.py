@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+from distance.per_series_dist.dp_dist import dp_multichannel_distance
+from distance.per_series_dist.subsequence_dp import SubsequenceDPMatcher
+
+
+def random_walk(rng, length, cnt_channels=2):
+    return rng.normal(size=(length, cnt_channels)).cumsum(axis=0)
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_every_segment_matches_batch_dp(seed):
+    rng = np.random.default_rng(seed)
+    template = random_walk(rng, int(rng.integers(5, 12)))
+    stream = random_walk(rng, 30)
+    max_erases = int(rng.integers(1, 4))
+    # nothing is reported, so no states are dropped
+    matcher = SubsequenceDPMatcher(template, threshold=-1.0, max_erases=max_erases)
+    for ind in range(len(stream) + 1):
+        if ind < len(stream):
+            assert matcher.push(stream[ind]) is None
+            end = matcher.cnt_samples - 1
+        else:
+            # segments ending with the last sample are scored by flush
+            assert matcher.flush() is None
+            end = matcher.cnt_samples
+        dists = matcher.segment_distances()
+        for length in range(len(template) - max_erases, len(template) + max_erases + 1):
+            if not 0 < length <= end:
+                continue
+            expected = dp_multichannel_distance(template, stream[end - length:end], max_erases,
+                                                dp_dtype=np.float64).max()
+            assert dists[length] == pytest.approx(expected, rel=1e-12, abs=1e-12)
+
+
+def test_reports_planted_template():
+    rng = np.random.default_rng(0)
+    template = random_walk(rng, 10)
+    stream = np.concatenate([random_walk(rng, 20) + 50, template, random_walk(rng, 20) - 50])
+    matcher = SubsequenceDPMatcher(template, threshold=0.5, max_erases=2)
+    reports = [report for report in map(matcher.push, stream) if report is not None]
+    last = matcher.flush()
+    if last is not None:
+        reports.append(last)
+    assert len(reports) == 1
+    dist, start, end = reports[0]
+    # erase of the last template sample is free, so shorter segment has the same distance
+    assert (dist, start) == (0.0, 20) and end in (29, 30)
+
+
+def test_flush_reports_segment_ending_with_the_last_sample():
+    rng = np.random.default_rng(1)
+    template = random_walk(rng, 10)
+    stream = np.concatenate([random_walk(rng, 20) + 50, template])
+    # without erases only segments of template length are compared
+    matcher = SubsequenceDPMatcher(template, threshold=0.5, max_erases=0)
+    assert all(matcher.push(sample) is None for sample in stream)
+    assert matcher.flush() == (0.0, 20, 30)
+    assert matcher.flush() is None
@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+
+from distance.gallery.template_gallery import TemplateGallery
+from distance.per_series_dist.dp_dist import dp_multichannel_distance
+
+
+def log_max_erases(len_a, len_b):
+    return len_b - len_a + 2 + int(np.log2(len_b))
+
+
+def brute_force(gallery, query, k):
+    dists = []
+    for ind in range(len(gallery)):
+        max_erases = gallery.pair_max_erases(gallery.lengths[ind], len(query))
+        if abs(gallery.lengths[ind] - len(query)) <= max_erases:
+            dists.append((dp_multichannel_distance(gallery[ind], query, max_erases).max(), ind))
+    return sorted(dists)[:k]
+
+
+@pytest.mark.parametrize('max_erases', [4, log_max_erases])
+def test_k_nearest_matches_brute_force(max_erases):
+    rng = np.random.default_rng(0)
+    gallery = TemplateGallery(max_erases=max_erases)
+    for _ in range(12):
+        gallery.add(rng.normal(size=(int(rng.integers(20, 30)), 3)).cumsum(axis=0))
+    for _ in range(5):
+        query = rng.normal(size=(int(rng.integers(20, 30)), 3)).cumsum(axis=0)
+        expected = brute_force(gallery, query, 3)
+        nearest = gallery.k_nearest(query, 3)
+        assert [ind for _, ind in nearest] == [ind for _, ind in expected]
+        np.testing.assert_allclose([dist for dist, _ in nearest], [dist for dist, _ in expected])
+        if expected:
+            radius = expected[0][0]
+            assert gallery.has_within(query, radius * 1.001)
+            assert not gallery.has_within(query, radius * 0.999)
+
+
+def test_incomparable_templates_are_skipped():
+    rng = np.random.default_rng(1)
+    gallery = TemplateGallery(max_erases=3)
+    gallery.add(rng.normal(size=(20, 2)))
+    gallery.add(rng.normal(size=(40, 2)))
+    nearest = gallery.k_nearest(rng.normal(size=(21, 2)), 2)
+    assert [ind for _, ind in nearest] == [0]
+
+
+def test_envelope_cache_is_bounded():
+    rng = np.random.default_rng(2)
+    gallery = TemplateGallery(max_erases=log_max_erases)
+    gallery.add(rng.normal(size=(30, 2)))
+    for length in range(20, 40):
+        gallery.k_nearest(rng.normal(size=(length, 2)))
+    assert len(gallery.envelopes[0]) <= gallery.max_cached_envelopes
+
+
+def test_coarse_k_nearest_of_far_query():
+    rng = np.random.default_rng(3)
+    gallery = TemplateGallery(coarse_factor=2, max_erases=4)
+    for _ in range(5):
+        gallery.add(rng.normal(size=(24, 2)).cumsum(axis=0))
+    # every template is far above the refine band
+    query = rng.normal(size=(24, 2)).cumsum(axis=0) + 100.0
+    coarse = [gallery.coarse_distance(ind, query) for ind in range(len(gallery))]
+    nearest = gallery.k_nearest(query, 2, refine_threshold=0.5)
+    assert [ind for _, ind in nearest] == list(np.argsort(coarse)[:2])
+    np.testing.assert_allclose([dist for dist, _ in nearest], np.sort(coarse)[:2])
+    assert not gallery.has_within(query, 0.5)
+
+
+def test_remove_keeps_summaries():
+    rng = np.random.default_rng(4)
+    gallery = TemplateGallery(max_erases=4)
+    templates = [rng.normal(size=(int(rng.integers(20, 26)), 2)).cumsum(axis=0) for _ in range(8)]
+    for ind, template in enumerate(templates):
+        gallery.add(template, {'ind': ind})
+    envelopes = list(gallery.envelopes)
+    gallery.remove([1, 4, 5])
+    kept = [0, 2, 3, 6, 7]
+    assert [metadata['ind'] for metadata in gallery.metadata] == kept
+    assert all(gallery.envelopes[i] is envelopes[ind] for i, ind in enumerate(kept))
+    expected = TemplateGallery(max_erases=4)
+    for ind in kept:
+        expected.add(templates[ind])
+    query = rng.normal(size=(22, 2)).cumsum(axis=0)
+    assert gallery.k_nearest(query, 3) == expected.k_nearest(query, 3)